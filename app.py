@@ -0,0 +1,996 @@
+import socket
+import time
+import gc
+import ujson
+from array import array
+from machine import ADC, Pin
+import micropython
+import calibration
+import choreo
+import clocksync
+import heap
+import jitter
+import latency
+import motion
+import poti
+import power
+import profiles
+import protocol
+import scheduler
+import sources
+import telemetry
+import wifi
+from servobank import DUTY_ONE, SPEED_MAX, PCA9685Backend, PWMBackend, ServoBank
+
+# Servos: je Kanal ein Eintrag, Duty-Werte 0..1023 bei 50 Hz (angepasst für FS90R)
+SERVO_PINS = (5, 14)           # D1 = linker Motor, D5 = rechter Motor
+SERVO_STOP = (76, 76)          # 1.5 ms (Stillstand)
+SERVO_FULL_FORWARD = (81, 81)  # ca. 2.5 ms (volle Vorwärtsfahrt)
+# Gemessene Kennlinien je Board (mpremote run calibrate.py), ersetzen STOP/FULL_FORWARD
+CALIBRATION_FILE = calibration.FILE
+
+# "pwm" = PWM-Pins des Boards, "pca9685" = I2C-Expander (SERVO_PINS sind dann Kanäle 0..15)
+SERVO_BACKEND = "pwm"
+PCA9685_ADDRESS = 0x40
+PCA9685_SCL = 5  # D1
+PCA9685_SDA = 4  # D2
+
+# Ausgabe über PWM-Pins: "coarse" = duty() wie bisher, "dither" = Sigma-Delta zwischen
+# benachbarten duty()-Werten, "u16"/"ns" = duty_u16()/duty_ns() (Port muss feiner auflösen),
+# "auto" = duty_ns() wo verfügbar und feiner als 10 Bit, sonst Dithering
+DUTY_OUTPUT = "auto"
+
+# Animation Parameter (mode "manual", siehe motion.py)
+PHASE_DURATION = 3000  # 7 Sekunden pro Phase in ms
+TRANSITION_TIME = 3000  # 3 Sekunden Übergang in ms
+UPDATE_INTERVAL = 50    # 50ms Update-Intervall
+MOTION_PROFILE = profiles.MINIMUM_JERK  # Übergangsform: linear, cosine, minjerk, trapezoid
+PROFILE_STEPS = 64      # Einträge der gebackenen Profiltabelle
+PROFILE_RAMP = 0.25     # Rampenanteil beim Trapezprofil
+ACCEL_LIMIT = 0         # Trapezprofil: max. Speed-Änderung pro Sekunde (0 = nur PROFILE_RAMP)
+SCHEDULER_POLICY = scheduler.POLICY_SKIP  # Verhalten bei verpassten Deadlines
+STATS_INTERVAL = 10000  # Takt-Statistik alle 10 Sekunden ausgeben
+TELEMETRY_INTERVAL = 200  # Debug-Ausgabe der uasyncio-/Timer-Laufzeit alle 200ms
+
+# Choreografie für mode_switch "playback" (siehe choreo.py, erzeugt mit tools/choreoc.py)
+CHOREO_FILE = "show.zkc"
+CHOREO_CHUNK_RECORDS = 16  # Keyframes pro Lesezugriff auf den Flash
+
+# Jitter-Puffer für Sollwert-Ströme mit mehreren Samples pro Datagramm (siehe jitter.py)
+JITTER_CAPACITY = 16    # Samples im Puffer
+JITTER_MIN_DELAY = 40   # Abspielverzögerung in ms, passt sich bis JITTER_MAX_DELAY dem Jitter an
+JITTER_MAX_DELAY = 300
+
+# Poti-Steuerung für mode_switch "poti" (siehe poti.py)
+POTI_ADC = 0           # ADC-Kanal des Potis (A0)
+POTI_CENTER = 512      # ADC-Wert der Mittelstellung
+POTI_TOLERANCE = 20    # ± um die Mitte: beide Servos stehen
+POTI_HYSTERESIS = 4    # ADC-Schritte Totzone gegen Zittern
+POTI_OVERSAMPLE = 8    # ADC-Lesungen pro Regeltakt (Burst)
+POTI_WINDOW = 4        # Bursts im gleitenden Mittelwert (1..16)
+
+# Telemetrie (siehe telemetry.py) - LEVEL_BATCH/LEVEL_CONSOLE nur zur Fehlersuche,
+# LEVEL_RECORD zeichnet auf und gibt nur auf Abruf aus
+TELEMETRY_LEVEL = telemetry.LEVEL_EVENTS
+TELEMETRY_CAPACITY = 64     # Einträge im Ringpuffer
+TELEMETRY_FLUSH_BATCH = 40  # Ab so vielen Einträgen wird bei LEVEL_BATCH ausgegeben
+TELEMETRY_FLUSH_LINES = 2   # Höchstens so viele Zeilen pro Regeltakt (115200 Baud: ca. 6 ms je Zeile)
+
+# Laufzeit: "loop" = sequentielle main_loop() (Fallback), "async" = uasyncio-Tasks,
+# "timer" = Servo-Updates per Hardware-Timer, Hauptschleife nur für Netzwerk
+RUNTIME = "loop"
+NETWORK_POLL_INTERVAL = 10  # Abfrageintervall des Sockets im Timer-Modus (und uasyncio ohne _io_queue) in ms
+
+# Netzwerk Parameter
+MAX_PACKETS_PER_TICK = 32  # Obergrenze pro Tick, damit eine Flut den Takt nicht blockiert
+RECV_BUFFER_SIZE = 512     # Größtes erwartetes Datagramm, längere werden abgeschnitten
+
+# Watchdog im automatischen Modus: Bleiben Sollwerte länger als COMMAND_TIMEOUT aus
+# (Sender weg, WLAN unterbrochen), in STOP_RAMP ms auf Stillstand herunterfahren
+COMMAND_TIMEOUT = 1000  # ms, 0 = aus (letzten Sollwert unbegrenzt halten)
+STOP_RAMP = 500         # ms
+
+# Mehrere Sender (siehe sources.py): Sollwerte nur vom lebenden Sender mit der höchsten
+# Priorität, Duplikate und umsortierte Datagramme je Sender verworfen. Braucht recvfrom()
+# statt readinto() und allokiert deshalb pro Datagramm.
+SOURCE_ARBITRATION = False
+SOURCE_PRIORITIES = {}  # IP → Priorität, z.B. {"192.168.43.20": 10} für ein Handy als Übersteuerung
+SOURCE_LEASE = 1000     # ms ohne Datagramm, bis ein Sender die Kontrolle verliert
+
+# Flotte: Geräte-ID für Flotten-Frames (protocol.FLEET_MAGIC), je Board in DEVICE_CONFIG
+# hinterlegt, z.B. mpremote fs cp device.json : mit {"device_id": 3}
+DEVICE_CONFIG = "device.json"
+DEVICE_ID = None  # Ohne Konfigurationsdatei: None = Flotten-Frames nur für Moduswechsel auswerten
+
+# Uhrensynchronisation (siehe clocksync.py): Befehle mit execute_at wirken auf allen
+# Geräten gleichzeitig. Zeitgeber z.B. python tools/udpgen.py sync auf dem Sende-Rechner.
+CLOCK_SYNC = False
+SYNC_HOST = None       # Adresse des Zeitgebers, None = Broadcast
+SYNC_PORT = 8082
+SCHEDULE_CAPACITY = 8  # Geplante Befehle, die gleichzeitig ausstehen können
+SYNC_WAIT_MARGIN_US = 5000  # main_loop wartet auf die Antwort höchstens bis so kurz vor der Deadline
+
+# Leerlauf (siehe power.py): Bei unveränderten Duty-Werten entfallen Schreibzugriffe und
+# Konsolenausgaben, die sequentielle Schleife wartet dann auf Datagramme statt im Regeltakt
+# zu laufen. Nach SLEEP_AFTER zusätzlich WLAN-Stromsparmodus (bzw. lightsleep).
+IDLE_GOVERNOR = True
+IDLE_AFTER = 1000      # ms ohne Änderung bis zum Leerlauf
+IDLE_INTERVAL = 250    # Längste Wartezeit im Leerlauf in ms, Datagramme wecken sofort
+SLEEP_AFTER = 30000    # ms ohne Änderung bis zum Schlaf
+SLEEP_INTERVAL = 1000
+SLEEP_MODE = "poll"    # "poll" = auf Datagramme warten, "lightsleep" = machine.lightsleep (Pakete
+                       # wecken nicht, PWM pausiert je nach Port - nur für Dauerrotations-Servos)
+LIGHTSLEEP_MS = 100
+
+# Latenzmessung Empfang → Duty (siehe latency.py), per UDP-Abfrage umschaltbar:
+#   {"query": "latency_on"}, {"query": "latency"}, {"query": "latency_reset"}
+# {"query": "heap"} misst zusätzlich den größten freien Block (siehe heap.probe())
+LATENCY_INSTRUMENTATION = False
+QUERY_REPLY_PORT = 8081  # Antwort per Broadcast, wenn die Abfrage kein "reply_to" enthält
+
+# Speicherbereinigung (siehe heap.py)
+GC_ALLOC_BUDGET = 4096   # Nach so vielen neu allokierten Bytes an einem Leerlaufpunkt sammeln
+GC_MIN_SLACK_US = 8000   # Nur sammeln, wenn bis zur nächsten Deadline noch so viel Zeit ist
+
+current_mode = "manual"  # Startmodus: "manual", "automatic", "playback" oder "poti"
+rightAngle = None  # Zehntelgrad (0-1800), siehe protocol.py
+leftAngle = None
+dropped_packets = 0  # Veraltete Sollwerte, die beim Leeren der Queue verworfen wurden
+last_command_time = 0  # ticks_ms des letzten Sollwerts (für den Watchdog)
+watchdog_timeouts = 0  # Wie oft der Watchdog angehalten hat
+watchdog_tripped = False
+
+# Vorallokierte Empfangspuffer: einer hält den neuesten Sollwert, in den anderen wird gelesen
+recv_buffers = (bytearray(RECV_BUFFER_SIZE), bytearray(RECV_BUFFER_SIZE))
+recv_lengths = array("H", [0, 0])
+
+# Geplante Befehle (execute_at) als Ringpuffer: lokale Ausführungszeit, Winkel, Modus-Index
+scheduled_at = array("i", bytes(4 * SCHEDULE_CAPACITY))
+scheduled_right = array("h", bytes(2 * SCHEDULE_CAPACITY))
+scheduled_left = array("h", bytes(2 * SCHEDULE_CAPACITY))
+scheduled_mode = bytearray(SCHEDULE_CAPACITY)
+scheduled_head = 0
+scheduled_count = 0
+schedule_stats = array("I", [0, 0, 0])  # Ausgeführt, verspätet angekommen, übergelaufen
+
+# Ringpuffer für die Debug-Ausgabe, auf der REPL mit log.flush() abrufbar
+log = telemetry.TelemetryLog(TELEMETRY_CAPACITY, TELEMETRY_LEVEL, DUTY_ONE)
+
+def create_bank():
+    """
+    Legt die Servos mit dem konfigurierten Backend an
+    """
+    if SERVO_BACKEND == "pca9685":
+        from machine import I2C
+        i2c = I2C(scl=Pin(PCA9685_SCL), sda=Pin(PCA9685_SDA), freq=400000)
+        backend = PCA9685Backend(i2c, PCA9685_ADDRESS)
+    else:
+        backend = PWMBackend(DUTY_OUTPUT)
+    return ServoBank(backend, SERVO_PINS, SERVO_STOP, SERVO_FULL_FORWARD)
+
+def angle_to_speed(angle):
+    """
+    Winkel in Zehntelgrad (0-1800) → Geschwindigkeit 0..SPEED_MAX
+    """
+    if angle <= 0:
+        return 0
+    if angle >= 1800:
+        return SPEED_MAX
+    return angle * SPEED_MAX // 1800
+
+
+# Animation Variablen
+bank = None  # ServoBank, wird in init_servos() angelegt
+profile = None  # profiles.MotionProfile der Übergänge
+player = None  # choreo.ChoreoPlayer, solange eine Choreografie geladen ist
+playout = None  # jitter.JitterBuffer für Sollwert-Ströme
+boot_first_duty_ms = 0  # ticks_ms der ersten Duty-Ausgabe seit Reset (Startzeit), 0 = noch keine
+boot_heap_free = 0      # Freier Heap zu diesem Zeitpunkt
+
+def load_device_id():
+    """
+    Geräte-ID aus DEVICE_CONFIG, sonst DEVICE_ID
+    """
+    try:
+        with open(DEVICE_CONFIG) as f:
+            device_id = int(ujson.load(f)["device_id"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return DEVICE_ID
+    if not 0 <= device_id <= 255:
+        print("Ungültige Geräte-ID:", device_id)
+        return DEVICE_ID
+    return device_id
+
+def apply_settings():
+    """
+    Überträgt die Konfiguration auf die Hilfsmodule (zur Laufzeit, nicht beim Import)
+    """
+    latency.enabled = LATENCY_INSTRUMENTATION
+    protocol.device_id = load_device_id()
+    wifi.verbose = log.level >= telemetry.LEVEL_EVENTS
+    clocksync.enabled = CLOCK_SYNC
+    clocksync.host = SYNC_HOST
+    clocksync.port = SYNC_PORT
+    sources.enabled = SOURCE_ARBITRATION
+    sources.priorities = SOURCE_PRIORITIES
+    sources.lease = SOURCE_LEASE
+    sources.reset()
+    power.enabled = IDLE_GOVERNOR
+    power.idle_after = IDLE_AFTER
+    power.idle_interval = IDLE_INTERVAL
+    power.sleep_after = SLEEP_AFTER
+    power.sleep_interval = SLEEP_INTERVAL
+    power.sleep_mode = SLEEP_MODE
+    power.lightsleep_ms = LIGHTSLEEP_MS
+    power.wlan = wifi.wlan
+    poti.center = POTI_CENTER
+    poti.tolerance = POTI_TOLERANCE
+    poti.hysteresis = POTI_HYSTERESIS
+    poti.oversample = POTI_OVERSAMPLE
+    poti.window = max(1, min(POTI_WINDOW, poti.MAX_WINDOW))
+    poti.init(ADC(POTI_ADC))
+
+def init_servos():
+    """
+    Servos anlegen und erste zufällige Zielgeschwindigkeiten setzen
+    """
+    global bank, profile, playout
+    bank = create_bank()
+    if calibration.load(bank, CALIBRATION_FILE) and log.level >= telemetry.LEVEL_EVENTS:
+        print("Kalibrierung geladen:", list(bank.stop), list(bank.full))
+    profile = profiles.MotionProfile(MOTION_PROFILE, TRANSITION_TIME, PROFILE_STEPS, PROFILE_RAMP, ACCEL_LIMIT)
+    playout = jitter.JitterBuffer(JITTER_CAPACITY, JITTER_MIN_DELAY, JITTER_MAX_DELAY, UPDATE_INTERVAL)
+    motion.init(bank, profile, PHASE_DURATION, TRANSITION_TIME)
+    motion.start(time.ticks_ms())
+
+def advance_manual_phase(current_time):
+    """
+    Startet nach PHASE_DURATION eine neue Phase mit neuen Zufallszielen
+    """
+    if motion.advance(current_time) and log.level >= telemetry.LEVEL_EVENTS:
+        print("Neue Ziele:", list(bank.target))
+
+def update_automatic_speeds():
+    """
+    Berechnet die Geschwindigkeiten aus den zuletzt empfangenen Winkeln
+    bzw. bei einem Sollwert-Strom aus dem verzögert abgespielten Verlauf
+    """
+    now = time.ticks_ms()
+    if playout.sample(now):
+        bank.set_speed(0, angle_to_speed(playout.right))
+        bank.set_speed(1, angle_to_speed(playout.left))
+    elif rightAngle is not None and leftAngle is not None:
+        # Berechne Geschwindigkeiten basierend auf den Winkeln (0-180° → 0..SPEED_MAX)
+        bank.set_speed(0, angle_to_speed(rightAngle))
+        bank.set_speed(1, angle_to_speed(leftAngle))
+    else:
+        # Falls keine Winkel empfangen wurden, halte die Servos an
+        bank.stop_all()
+        return
+    if COMMAND_TIMEOUT:
+        apply_watchdog(now)
+
+def apply_watchdog(now):
+    """
+    Fährt nach COMMAND_TIMEOUT ohne Sollwert linear in STOP_RAMP ms auf Stillstand,
+    danach verfallen die Sollwerte (allokationsfrei, läuft auch im Timer-Update)
+    """
+    global rightAngle, leftAngle, watchdog_timeouts, watchdog_tripped
+    silence = time.ticks_diff(now, last_command_time) - COMMAND_TIMEOUT
+    if silence <= 0:
+        watchdog_tripped = False
+        return
+    if not watchdog_tripped:
+        watchdog_tripped = True
+        watchdog_timeouts += 1
+    if silence >= STOP_RAMP:
+        rightAngle = None
+        leftAngle = None
+        playout.clear()
+        bank.stop_all()
+        return
+    for channel in range(bank.count):
+        bank.speed[channel] = bank.speed[channel] * (STOP_RAMP - silence) // STOP_RAMP
+
+def motion_settled():
+    """
+    Ob der aktuelle Modus ohne neue Datagramme nichts mehr ändert
+    """
+    if current_mode == "manual" or current_mode == "poti" or scheduled_count or playout.count > 1:
+        return False
+    if COMMAND_TIMEOUT and rightAngle is not None:
+        return False  # Der Watchdog fährt den gehaltenen Sollwert noch herunter
+    if current_mode == "playback":
+        return player is None or player.finished
+    return True
+
+def write_duties():
+    """
+    Setzt die PWM-Werte für die aktuellen Geschwindigkeiten
+    """
+    if power.enabled:
+        now = time.ticks_ms()
+        if not bank.pending() and motion_settled():
+            power.settled(now)  # Nichts Neues: kein Schreibzugriff, keine Telemetrie
+            return
+        power.active(now)
+
+    if latency.enabled:
+        t = time.ticks_us()
+    bank.write()
+    if latency.enabled:
+        latency.record(latency.WRITE, t)
+        latency.packet_written()
+    if not boot_first_duty_ms:
+        mark_first_duty()
+
+    if current_mode == "manual":
+        mode = telemetry.MODE_MANUAL
+    elif current_mode == "playback":
+        mode = telemetry.MODE_PLAYBACK
+    elif current_mode == "poti":
+        mode = telemetry.MODE_POTI
+    else:
+        mode = telemetry.MODE_AUTOMATIC
+    log.record(mode, bank.speed[0], bank.speed[1], bank.duty[0], bank.duty[1])
+
+def mark_first_duty():
+    """
+    Startzeit (Reset → erste Duty-Ausgabe, inkl. Übersetzen/Laden der Module) und freier Heap
+    """
+    global boot_first_duty_ms, boot_heap_free
+    boot_first_duty_ms = time.ticks_ms() or 1
+    boot_heap_free = gc.mem_free()
+
+def run_manual_mode():
+    current_time = time.ticks_ms()
+    advance_manual_phase(current_time)
+    if latency.enabled:
+        t = time.ticks_us()
+    motion.update(current_time)
+    if latency.enabled:
+        latency.record(latency.COMPUTE, t)
+    write_duties()
+
+def run_automatic_mode():
+    if latency.enabled:
+        t = time.ticks_us()
+    update_automatic_speeds()
+    if latency.enabled:
+        latency.record(latency.COMPUTE, t)
+    write_duties()
+
+def run_poti_mode():
+    if latency.enabled:
+        t = time.ticks_us()
+    poti.update()
+    poti.apply(bank)
+    if latency.enabled:
+        latency.record(latency.COMPUTE, t)
+    write_duties()
+
+def run_playback_mode():
+    if latency.enabled:
+        t = time.ticks_us()
+    player.update(time.ticks_ms())
+    if latency.enabled:
+        latency.record(latency.COMPUTE, t)
+    write_duties()
+
+def start_playback():
+    """
+    Öffnet CHOREO_FILE und startet die Wiedergabe von vorn.
+    Rückgabe: False, wenn die Datei fehlt oder ungültig ist
+    """
+    global player
+    stop_playback()
+    try:
+        player = choreo.ChoreoPlayer(CHOREO_FILE, bank, CHOREO_CHUNK_RECORDS, PROFILE_STEPS)
+    except (OSError, ValueError) as e:
+        print("Choreografie-Fehler:", e)
+        return False
+    player.start(time.ticks_ms())
+    if log.level >= telemetry.LEVEL_EVENTS:
+        print(f"Wiedergabe: {CHOREO_FILE}")
+    return True
+
+def stop_playback():
+    global player
+    if player is not None:
+        player.close()
+        player = None
+
+def set_mode(mode):
+    """
+    Wechselt den Betriebsmodus, beim Verlassen von "playback" wird die Datei geschlossen
+    """
+    global current_mode
+    if mode == current_mode:
+        return
+    if mode == "playback" and not start_playback():
+        return
+    if mode == "poti":
+        poti.reset()  # Filter nicht mit Werten von vor dem Wechsel starten
+    previous = current_mode
+    # Erst umschalten, dann aufräumen: ein Timer-Update dazwischen darf player nicht mehr benutzen
+    current_mode = mode
+    wake_control()
+    if previous == "playback":
+        stop_playback()
+        if mode == "manual":
+            # Die Wiedergabe hat current/target überschrieben: neue Phase ab den aktuellen Geschwindigkeiten
+            motion.restart(time.ticks_ms())
+
+def run_control_tick():
+    """
+    Ein Regeltakt im aktuellen Modus
+    """
+    if scheduled_count:
+        run_due_commands(time.ticks_ms(), UPDATE_INTERVAL // 2)
+    if current_mode == "manual":
+        run_manual_mode()
+    elif current_mode == "playback":
+        run_playback_mode()
+    elif current_mode == "poti":
+        run_poti_mode()
+    else:
+        run_automatic_mode()
+
+def print_status():
+    """
+    Debug-Ausgabe des zuletzt gesetzten Zustands (nur LEVEL_CONSOLE)
+    """
+    if current_mode == "manual" or current_mode == "playback":
+        print(" | ".join(f"Servo{channel + 1}: {bank.speed[channel]}" for channel in range(bank.count)))
+    elif current_mode == "poti":
+        print(f"Poti: {poti.held} -> Servo1={bank.speed[0]}, Servo2={bank.speed[1]}")
+    elif rightAngle is not None and leftAngle is not None:
+        print(f"Automatischer: Servo1={bank.speed[0]}, Servo2={bank.speed[1]}")
+    else:
+        print("Servos angehalten, da keine Winkel empfangen wurden.")
+
+
+def report_status(limit=TELEMETRY_FLUSH_LINES):
+    """
+    Gibt je nach Telemetrie-Level den Zustand sofort oder den Ringpuffer blockweise aus.
+    limit: höchstens so viele Zeilen aus dem Puffer, damit die Ausgabe den Takt nicht blockiert
+    """
+    if log.level >= telemetry.LEVEL_CONSOLE:
+        if not power.quiet:
+            print_status()
+    elif log.level >= telemetry.LEVEL_BATCH and log.count >= TELEMETRY_FLUSH_BATCH:
+        log.flush(limit)
+
+def report_stats(ticker):
+    if log.level >= telemetry.LEVEL_EVENTS:
+        print(ticker.report())
+        print(heap.report())
+        print(f"Start: erste Duty {boot_first_duty_ms} ms nach Reset, Heap danach frei {boot_heap_free} B")
+        if wifi.wlan is not None:
+            print(wifi.report())
+        if playout.frames:
+            print(playout.report())
+        if clocksync.enabled:
+            print(clocksync.report())
+        if power.enabled:
+            print(power.report())
+        if current_mode == "poti":
+            print(poti.report())
+        if sources.enabled:
+            print(sources.report())
+            sources.reset_stats()
+        print(f"Ausgabe: {bank.writes} Schreibzugriffe, {bank.redundant} unverändert ausgelassen, "
+              f"Watchdog: {watchdog_timeouts}x angehalten")
+    ticker.reset_stats()
+
+def handle_query(sock):
+    """
+    Beantwortet eine UDP-Abfrage (protocol.query) mit einem JSON-Datagramm
+    """
+    if protocol.query == "latency_on":
+        latency.enabled = True
+    elif protocol.query == "latency_off":
+        latency.enabled = False
+    elif protocol.query == "latency_reset":
+        latency.reset()
+    elif protocol.query == "heap":
+        heap.probe()  # Größter Block nur auf Abruf, die Messung blockiert den Takt
+    elif protocol.query != "latency":
+        raise ValueError("Unbekannte Abfrage")
+
+    reply = latency.summary()
+    reply["dropped_packets"] = dropped_packets
+    reply["mode"] = current_mode
+    reply["wifi"] = wifi.stats()
+    reply["jitter"] = playout.stats()
+    reply["clock"] = clocksync.stats()
+    reply["power"] = power.stats()
+    reply["heap"] = heap.stats()
+    if sources.enabled:
+        reply["sources"] = sources.stats()
+    reply["poti"] = poti.stats()
+    reply["boot"] = {"first_duty_ms": boot_first_duty_ms, "heap_free": boot_heap_free}
+    reply["output"] = {"writes": bank.writes, "redundant": bank.redundant, "watchdog_timeouts": watchdog_timeouts}
+    reply["scheduled"] = {"executed": schedule_stats[0], "late": schedule_stats[1], "overflows": schedule_stats[2]}
+    # readinto() liefert keine Absenderadresse, deshalb Ziel aus der Abfrage oder Broadcast
+    if protocol.reply_to:
+        addr = (protocol.reply_to[0], protocol.reply_to[1])
+    else:
+        addr = ("255.255.255.255", QUERY_REPLY_PORT)
+    sock.sendto(ujson.dumps(reply), addr)
+
+def apply_setpoint(right, left, mode):
+    """
+    Übernimmt Winkel bzw. Moduswechsel eines Datagramms oder geplanten Befehls
+    """
+    global rightAngle, leftAngle, last_command_time
+    rightAngle = right
+    leftAngle = left
+    if right is not None and left is not None:
+        last_command_time = time.ticks_ms()
+        set_mode("automatic")
+    elif mode == "manual" or mode == "playback" or mode == "poti":
+        set_mode(mode)
+
+def schedule_command(at):
+    """
+    Merkt den zuletzt geparsten Befehl für die lokale Zeit at (ticks_ms) vor
+    """
+    global scheduled_count
+    if scheduled_count == SCHEDULE_CAPACITY:
+        # Voll: ältesten Befehl sofort ausführen statt ihn zu verlieren
+        schedule_stats[2] += 1
+        run_due_commands(None, 0)
+    i = (scheduled_head + scheduled_count) % SCHEDULE_CAPACITY
+    scheduled_at[i] = at
+    scheduled_right[i] = protocol.ANGLE_NONE if protocol.right is None else protocol.right
+    scheduled_left[i] = protocol.ANGLE_NONE if protocol.left is None else protocol.left
+    scheduled_mode[i] = protocol.MODE_NAMES.index(protocol.mode) if protocol.mode in protocol.MODE_NAMES else 0
+    scheduled_count += 1
+
+def run_due_commands(now, window):
+    """
+    Führt alle geplanten Befehle aus, die bis now + window fällig sind (window = halber
+    Aufrufabstand: es wirkt der Aufruf, der dem Zeitpunkt am nächsten liegt).
+    now=None: nur den ältesten.
+    """
+    global scheduled_head, scheduled_count
+    while scheduled_count:
+        i = scheduled_head
+        if now is not None and time.ticks_diff(scheduled_at[i], now) > window:
+            break
+        right = scheduled_right[i]
+        left = scheduled_left[i]
+        if power.enabled:
+            power.due()
+        apply_setpoint(None if right == protocol.ANGLE_NONE else right,
+                       None if left == protocol.ANGLE_NONE else left,
+                       protocol.MODE_NAMES[scheduled_mode[i]])
+        scheduled_head = (i + 1) % SCHEDULE_CAPACITY
+        scheduled_count -= 1
+        schedule_stats[0] += 1
+        if now is None:
+            break
+
+def handle_packet(data, length, sock=None):
+    """
+    Wertet ein Datagramm (JSON oder Binär-Frame) aus und übernimmt Winkel bzw. Moduswechsel
+    """
+    try:
+        if protocol.is_sync(data):
+            # Zeitstempel zuerst, bevor das Parsen die Messung verfälscht
+            clocksync.handle_reply(data, length, time.ticks_ms())
+            return
+        if power.enabled:
+            power.traffic(time.ticks_ms())
+
+        if latency.enabled:
+            t = time.ticks_us()
+        protocol.decode(data, length)
+        if latency.enabled:
+            t = latency.record(latency.PARSE, t)
+
+        if protocol.query is not None:
+            # Abfragen ändern keine Sollwerte
+            if sock is not None:
+                handle_query(sock)
+            return
+
+        if not protocol.addressed:
+            # Flotten-Frame ohne Platz für dieses Gerät: Sollwerte bleiben, nur ein Moduswechsel gilt
+            if protocol.mode == "manual" or protocol.mode == "playback" or protocol.mode == "poti":
+                set_mode(protocol.mode)
+            return
+
+        if protocol.execute_at is not None and clocksync.synced():
+            at = clocksync.to_local(protocol.execute_at)
+            if time.ticks_diff(at, time.ticks_ms()) > 0:
+                schedule_command(at)
+                return
+            schedule_stats[1] += 1  # Zu spät angekommen: sofort ausführen
+
+        if protocol.samples:
+            playout.push(data, time.ticks_ms())
+        elif playout.count:
+            playout.clear()  # Sender schickt wieder Einzel-Sollwerte
+        apply_setpoint(protocol.right, protocol.left, protocol.mode)
+
+        if latency.enabled:
+            latency.record(latency.DECIDE, t)
+
+    except Exception as e:
+        print("Paket-Fehler:", e)
+
+def recv_into(sock, buf):
+    """
+    Liest ein Datagramm in den vorallokierten Puffer.
+    Rückgabe: Anzahl Bytes, 0 wenn nichts anliegt
+    """
+    try:
+        # readinto() liefert beim non-blocking Socket None, wenn nichts anliegt
+        n = sock.readinto(buf)
+    except OSError:
+        return 0
+    return n or 0
+
+def recv_from(sock, buf):
+    """
+    Wie recv_into(), aber mit Absender für die Arbitrierung (recvfrom allokiert).
+    Die Sequenznummer wird schon bei Ankunft geprüft: Ein umsortiertes älteres Datagramm
+    darf ein bereits empfangenes neueres nicht als "neuesten" Sollwert verdrängen.
+    Rückgabe: Anzahl Bytes, 0 wenn nichts anliegt, -1 für ein übersteuertes, doppeltes
+    oder umsortiertes Datagramm
+    """
+    try:
+        data, addr = sock.recvfrom(len(buf))
+    except OSError:
+        return 0
+    n = len(data)
+    if n == 0:
+        return 0
+    buf[:n] = data
+    if protocol.is_sync(buf) or protocol.has_query(buf, n):
+        return n  # Gehen alle Sender an
+    if not sources.admit(addr, time.ticks_ms()):
+        return -1
+    # Strom-Samples sortiert der Jitter-Puffer selbst ein, Wiederholungen gehören zum Format
+    if not protocol.is_stream(buf) and not sources.accept_seq(sources.slot, protocol.peek_seq(buf, n)):
+        return -1
+    if sources.switched:
+        sources.switched = False
+        playout.clear()  # Der Zeitbezug gehörte zum vorigen Sender
+        if log.level >= telemetry.LEVEL_EVENTS:
+            print("Sender:", addr[0])
+    return n
+
+def receive_packets(sock):
+    """
+    Leert die Empfangs-Queue des Sockets vollständig.
+    Nur der neueste Sollwert wird übernommen, ältere Datagramme nur dann ausgewertet,
+    wenn protocol.must_handle() zutrifft (Moduswechsel, Abfrage, Strom, Synchronisation ...).
+    Gibt die Anzahl gelesener Datagramme zurück.
+    """
+    global dropped_packets
+
+    latest = -1
+    spare = 0
+    count = 0
+    start = 0
+    latest_start = 0
+    # Einmal pro Aufruf lesen: eine Abfrage kann die Messung mitten in der Schleife umschalten
+    measure = latency.enabled
+    while count < MAX_PACKETS_PER_TICK:
+        if measure:
+            start = time.ticks_us()
+        if sources.enabled:
+            n = recv_from(sock, recv_buffers[spare])
+        else:
+            n = recv_into(sock, recv_buffers[spare])
+        if n == 0:
+            # Keine weiteren Daten im Puffer (non-blocking Socket)
+            break
+        count += 1
+        if n < 0:
+            continue  # Anderer Sender hat Vorrang oder älter als das zuletzt angenommene
+        if measure:
+            latency.record(latency.RECEIVE, start)
+
+        if latest >= 0:
+            # Veralteter Sollwert - nur Moduswechsel, Abfragen, Strom-Samples,
+            # Synchronisation und geplante Befehle zählen noch
+            buf = recv_buffers[latest]
+            if protocol.must_handle(buf, recv_lengths[latest]):
+                handle_packet(buf, recv_lengths[latest], sock)
+            else:
+                dropped_packets += 1
+        recv_lengths[spare] = n
+        latest = spare
+        spare = 1 - spare
+        latest_start = start
+
+    if latest >= 0:
+        handle_packet(recv_buffers[latest], recv_lengths[latest], sock)
+        if measure and latency.enabled:
+            latency.packet_received(latest_start)
+        if wifi.awaiting_packet:
+            wifi.packet_received()  # Zeit bis zum ersten Paket nach Start bzw. Unterbrechung
+    return count
+
+
+def open_socket(port):
+    """
+    Erzeugt den non-blocking UDP-Socket für den Broadcast-Empfang
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.setblocking(False)  # Use a non-blocking socket
+    print(f"Warte auf UDP-Broadcast auf Port {port}...")
+    return sock
+
+
+def align_ticker(ticker):
+    """
+    Legt das Taktraster auf Vielfache von UPDATE_INTERVAL der Sendeuhr:
+    synchronisierte Geräte ticken dann gleichzeitig und führen geplante Befehle im selben Tick aus
+    """
+    clocksync.updated = False
+    phase = clocksync.to_sender(time.ticks_ms()) % UPDATE_INTERVAL
+    delay_us = (UPDATE_INTERVAL - phase) * 1000
+    # Auf 1 ms genau (Auflösung der Sendeuhr) - kleinere Abweichungen nicht nachregeln
+    if abs(time.ticks_diff(ticker.deadline, time.ticks_add(time.ticks_us(), delay_us))) > 1500:
+        ticker.align(delay_us)
+
+def await_sync_reply(sock, ticker):
+    """
+    Sequentielle Schleife: Antwort des Zeitgebers noch in diesem Tick abholen. Sonst bliebe
+    sie bis zum nächsten Tick liegen und der Empfangszeitstempel wäre um bis zu einen Takt zu spät.
+    """
+    while clocksync.pending() and ticker.remaining_us() > SYNC_WAIT_MARGIN_US:
+        if receive_packets(sock) == 0:
+            time.sleep_ms(1)
+
+def main_loop(port=8080):
+    """
+    Sequentielle Hauptschleife (Fallback ohne uasyncio)
+    """
+    init_servos()
+    sock = open_socket(port)
+    apply_settings()
+    power.init(sock)
+
+    # Fester Takt gegen absolute Deadlines statt sleep nach der Arbeit
+    ticker = scheduler.Ticker(UPDATE_INTERVAL, SCHEDULER_POLICY)
+    last_stats_time = time.ticks_ms()
+    heap.init(GC_ALLOC_BUDGET)
+
+    while True:
+        try:
+            # Alle seit dem letzten Tick angekommenen Datagramme abholen
+            receive_packets(sock)
+        except Exception as e:
+            print(f"Netzwerkfehler: {e}")
+
+        if clocksync.updated:
+            align_ticker(ticker)
+        run_control_tick()
+        report_status()
+        wifi.poll()  # WLAN-Überwachung aus boot.py, blockiert nicht
+        if clocksync.enabled:
+            clocksync.poll(sock)
+            await_sync_reply(sock, ticker)
+
+        if time.ticks_diff(time.ticks_ms(), last_stats_time) >= STATS_INTERVAL:
+            report_stats(ticker)
+            last_stats_time = time.ticks_ms()
+
+        # Leerlaufpunkt: Arbeit des Ticks erledigt, Zeit bis zur Deadline für die GC nutzen
+        heap.collect_if_idle(ticker.remaining_us(), GC_MIN_SLACK_US, GC_ALLOC_BUDGET)
+        if power.state == power.STATE_ACTIVE:
+            ticker.wait()
+        else:
+            # Leerlauf: bis zum nächsten Datagramm oder Leerlauf-Intervall, die Pause zählt nicht als Tick
+            power.wait()
+            ticker.resume()
+            if clocksync.synced():
+                clocksync.updated = True  # Raster wieder an der Sendeuhr ausrichten
+
+
+# uasyncio-Laufzeit: Netzwerk, Regelung und Telemetrie als eigene Tasks
+asyncio = None  # Wird erst in main_async() importiert, damit main_loop() ohne uasyncio auskommt
+_io_queue = None  # Interne I/O-Warteschlange von uasyncio (privat, kann sich ändern), sonst None
+_read_poller = None  # Fallback ohne _io_queue: select.poll() auf den Socket
+_wake = None  # asyncio.Event: weckt control_task aus dem Leerlauf (set_mode)
+
+def wake_control():
+    """
+    Beendet die Leerlauf-Wartezeit von control_task sofort (nur uasyncio-Laufzeit)
+    """
+    if _wake is not None:
+        _wake.set()
+
+async def wait_readable(sock):
+    """
+    Kehrt zurück, sobald sock lesbar ist. Mit uasyncio v3 (MicroPython ab 1.13) wie
+    uasyncio.StreamReader.read() über die interne I/O-Warteschlange: der Task schläft bis
+    zur Ankunft. Fehlt die private Warteschlange in einer anderen Version, wird alle
+    NETWORK_POLL_INTERVAL ms mit select.poll() abgefragt.
+    """
+    if _io_queue is not None:
+        yield _io_queue.queue_read(sock)
+        return
+    while not _read_poller.poll(0):
+        await asyncio.sleep_ms(NETWORK_POLL_INTERVAL)
+
+async def network_task(sock):
+    """
+    Wartet auf Lesbarkeit des Sockets und verarbeitet Pakete sofort bei Ankunft
+    """
+    while True:
+        await wait_readable(sock)
+        try:
+            receive_packets(sock)
+        except Exception as e:
+            print(f"Netzwerkfehler: {e}")
+
+        # Neuen Sollwert direkt ausgeben, nicht erst zum nächsten Regeltakt
+        if current_mode == "automatic":
+            run_automatic_mode()
+
+async def control_task(ticker):
+    """
+    Regeltakt mit fester Rate, liest den zuletzt empfangenen Sollwert
+    """
+    while True:
+        idle = power.interval()
+        if idle is not None:
+            # Leerlauf: network_task übernimmt neue Sollwerte sofort, hier genügt ein langsamer Takt.
+            # Ein Moduswechsel (set_mode) weckt sofort, sonst begänne z.B. "poti" erst nach idle ms.
+            _wake.clear()
+            try:
+                await asyncio.wait_for_ms(_wake.wait(), idle)
+            except asyncio.TimeoutError:
+                pass
+            ticker.resume()
+            if clocksync.synced():
+                clocksync.updated = True
+        remaining = ticker.remaining_us()
+        if remaining > 0:
+            await asyncio.sleep_ms((remaining + 999) // 1000)
+        ticker.mark()
+        if clocksync.updated:
+            align_ticker(ticker)
+        run_control_tick()
+        heap.collect_if_idle(ticker.remaining_us(), GC_MIN_SLACK_US, GC_ALLOC_BUDGET)
+
+async def telemetry_task(ticker, sock):
+    """
+    Niedrig priorisierte Debug-Ausgabe, blockiert weder Netzwerk noch Regelung
+    """
+    last_stats_time = time.ticks_ms()
+    while True:
+        await asyncio.sleep_ms(TELEMETRY_INTERVAL)
+        report_status(TELEMETRY_FLUSH_LINES * TELEMETRY_INTERVAL // UPDATE_INTERVAL)
+        wifi.poll()
+        clocksync.poll(sock)
+
+        if time.ticks_diff(time.ticks_ms(), last_stats_time) >= STATS_INTERVAL:
+            report_stats(ticker)
+            last_stats_time = time.ticks_ms()
+
+async def run_tasks(port):
+    global _read_poller
+    init_servos()
+    sock = open_socket(port)
+    apply_settings()
+    power.init(None)  # Warten auf den Socket übernimmt uasyncio
+    if _io_queue is None:
+        import select
+        _read_poller = select.poll()
+        _read_poller.register(sock, select.POLLIN)
+    ticker = scheduler.Ticker(UPDATE_INTERVAL, SCHEDULER_POLICY)
+    heap.init(GC_ALLOC_BUDGET)
+    asyncio.create_task(network_task(sock))
+    asyncio.create_task(telemetry_task(ticker, sock))
+    await control_task(ticker)
+
+def main_async(port=8080):
+    """
+    Hauptprogramm auf Basis von uasyncio. Braucht uasyncio v3 (MicroPython ab 1.13)
+    für asyncio.Event und wait_for_ms().
+    """
+    global asyncio, _io_queue, _wake
+    import uasyncio as asyncio
+    _io_queue = getattr(getattr(asyncio, "core", None), "_io_queue", None)
+    if _io_queue is None:
+        print(f"uasyncio ohne core._io_queue: Socket wird alle {NETWORK_POLL_INTERVAL} ms abgefragt")
+    _wake = asyncio.Event()
+    asyncio.run(run_tasks(port))
+
+
+# Timer-Laufzeit: Bewegung unabhängig von Netzwerk- und Parse-Last
+_servo_update_ref = None  # Vorab gebundene Referenz, damit der Timer-IRQ nichts allokiert
+
+def servo_update(_):
+    """
+    Per micropython.schedule eingeplantes Servo-Update (allokationsfrei).
+    Interpoliert die aktuellen Geschwindigkeiten und setzt die PWM-Werte.
+    """
+    if latency.enabled:
+        t = time.ticks_us()
+    if current_mode == "manual":
+        motion.update(time.ticks_ms())
+    elif current_mode == "playback":
+        player.update(time.ticks_ms())
+    elif current_mode == "poti":
+        poti.update()
+        poti.apply(bank)
+    else:
+        update_automatic_speeds()
+    if latency.enabled:
+        latency.record(latency.COMPUTE, t)
+    write_duties()
+
+def timer_irq(timer):
+    try:
+        micropython.schedule(_servo_update_ref, None)
+    except RuntimeError:
+        # Schedule-Queue voll - dieses Update entfällt, das nächste holt es nach
+        pass
+
+def main_timer(port=8080):
+    """
+    Hauptprogramm mit Hardware-Timer: Der Timer treibt die Servos im Regeltakt,
+    die Schleife kümmert sich nur um Netzwerk und Moduswechsel.
+    """
+    global _servo_update_ref
+    from machine import Timer
+
+    init_servos()
+    sock = open_socket(port)
+    apply_settings()
+    power.init(None)  # Hier nur ausgelassene Schreibzugriffe, der Timer-Takt bleibt
+    _servo_update_ref = servo_update
+    timer = Timer(-1)
+    timer.init(period=UPDATE_INTERVAL, mode=Timer.PERIODIC, callback=timer_irq)
+    heap.init(GC_ALLOC_BUDGET)
+
+    last_status_time = time.ticks_ms()
+    try:
+        while True:
+            try:
+                receive_packets(sock)
+            except Exception as e:
+                print(f"Netzwerkfehler: {e}")
+
+            current_time = time.ticks_ms()
+            if scheduled_count:
+                # Der Timer läuft nicht im Raster der Sendeuhr: auf NETWORK_POLL_INTERVAL genau
+                run_due_commands(current_time, NETWORK_POLL_INTERVAL // 2)
+            if current_mode == "manual":
+                advance_manual_phase(current_time)
+
+            if time.ticks_diff(current_time, last_status_time) >= TELEMETRY_INTERVAL:
+                report_status(TELEMETRY_FLUSH_LINES * TELEMETRY_INTERVAL // UPDATE_INTERVAL)
+                last_status_time = current_time
+            wifi.poll()
+            clocksync.poll(sock)
+
+            # Ein Timer-Update, das während der Sammlung fällig wird, läuft direkt danach
+            heap.collect_if_idle(NETWORK_POLL_INTERVAL * 1000, GC_MIN_SLACK_US, GC_ALLOC_BUDGET)
+
+            time.sleep_ms(NETWORK_POLL_INTERVAL)
+    finally:
+        timer.deinit()
+
+
+def run():
+    """
+    Startet die konfigurierte Laufzeit (aus main.py)
+    """
+    if RUNTIME == "async":
+        main_async()
+    elif RUNTIME == "timer":
+        main_timer()
+    else:
+        main_loop()
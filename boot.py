@@ -1,22 +1,11 @@
-import network
-import time
+import wifi
 
-def connect_wifi(ssid, password):
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
+WIFI_SSID = 'Galaxy Note10+ Henri'
+WIFI_PASSWORD = '12345678'
+# Feste Adresse statt DHCP beschleunigt das (Wieder-)Verbinden, z.B.
+# ('192.168.43.50', '255.255.255.0', '192.168.43.1', '192.168.43.1')
+WIFI_STATIC_IP = None
 
-    if not wlan.isconnected():
-        print('Verbinde mit WLAN...')
-        wlan.connect(ssid, password)
-        timeout = 10
-        while not wlan.isconnected() and timeout > 0:
-            time.sleep(1)
-            timeout -= 1
-
-    if wlan.isconnected():
-        print('Verbunden mit:', ssid)
-        print('IP-Adresse:', wlan.ifconfig()[0])
-    else:
-        print('WLAN-Verbindung fehlgeschlagen')
-
-connect_wifi('Galaxy Note10+ Henri', '12345678')
\ No newline at end of file
+# Kehrt sofort zurück - die Verbindung baut sich im Hintergrund auf,
+# app.py treibt sie mit wifi.poll() weiter
+wifi.start(WIFI_SSID, WIFI_PASSWORD, WIFI_STATIC_IP)
@@ -0,0 +1,200 @@
+import time
+from machine import Pin
+import calibration
+import app
+from servobank import DUTY_ONE
+
+# Kalibrierlauf für die Dauerrotations-Servos: fährt je Kanal den Duty-Bereich von
+# SWEEP_MIN bis SWEEP_MAX ab, findet Totband (Stillstand) und nutzbaren Bereich und
+# speichert die Kennlinie nach calibration.FILE. app.py lädt sie beim Start.
+#
+#   mpremote run calibrate.py   (main.py vorher mit Strg-C anhalten)
+#
+# Mit Drehzahlgeber (TACHO_PINS, z.B. Gabellichtschranke mit Lochscheibe) läuft alles
+# automatisch und die Kennlinie wird gemessen. Ohne gibt man per FLASH-Taste an, wann das
+# Rad stehen bleibt, wieder anläuft und nicht mehr schneller wird - dazwischen linear.
+
+TACHO_PINS = (None, None)  # Je Kanal Eingang des Drehzahlgebers, None = interaktiv
+PULSES_PER_REV = 20        # Impulse pro Umdrehung (Schlitze der Lochscheibe)
+BUTTON_PIN = 0             # FLASH-Taste des NodeMCU (low-aktiv)
+SWEEP_MIN = 60             # Duty-Bereich (10 Bit bei 50 Hz, 60..100 = 1.17..1.95 ms)
+SWEEP_MAX = 100
+SETTLE_MS = 400            # Wartezeit nach jeder Duty-Änderung, bis die Drehzahl steht
+MEASURE_MS = 1000          # Messfenster je Stufe
+STEP_MS = 700              # Interaktiv: Dauer je Stufe
+STILL_PERCENT = 2          # Unter so viel % der Höchstdrehzahl gilt das Rad als stehend
+SATURATION_PERCENT = 97    # Ab so viel % der Höchstdrehzahl ist der Bereich ausgeschöpft
+
+_pulses = 0
+_first_pulse = 0
+_last_pulse = 0
+_pressed = False
+
+
+def _on_pulse(pin):
+    global _pulses, _first_pulse, _last_pulse
+    t = time.ticks_us()
+    if _pulses == 0:
+        _first_pulse = t
+    _last_pulse = t
+    _pulses += 1
+
+def _on_press(pin):
+    global _pressed
+    _pressed = True
+
+def set_duty(bank, channel, duty):
+    """
+    Roher Duty (8.8) an einem Kanal, an der Duty-Tabelle vorbei
+    """
+    bank.backend.write(channel, duty)
+    bank.backend.flush()
+
+def sweep_step(bank):
+    # Viertelstufen, wo die Ausgabe sie auflösen kann. Dithering wirkt nur bei laufenden
+    # Schreibzugriffen, set_duty() schreibt aber einmal je Stufe.
+    return DUTY_ONE if getattr(bank.backend, "output", None) in ("coarse", "dither") else DUTY_ONE // 4
+
+def measure():
+    """
+    Impulsrate im Messfenster in Impulsen pro 1000 s (aus dem Abstand erster → letzter Impuls)
+    """
+    global _pulses
+    _pulses = 0
+    time.sleep_ms(MEASURE_MS)
+    n = _pulses
+    if n < 2:
+        return 0
+    return (n - 1) * 1000000000 // time.ticks_diff(_last_pulse, _first_pulse)
+
+def sweep(bank, channel, tacho):
+    """
+    Misst die Drehzahl je Duty-Stufe. Rückgabe: (duties, rates)
+    """
+    tacho.irq(handler=_on_pulse, trigger=Pin.IRQ_RISING)
+    duties = []
+    rates = []
+    try:
+        for duty in range(SWEEP_MIN << 8, (SWEEP_MAX << 8) + 1, sweep_step(bank)):
+            set_duty(bank, channel, duty)
+            time.sleep_ms(SETTLE_MS)
+            rate = measure()
+            duties.append(duty)
+            rates.append(rate)
+            print(f"  Duty {duty / DUTY_ONE:6.2f}: {rate * 60 // (1000 * PULSES_PER_REV):4d} U/min")
+    finally:
+        tacho.irq(handler=None)
+    return duties, rates
+
+def analyse(duties, rates, points=calibration.POINTS):
+    """
+    Totband und Kennlinie aus einem Durchlauf (Drehzahl als Betrag, rückwärts → vorwärts).
+    Rückgabe: (stop, curve) in 8.8, curve[k] = Duty für k / (points - 1) der Höchstdrehzahl
+    """
+    peak = max(rates)
+    if peak == 0:
+        raise ValueError("keine Impulse - Drehzahlgeber angeschlossen?")
+    still = peak * STILL_PERCENT // 100
+
+    # Längster zusammenhängender Stillstand = Totband
+    best_start = best_end = -1
+    start = None
+    for i in range(len(rates) + 1):
+        if i < len(rates) and rates[i] <= still:
+            if start is None:
+                start = i
+        elif start is not None:
+            if i - 1 - start > best_end - best_start:
+                best_start, best_end = start, i - 1
+            start = None
+    if best_start < 0:
+        raise ValueError("kein Totband im Durchlauf")
+    if len(rates) - best_end < 3:
+        raise ValueError("Vorwärtsbereich zu klein - SWEEP_MAX erhöhen")
+    stop = (duties[best_start] + duties[best_end]) // 2
+
+    # Vorwärtsbereich ab dem Rand des Totbands, Messrauschen glätten (monoton steigend)
+    forward_duties = duties[best_end:]
+    forward_rates = [0]
+    for rate in rates[best_end + 1:]:
+        forward_rates.append(max(rate, forward_rates[-1]))
+    full = forward_rates[-1] * SATURATION_PERCENT // 100
+
+    curve = []
+    for k in range(points):
+        target = full * k // (points - 1)
+        i = 0
+        while forward_rates[i] < target:
+            i += 1
+        if i == 0 or forward_rates[i] == target:
+            curve.append(forward_duties[i])
+        else:
+            low = forward_rates[i - 1]
+            curve.append(forward_duties[i - 1] + (forward_duties[i] - forward_duties[i - 1])
+                         * (target - low) // (forward_rates[i] - low))
+    return stop, curve
+
+def sweep_interactive(bank, channel, button, points=calibration.POINTS):
+    """
+    Fährt den Bereich langsam ab, die Taste markiert die drei Stellen.
+    Rückgabe: (stop, curve) wie analyse(), linear zwischen Totband und voller Geschwindigkeit
+    """
+    global _pressed
+    print("  Taste drücken, wenn das Rad 1) stehen bleibt, 2) wieder anläuft, 3) nicht mehr schneller wird")
+    marks = []
+    _pressed = False
+    button.irq(handler=_on_press, trigger=Pin.IRQ_FALLING)
+    try:
+        for duty in range(SWEEP_MIN << 8, (SWEEP_MAX << 8) + 1, DUTY_ONE):
+            set_duty(bank, channel, duty)
+            time.sleep_ms(STEP_MS)
+            if _pressed:
+                _pressed = False  # Eine Markierung je Stufe, entprellt sich so von selbst
+                marks.append(duty)
+                print(f"  Markierung {len(marks)} bei Duty {duty / DUTY_ONE:.0f}")
+                if len(marks) == 3:
+                    break
+    finally:
+        button.irq(handler=None)
+    if len(marks) < 3:
+        raise ValueError("Durchlauf ohne drei Markierungen beendet")
+    edge = marks[1] - DUTY_ONE  # Letzte Stufe vor dem Anlaufen
+    stop = (marks[0] + edge) // 2
+    curve = [edge + (marks[2] - edge) * k // (points - 1) for k in range(points)]
+    return stop, curve
+
+def run():
+    bank = app.create_bank()
+    bank.stop_all()
+    bank.write()
+    stops = []
+    curves = []
+    try:
+        for channel in range(bank.count):
+            print(f"Kanal {channel + 1} (Pin {bank.pins[channel]}):")
+            if TACHO_PINS[channel] is None:
+                button = Pin(BUTTON_PIN, Pin.IN, Pin.PULL_UP)
+                stop, curve = sweep_interactive(bank, channel, button)
+            else:
+                tacho = Pin(TACHO_PINS[channel], Pin.IN)
+                stop, curve = analyse(*sweep(bank, channel, tacho))
+            set_duty(bank, channel, stop)
+            stops.append(stop)
+            curves.append(curve)
+            print(f"  Stillstand {stop / DUTY_ONE:.2f}, Totband bis {curve[0] / DUTY_ONE:.2f}, "
+                  f"volle Geschwindigkeit ab {curve[-1] / DUTY_ONE:.2f}")
+    except ValueError as e:
+        print("Kalibrierung fehlgeschlagen:", e)
+        return False
+    finally:
+        bank.invalidate()
+        bank.stop_all()
+        bank.write()
+
+    calibration.save(stops, curves, app.CALIBRATION_FILE)
+    print(f"Kalibrierung gespeichert: {app.CALIBRATION_FILE}")
+    return True
+
+
+if __name__ == "__main__":
+    run()
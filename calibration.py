@@ -0,0 +1,57 @@
+from array import array
+
+# Kalibriertabelle je Board (little endian), erzeugt mit calibrate.py:
+#   Kopf (8 Bytes): magic b"ZKCA" | version (B) | kanäle (B) | stützstellen (B) | reserviert (B)
+#   je Kanal:       stop (H) | duty je Stützstelle (H)
+# Alle Duty-Werte in 8.8-Festkomma (siehe servobank.py). Stützstelle k ist der Duty, bei dem
+# der Servo k / (stützstellen - 1) seiner vollen Geschwindigkeit erreicht, Stützstelle 0 also
+# der Rand des Totbands. stop liegt in der Mitte des Totbands.
+MAGIC = b"ZKCA"
+VERSION = 1
+HEADER_SIZE = 8
+POINTS = 17
+FILE = "calib.bin"
+
+
+def channel_size(points):
+    return 2 + 2 * points
+
+
+def save(stops, curves, path=FILE):
+    """
+    stops: Stillstands-Duty je Kanal, curves: je Kanal POINTS Duty-Werte (alles 8.8)
+    """
+    data = bytearray(HEADER_SIZE + len(stops) * channel_size(POINTS))
+    data[0:4] = MAGIC
+    data[4] = VERSION
+    data[5] = len(stops)
+    data[6] = POINTS
+    i = HEADER_SIZE
+    for channel in range(len(stops)):
+        # Eine Liste: array.extend() nimmt auf dem Board nur Objekte mit Buffer-Protokoll
+        values = array("H", [stops[channel]] + list(curves[channel]))
+        data[i:i + channel_size(POINTS)] = bytes(values)
+        i += channel_size(POINTS)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def load(bank, path=FILE):
+    """
+    Überträgt die Tabelle aus path in die Duty-Tabellen der ServoBank.
+    Rückgabe: False, wenn es keine passende Tabelle gibt (dann gelten die Konstanten)
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return False
+    if len(data) < HEADER_SIZE or data[0:4] != MAGIC or data[4] != VERSION or data[5] != bank.count:
+        return False
+    points = data[6]
+    if points < 2 or len(data) < HEADER_SIZE + bank.count * channel_size(points):
+        return False
+    values = array("H", data[HEADER_SIZE:HEADER_SIZE + bank.count * channel_size(points)])
+    for channel in range(bank.count):
+        i = channel * (1 + points)
+        bank.calibrate_curve(channel, values[i], values[i + 1:i + 1 + points])
+    return True
@@ -0,0 +1,120 @@
+import time
+import profiles
+
+# Choreografie-Datei (little endian), erzeugt mit tools/choreoc.py:
+#   Kopf (8 Bytes): magic b"ZKCH" | version (B) | kanäle (B) | flags (B) | reserviert (B)
+#   je Keyframe:    dauer_ms (H) | easing (B) | ziel je Kanal (H, Speed 0..1023)
+# Ein Keyframe fährt in dauer_ms mit dem Profil easing von den vorherigen Zielen
+# zu den neuen. Die Datei wird blockweise gelesen, nie vollständig geladen.
+MAGIC = b"ZKCH"
+VERSION = 1
+HEADER_SIZE = 8
+FLAG_LOOP = 0x01
+
+# Easing-Id → Profil (Reihenfolge ist Teil des Dateiformats)
+EASINGS = (profiles.LINEAR, profiles.COSINE, profiles.MINIMUM_JERK, profiles.TRAPEZOID)
+
+
+def record_size(channels):
+    return 3 + 2 * channels
+
+
+class ChoreoPlayer:
+    """
+    Spielt eine Choreografie-Datei auf einer ServoBank ab.
+    Im Speicher liegt nur ein Block aus chunk_records Keyframes.
+    """
+
+    def __init__(self, path, bank, chunk_records=16, steps=64):
+        self.path = path
+        self.bank = bank
+        self.file = open(path, "rb")
+        header = self.file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:4] != MAGIC:
+            raise ValueError("Keine Choreografie-Datei")
+        if header[4] != VERSION:
+            raise ValueError("Unbekannte Choreografie-Version")
+        if header[5] != bank.count:
+            raise ValueError("Kanalzahl passt nicht zur ServoBank")
+        self.loop = bool(header[6] & FLAG_LOOP)
+        self.record_size = record_size(bank.count)
+        self.chunk = bytearray(self.record_size * chunk_records)
+        self.chunk_length = 0  # Gültige Bytes im Block
+        self.offset = 0        # Nächster Keyframe im Block
+        # Ein Profil je Easing, Tabellen werden beim ersten Gebrauch gebacken
+        self.profiles = [profiles.MotionProfile(kind, 1, steps) for kind in EASINGS]
+        self.profile = self.profiles[0]
+        self.segment_start = 0
+        self.keyframes = 0
+        self.finished = False
+
+    def close(self):
+        self.file.close()
+
+    def _read_chunk(self):
+        n = self.file.readinto(self.chunk) or 0
+        # Nur ganze Keyframes verwenden, ein abgeschnittener Rest am Dateiende zählt nicht
+        self.chunk_length = n - n % self.record_size
+        self.offset = 0
+        return self.chunk_length > 0
+
+    def _next_keyframe(self):
+        """
+        Lädt den nächsten Keyframe als neues Segment. False am Ende der Datei.
+        """
+        if self.offset >= self.chunk_length and not self._read_chunk():
+            if not self.loop or self.keyframes == 0:
+                return False
+            self.file.seek(HEADER_SIZE)
+            if not self._read_chunk():
+                return False
+
+        chunk = self.chunk
+        i = self.offset
+        duration = chunk[i] | (chunk[i + 1] << 8)
+        easing = chunk[i + 2]
+        self.profile = self.profiles[easing if easing < len(EASINGS) else 0]
+        bank = self.bank
+        bank.start_phase()
+        i += 3
+        for channel in range(bank.count):
+            bank.target[channel] = chunk[i] | (chunk[i + 1] << 8)
+            i += 2
+        self.offset = i
+        self.keyframes += 1
+
+        self.profile.duration = duration if duration > 0 else 1
+        self.profile.start(bank.max_delta())
+        return True
+
+    def start(self, now):
+        """
+        Spielt ab dem Anfang, ausgehend von den aktuell ausgegebenen Geschwindigkeiten
+        """
+        bank = self.bank
+        for channel in range(bank.count):
+            bank.target[channel] = bank.speed[channel]
+        self.file.seek(HEADER_SIZE)
+        self.chunk_length = 0
+        self.offset = 0
+        self.keyframes = 0
+        self.finished = not self._next_keyframe()
+        self.segment_start = now
+
+    def update(self, now):
+        """
+        Berechnet die Geschwindigkeiten zum Zeitpunkt now (ticks_ms)
+        """
+        if self.finished:
+            self.bank.hold()
+            return
+        elapsed = time.ticks_diff(now, self.segment_start)
+        # Abgelaufene Segmente überspringen (auch mehrere, falls ein Tick ausfiel)
+        while elapsed >= self.profile.duration:
+            elapsed -= self.profile.duration
+            self.segment_start = time.ticks_add(self.segment_start, self.profile.duration)
+            if not self._next_keyframe():
+                self.finished = True
+                self.bank.hold()
+                return
+        self.bank.interpolate(self.profile.progress(elapsed))
@@ -0,0 +1,211 @@
+import time
+from array import array
+import protocol
+
+# Uhrensynchronisation mit einem Zeitgeber (z.B. tools/udpgen.py sync), NTP-artig über
+# den vorhandenen UDP-Socket. Daraus ergibt sich die Abbildung Sendeuhr ↔ ticks_ms,
+# mit der Befehle mit execute_at auf allen Geräten zum selben Zeitpunkt wirken.
+#
+# Je Austausch: offset = ((t1 - t0) + (t2 - t3)) / 2 (Sendeuhr minus lokale Uhr),
+# delay = (t3 - t0) - (t2 - t1). Der Fehler einer Messung ist höchstens delay / 2, wächst
+# aber mit dem Alter um den Gangunterschied der Uhren. Von den letzten FILTER_SIZE
+# Messungen zählt die mit der kleinsten Summe aus beidem (wie die Dispersion bei NTP).
+# Die Drift ergibt sich aus dem aktuellen Bestwert und einem festen älteren (Anker):
+# Je länger der Abstand, desto weniger fallen Millisekunden-Auflösung und Jitter ins Gewicht.
+# Ihre Fehlerschranke ist die Summe der Fehler beider Messungen geteilt durch den Abstand.
+# Angewandt wird die Drift erst, wenn sie größer als diese Schranke ist - bei viel Jitter
+# wäre sonst sogar das Vorzeichen Zufall und die Korrektur schlechter als keine.
+
+INTERVAL_FAST = 250    # ms zwischen Anfragen, bis MIN_SAMPLES Messungen vorliegen
+INTERVAL = 2000        # ms zwischen Anfragen danach
+MIN_SAMPLES = 4        # Ab so vielen Messungen gilt die Uhr als synchron
+FILTER_SIZE = 8        # Messungen im Filter
+MAX_DELAY = 200        # ms, Antworten mit längerer Laufzeit werden verworfen
+DRIFT_BOUND = 100      # ppm, angenommener größter Gangunterschied (Alterung der Messungen)
+DRIFT_SPAN = 60000     # ms Mindestabstand zum Anker für eine Driftschätzung
+DRIFT_MAX_SPAN = 600000  # Danach wird der Anker nachgezogen (Drift ändert sich mit der Temperatur)
+
+enabled = False
+host = None            # Zeitgeber-Adresse, None = Broadcast
+port = 8082
+
+offset = 0             # Sendeuhr - ticks_ms zum Zeitpunkt offset_time (ms)
+offset_time = 0        # ticks_ms des besten Messwerts
+drift_ppm = 0          # Angewandter Gangunterschied Sendeuhr gegenüber lokaler Uhr
+drift_estimate = 0     # Letzte Schätzung (ppm), auch solange sie nicht angewandt wird
+drift_error = 0        # Fehlerschranke der Schätzung (ppm), 0 = noch keine Schätzung
+best_delay = 0         # Laufzeit des besten Messwerts (ms)
+samples = 0            # Gültige Antworten insgesamt
+rejected = 0           # Verworfene Antworten (zu langsam, unbekannte Anfrage)
+updated = False        # Neue Schätzung seit dem letzten Zurücksetzen (für die Takt-Ausrichtung)
+
+_offsets = array("i", bytes(4 * FILTER_SIZE))
+_delays = array("i", bytes(4 * FILTER_SIZE))
+_times = array("i", bytes(4 * FILTER_SIZE))
+_head = 0
+_filled = 0
+_request = bytearray(protocol.SYNC_REQUEST_SIZE)
+_pending = -1          # t0 der offenen Anfrage
+_last_request = 0
+_sent = False
+_anchor_offset = 0     # Bestwert, gegen den die Drift gemessen wird
+_anchor_time = 0
+_anchor_delay = 0
+_anchored = False
+
+
+def reset():
+    global offset, offset_time, drift_ppm, drift_estimate, drift_error, best_delay, samples, rejected, updated
+    global _head, _filled, _pending, _sent, _anchored
+    offset = 0
+    offset_time = 0
+    drift_ppm = 0
+    drift_estimate = 0
+    drift_error = 0
+    best_delay = 0
+    samples = 0
+    rejected = 0
+    updated = False
+    _head = 0
+    _filled = 0
+    _pending = -1
+    _sent = False
+    _anchored = False
+
+def synced():
+    return samples >= MIN_SAMPLES
+
+def pending():
+    """
+    Ob auf eine Antwort gewartet wird
+    """
+    return _pending >= 0
+
+def poll(sock):
+    """
+    Schickt bei Bedarf eine neue Anfrage. Blockiert nicht, die Antwort kommt über handle_reply().
+    """
+    global _pending, _last_request, _sent
+    if not enabled:
+        return
+    now = time.ticks_ms()
+    interval = INTERVAL if synced() else INTERVAL_FAST
+    # Eine verlorene Antwort verfällt einfach mit der nächsten Anfrage
+    if _sent and time.ticks_diff(now, _last_request) < interval:
+        return
+    _request[0] = protocol.SYNC_MAGIC
+    _request[1] = protocol.SYNC_REQUEST
+    _request[2] = now & 0xFF
+    _request[3] = (now >> 8) & 0xFF
+    _request[4] = (now >> 16) & 0xFF
+    _request[5] = (now >> 24) & 0xFF
+    try:
+        sock.sendto(_request, (host or "255.255.255.255", port))
+    except OSError:
+        return
+    _pending = now
+    _last_request = now
+    _sent = True
+
+def handle_reply(data, length, t3):
+    """
+    Wertet eine Antwort des Zeitgebers aus. t3: ticks_ms beim Empfang.
+    Rückgabe: True, wenn die Schätzung aktualisiert wurde
+    """
+    global _head, _filled, _pending, samples, rejected
+    if length < protocol.SYNC_REPLY_SIZE or data[1] != protocol.SYNC_REPLY:
+        return False
+    t0 = protocol.uint30(data, 2)
+    if t0 != _pending:
+        rejected += 1  # Verspätete Antwort auf eine ältere Anfrage
+        return False
+    _pending = -1
+    t1 = protocol.uint30(data, 6)
+    t2 = protocol.uint30(data, 10)
+    delay = time.ticks_diff(t3, t0) - time.ticks_diff(t2, t1)
+    if delay < 0 or delay > MAX_DELAY:
+        rejected += 1
+        return False
+
+    _offsets[_head] = (time.ticks_diff(t1, t0) + time.ticks_diff(t2, t3)) // 2
+    _delays[_head] = delay
+    _times[_head] = t3
+    _head = (_head + 1) % FILTER_SIZE
+    if _filled < FILTER_SIZE:
+        _filled += 1
+    samples += 1
+    _estimate()
+    return True
+
+def _estimate():
+    global offset, offset_time, best_delay, drift_ppm, drift_estimate, drift_error, updated
+    global _anchor_offset, _anchor_time, _anchor_delay, _anchored
+    now = time.ticks_ms()
+    best = 0
+    best_error = 0x3FFFFFFF
+    for i in range(_filled):
+        # Fehlerschranke in us: halbe Laufzeit plus Alterung
+        error = _delays[i] * 500 + time.ticks_diff(now, _times[i]) * DRIFT_BOUND // 1000
+        if error < best_error:
+            best = i
+            best_error = error
+    offset = _offsets[best]
+    offset_time = _times[best]
+    best_delay = _delays[best]
+
+    if not _anchored:
+        _anchor_offset = offset
+        _anchor_time = offset_time
+        _anchor_delay = best_delay
+        _anchored = True
+    else:
+        span = time.ticks_diff(offset_time, _anchor_time)
+        if span >= DRIFT_SPAN:
+            drift_estimate = (offset - _anchor_offset) * 1000000 // span
+            # Je Messung halbe Laufzeit plus 1 ms Auflösung, in us → ppm
+            drift_error = ((_anchor_delay + best_delay) * 500 + 2000) * 1000 // span
+            drift_ppm = drift_estimate if abs(drift_estimate) > drift_error else 0
+        if span >= DRIFT_MAX_SPAN:
+            _anchor_offset = offset
+            _anchor_time = offset_time
+            _anchor_delay = best_delay
+    updated = True
+
+def offset_at(local):
+    """
+    Sendeuhr - lokale Uhr zum lokalen Zeitpunkt local, mit Driftkorrektur
+    """
+    return offset + time.ticks_diff(local, offset_time) * drift_ppm // 1000000
+
+def to_local(sender):
+    """
+    Zeitpunkt der Sendeuhr (30 Bit) → ticks_ms
+    """
+    local = time.ticks_add(sender, -offset)
+    # Driftkorrektur zum Zielzeitpunkt (eine Iteration genügt bei ppm-Drift)
+    return time.ticks_add(sender, -offset_at(local))
+
+def to_sender(local):
+    """
+    ticks_ms → Zeitpunkt der Sendeuhr (30 Bit)
+    """
+    return time.ticks_add(local, offset_at(local))
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage)
+    """
+    return {
+        "synced": synced(),
+        "offset_ms": offset,
+        "drift_ppm": drift_ppm,
+        "drift_estimate_ppm": drift_estimate,
+        "drift_error_ppm": drift_error,
+        "delay_ms": best_delay,
+        "samples": samples,
+        "rejected": rejected,
+    }
+
+def report():
+    return (f"Uhr: {'synchron' if synced() else 'nicht synchron'}, Offset {offset} ms, "
+            f"Drift {drift_ppm} ppm (geschätzt {drift_estimate} ± {drift_error}), Laufzeit {best_delay} ms, Messungen {samples}, verworfen {rejected}")
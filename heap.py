@@ -0,0 +1,89 @@
+import gc
+
+# Speicherbereinigung an Leerlaufpunkten: Der Regeltakt ruft collect_if_idle()
+# nach getaner Arbeit auf, damit keine automatische Sammlung mitten in ein
+# Servo-Update fällt. Die automatische Schwelle bleibt nur als Rückfallebene.
+
+collections = 0          # Sammlungen durch collect_if_idle()
+largest = 0              # Größter freier Block der letzten probe(), 0 = noch nicht gemessen
+fragmentation = 0        # In Prozent, ebenfalls aus der letzten probe()
+_alloc_after_collect = 0
+
+
+def init(budget):
+    """
+    Erste Sammlung und automatische GC-Schwelle deutlich über dem Leerlauf-Budget
+    """
+    global _alloc_after_collect
+    gc.collect()
+    if hasattr(gc, "threshold"):
+        gc.threshold(budget * 4)
+    _alloc_after_collect = gc.mem_alloc()
+
+def collect_if_idle(slack_us, min_slack_us, budget):
+    """
+    Sammelt, wenn seit der letzten Sammlung mehr als budget Bytes allokiert wurden
+    und bis zur nächsten Deadline noch mindestens min_slack_us Zeit ist
+    """
+    global collections, _alloc_after_collect
+    if slack_us < min_slack_us:
+        return False
+    if gc.mem_alloc() - _alloc_after_collect < budget:
+        return False
+    gc.collect()
+    collections += 1
+    _alloc_after_collect = gc.mem_alloc()
+    return True
+
+def largest_free_block(limit):
+    """
+    Sucht per Binärsuche den größten zusammenhängend allokierbaren Block.
+    Allokiert kurzzeitig - nur an Leerlaufpunkten aufrufen.
+    """
+    low = 0
+    high = limit
+    while low < high:
+        size = (low + high + 1) // 2
+        try:
+            block = bytearray(size)
+            del block
+            low = size
+        except MemoryError:
+            high = size - 1
+    return low
+
+def probe():
+    """
+    Misst größten freien Block und Fragmentierung. Zwei Sammlungen und eine Binärsuche
+    über den ganzen freien Heap - dauert, deshalb nur auf Abruf (UDP-Abfrage "heap", REPL)
+    """
+    global _alloc_after_collect, largest, fragmentation
+    gc.collect()
+    free = gc.mem_free()
+    largest = largest_free_block(free)
+    gc.collect()
+    _alloc_after_collect = gc.mem_alloc()
+    fragmentation = 100 - largest * 100 // free if free else 0
+    return stats()
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage), größter Block aus der letzten probe()
+    """
+    return {
+        "free": gc.mem_free(),
+        "alloc": gc.mem_alloc(),
+        "largest": largest,
+        "fragmentation": fragmentation,
+        "collections": collections,
+    }
+
+def report():
+    """
+    Freier/belegter Heap als Text, ohne Sammlung und Probe-Allokationen (läuft im Regeltakt)
+    """
+    values = stats()
+    text = f"Heap: frei {values['free']} B, belegt {values['alloc']} B, GC-Läufe: {collections}"
+    if largest:
+        text += f", größter Block {largest} B (Fragmentierung {fragmentation}%, letzte Messung)"
+    return text
@@ -0,0 +1,242 @@
+import time
+from array import array
+import protocol
+
+# Jitter-Puffer für Sollwert-Ströme (protocol.STREAM_MAGIC): Jedes Datagramm bringt
+# mehrere Samples mit Sendezeitstempel. Statt des zuletzt angekommenen Winkels wird der
+# Verlauf mit fester Verzögerung abgespielt und zwischen den Samples interpoliert -
+# gebündelt ankommende Datagramme und Lücken im WLAN glätten sich so heraus.
+#
+# Zeitbezug: Die Sendezeit eines Samples wird auf die lokale Uhr abgebildet, als wäre
+# es mit der kürzesten bisher beobachteten Laufzeit angekommen (Basislaufzeit). Was
+# ein Datagramm darüber hinaus braucht, ist Jitter. Die Verzögerung folgt der
+# Jitter-Spitze plus einem Regeltakt, begrenzt auf min_delay..max_delay.
+
+RESYNC_MS = 5000       # Größere Zeitsprünge der Sendeuhr = neuer Sender, Puffer neu aufsetzen
+CREEP_INTERVAL = 1000  # Basislaufzeit wächst so oft um 1 ms (Drift der Sendeuhr ausgleichen)
+
+
+class JitterBuffer:
+    """
+    Abspielpuffer für capacity Samples (Zehntelgrad rechts/links), nach Zeit sortiert.
+    push() übernimmt die Samples eines Datagramms, sample() liefert pro Regeltakt
+    die interpolierten Winkel in right/left. Beides ohne Allokation.
+    tick: Regeltakt in ms, decay: Abbau der Jitter-Spitze in ms pro Sekunde
+    """
+
+    def __init__(self, capacity=16, min_delay=40, max_delay=300, tick=50, decay=10):
+        self.capacity = capacity
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.tick = tick
+        self.decay = decay
+        self.times = array("i", bytes(4 * capacity))  # Lokale Sollzeit (ticks_ms) je Sample
+        self.rights = array("h", bytes(2 * capacity))
+        self.lefts = array("h", bytes(2 * capacity))
+        self.right = None  # Ergebnis von sample()
+        self.left = None
+        self.clear()
+        self.reset_stats()
+
+    def clear(self):
+        """
+        Verwirft alle Samples und den Zeitbezug (z.B. wenn wieder Einzel-Sollwerte kommen)
+        """
+        self.count = 0
+        self.anchored = False
+        self.ref_sender = 0   # Sendezeit des neuesten Samples ...
+        self.ref_local = 0    # ... und seine lokale Sollzeit
+        self.last_time = 0    # Neueste jemals übernommene Sollzeit
+        self.cursor = 0       # Zuletzt abgespielte Sollzeit
+        self.playing = False
+        self.underrun = False
+        self.delay = self.min_delay
+        self.target_delay = self.min_delay
+        self.peak = 0
+        self.last_push = 0
+        self.last_creep = 0
+        self.decay_acc = 0
+
+    def reset_stats(self):
+        self.frames = 0
+        self.underruns = 0
+        self.late = 0
+        self.overflows = 0
+        self.ticks = 0
+        self.occupancy_sum = 0
+        self.occupancy_min = self.capacity
+
+    def _local_time(self, sender):
+        # Differenz der 16-Bit-Sendezeiten vorzeichenrichtig (±32 s um das neueste Sample)
+        delta = ((sender - self.ref_sender + 0x8000) & 0xFFFF) - 0x8000
+        return time.ticks_add(self.ref_local, delta)
+
+    def _shift(self, delta):
+        self.ref_local = time.ticks_add(self.ref_local, delta)
+        self.last_time = time.ticks_add(self.last_time, delta)
+        for i in range(self.count):
+            self.times[i] = time.ticks_add(self.times[i], delta)
+
+    def push(self, data, now):
+        """
+        Übernimmt die Samples des zuletzt mit protocol.decode() geparsten Stroms aus data
+        """
+        n = protocol.samples
+        newest = protocol.sample_time(data, n - 1)
+        if self.anchored:
+            nominal = self._local_time(newest)
+            jitter = time.ticks_diff(now, nominal)
+            if jitter < -RESYNC_MS or jitter > RESYNC_MS:
+                self.clear()
+        if not self.anchored:
+            self.anchored = True
+            self.ref_sender = newest
+            self.ref_local = now
+            self.last_time = time.ticks_add(now, -self.max_delay)
+            self.cursor = self.last_time
+            self.last_push = now
+            self.last_creep = now
+            jitter = 0
+        elif jitter < 0:
+            # Schneller als je zuvor: neue Basislaufzeit, gespeicherte Samples mitverschieben
+            self._shift(jitter)
+            jitter = 0
+        elif time.ticks_diff(now, self.last_creep) >= CREEP_INTERVAL:
+            self.last_creep = now
+            self._shift(1)
+            jitter -= 1
+        self.ref_local = self._local_time(newest)
+        self.ref_sender = newest
+
+        # Jitter-Spitze zeitabhängig abbauen, neue Spitzen sofort übernehmen
+        self.decay_acc += time.ticks_diff(now, self.last_push) * self.decay
+        self.last_push = now
+        if self.decay_acc >= 1000:
+            self.peak -= self.decay_acc // 1000
+            self.decay_acc %= 1000
+            if self.peak < 0:
+                self.peak = 0
+        if jitter > self.peak:
+            self.peak = jitter
+        self._update_target()
+
+        for i in range(n):
+            right = protocol.sample_right(data, i)
+            left = protocol.sample_left(data, i)
+            if right is not None and left is not None:
+                self._insert(self._local_time(protocol.sample_time(data, i)), right, left)
+        self.frames += 1
+
+    def _update_target(self):
+        target = self.peak + self.tick
+        if target < self.min_delay:
+            target = self.min_delay
+        elif target > self.max_delay:
+            target = self.max_delay
+        self.target_delay = target
+
+    def _insert(self, t, right, left):
+        if time.ticks_diff(t, self.last_time) > 0:
+            self.last_time = t
+            if self.playing and time.ticks_diff(t, self.cursor) <= 0:
+                self.late += 1  # Neues Sample, dessen Abspielzeit schon vorbei ist
+                return
+        elif self.playing and time.ticks_diff(t, self.cursor) <= 0:
+            return  # Wiederholtes Sample aus einem früheren Datagramm, schon abgespielt
+
+        i = self.count
+        while i > 0 and time.ticks_diff(self.times[i - 1], t) >= 0:
+            if self.times[i - 1] == t:
+                return  # Schon vorhanden
+            i -= 1
+        if self.count == self.capacity:
+            # Voll: ältestes Sample opfern
+            self.overflows += 1
+            if i == 0:
+                return
+            self._drop_oldest()
+            i -= 1
+        for j in range(self.count, i, -1):
+            self.times[j] = self.times[j - 1]
+            self.rights[j] = self.rights[j - 1]
+            self.lefts[j] = self.lefts[j - 1]
+        self.times[i] = t
+        self.rights[i] = right
+        self.lefts[i] = left
+        self.count += 1
+
+    def _drop_oldest(self):
+        for j in range(1, self.count):
+            self.times[j - 1] = self.times[j]
+            self.rights[j - 1] = self.rights[j]
+            self.lefts[j - 1] = self.lefts[j]
+        self.count -= 1
+
+    def sample(self, now):
+        """
+        Setzt right/left auf den Verlauf zum Zeitpunkt now - delay.
+        Rückgabe: False, solange der Puffer leer ist
+        """
+        if self.count == 0:
+            return False
+
+        # Verzögerung in kleinen Schritten nachführen, damit die Wiedergabe nicht springt
+        if self.delay < self.target_delay:
+            self.delay = min(self.target_delay, self.delay + (self.tick >> 3 or 1))
+        elif self.delay > self.target_delay:
+            self.delay -= 1
+        t = time.ticks_add(now, -self.delay)
+        if self.playing and time.ticks_diff(t, self.cursor) < 0:
+            t = self.cursor  # Nie rückwärts abspielen
+        self.cursor = t
+        self.playing = True
+
+        # Vollständig abgespielte Samples entfernen, das laufende Segment bleibt
+        while self.count >= 2 and time.ticks_diff(self.times[1], t) <= 0:
+            self._drop_oldest()
+
+        if self.count >= 2 and time.ticks_diff(t, self.times[0]) > 0:
+            span = time.ticks_diff(self.times[1], self.times[0])
+            position = time.ticks_diff(t, self.times[0])
+            self.right = self.rights[0] + (self.rights[1] - self.rights[0]) * position // span
+            self.left = self.lefts[0] + (self.lefts[1] - self.lefts[0]) * position // span
+            self.underrun = False
+        else:
+            self.right = self.rights[0]
+            self.left = self.lefts[0]
+            if self.count == 1 and time.ticks_diff(t, self.times[0]) > 0:
+                # Puffer leergelaufen: letzten Wert halten und mehr Verzögerung anfordern
+                if not self.underrun:
+                    self.underruns += 1
+                    self.underrun = True
+                    self.peak += self.tick
+                    self._update_target()
+
+        occupancy = self.count - 1
+        self.ticks += 1
+        self.occupancy_sum += occupancy
+        if occupancy < self.occupancy_min:
+            self.occupancy_min = occupancy
+        return True
+
+    def stats(self):
+        """
+        Kennzahlen als dict (für die UDP-Abfrage)
+        """
+        return {
+            "delay_ms": self.delay,
+            "jitter_peak_ms": self.peak,
+            "occupancy": self.count - 1 if self.count else 0,
+            "occupancy_min": self.occupancy_min if self.ticks else 0,
+            "occupancy_avg": self.occupancy_sum / self.ticks if self.ticks else 0,
+            "frames": self.frames,
+            "underruns": self.underruns,
+            "late": self.late,
+            "overflows": self.overflows,
+        }
+
+    def report(self):
+        stats = self.stats()
+        return (f"Jitter-Puffer: Verzögerung {stats['delay_ms']} ms (Spitze {stats['jitter_peak_ms']} ms), "
+                f"Belegung min/mittel {stats['occupancy_min']}/{stats['occupancy_avg']:.1f}, "
+                f"Leerläufe {stats['underruns']}, verspätet {stats['late']}, übergelaufen {stats['overflows']}")
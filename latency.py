@@ -0,0 +1,110 @@
+import time
+from array import array
+
+# Latenzmessung vom Empfang eines Datagramms bis zum Duty-Schreiben.
+# Die Messpunkte bleiben im Produktivcode: Solange enabled False ist, kostet
+# jeder Messpunkt nur eine Abfrage von latency.enabled.
+
+RECEIVE = 0   # readinto() des Datagramms
+PARSE = 1     # protocol.decode()
+DECIDE = 2    # Modusentscheidung
+COMPUTE = 3   # Geschwindigkeitsberechnung
+WRITE = 4     # Duty schreiben
+TOTAL = 5     # Beginn des Empfangs bis Ende des Duty-Schreibens
+STAGE_NAMES = ("receive", "parse", "decide", "compute", "write", "total")
+
+# Histogramm mit Zweierpotenz-Klassen: Klasse i zählt Dauern von 2^i bis 2^(i+1)-1 us,
+# die letzte Klasse alles ab 2^(BUCKETS-1) us
+BUCKETS = 16
+
+enabled = False
+histograms = array("H", bytes(2 * len(STAGE_NAMES) * BUCKETS))
+maximum = array("I", bytes(4 * len(STAGE_NAMES)))
+
+_packet_start = 0
+_packet_pending = False
+
+
+def record(stage, start):
+    """
+    Verbucht die Dauer seit start (ticks_us) für stage ohne Allokation.
+    Gibt den aktuellen Zeitstempel zurück, damit Stufen verkettet werden können.
+    """
+    now = time.ticks_us()
+    duration = time.ticks_diff(now, start)
+    if duration > maximum[stage]:
+        maximum[stage] = duration
+    bucket = 0
+    while duration > 1 and bucket < BUCKETS - 1:
+        duration >>= 1
+        bucket += 1
+    i = stage * BUCKETS + bucket
+    if histograms[i] < 0xFFFF:
+        histograms[i] += 1
+    return now
+
+def packet_received(start):
+    """
+    Merkt sich den Empfangsbeginn des angewendeten Datagramms für die Gesamtlatenz
+    """
+    global _packet_start, _packet_pending
+    _packet_start = start
+    _packet_pending = True
+
+def packet_written():
+    """
+    Nach dem Duty-Schreiben: Gesamtlatenz verbuchen, falls ein neues Datagramm anlag
+    """
+    global _packet_pending
+    if _packet_pending:
+        record(TOTAL, _packet_start)
+        _packet_pending = False
+
+def reset():
+    global _packet_pending
+    for i in range(len(histograms)):
+        histograms[i] = 0
+    for i in range(len(maximum)):
+        maximum[i] = 0
+    _packet_pending = False
+
+def percentile(stage, fraction):
+    """
+    Obergrenze (us) der Klasse, in der das Perzentil liegt
+    """
+    offset = stage * BUCKETS
+    total = 0
+    for i in range(BUCKETS):
+        total += histograms[offset + i]
+    if total == 0:
+        return 0
+    limit = total * fraction
+    count = 0
+    for i in range(BUCKETS):
+        count += histograms[offset + i]
+        if count >= limit:
+            return min((2 << i) - 1, maximum[stage])
+    return maximum[stage]
+
+def summary():
+    """
+    Histogramme und Kennwerte als dict (für die UDP-Abfrage)
+    """
+    result = {"enabled": enabled}
+    for stage, name in enumerate(STAGE_NAMES):
+        offset = stage * BUCKETS
+        result[name] = {
+            "hist": list(histograms[offset:offset + BUCKETS]),
+            "p50": percentile(stage, 0.5),
+            "p95": percentile(stage, 0.95),
+            "max": maximum[stage],
+        }
+    return result
+
+def dump():
+    """
+    Übersicht auf der Konsole (z.B. von der REPL aus)
+    """
+    print("Latenz (us)   p50     p95     max")
+    for stage, name in enumerate(STAGE_NAMES):
+        print(f"{name:10s} {percentile(stage, 0.5):7d} {percentile(stage, 0.95):7d} {maximum[stage]:7d}")
@@ -0,0 +1,96 @@
+import time
+import urandom
+from servobank import PROGRESS_SHIFT, SPEED_MAX
+
+# Bewegungskern für mode "manual" (app.py) und test.py: Phasen von phase_duration ms mit
+# zufälligen Zielgeschwindigkeiten, in den ersten transition_time ms wird übergeblendet.
+# Beim Import passiert nichts außer Definitionen, Bank und Profil kommen über init().
+#
+# Ändert sich selten und lässt sich deshalb vorkompilieren, damit das Board beim Start
+# nicht aus dem Quelltext übersetzen muss (spart Startzeit und den Heap des Compilers):
+#   mpy-cross -march=xtensa motion.py && mpremote fs cp motion.mpy :
+# oder fest in ein eigenes Firmware-Image einbauen (manifest.py: module("motion.py")).
+# Gleiches gilt für servobank.py, profiles.py, protocol.py, ...
+
+bank = None
+profile = None            # profiles.MotionProfile, None = linear (ohne Profiltabelle)
+phase_duration = 3000     # ms
+transition_time = 3000    # ms
+last_phase_time = 0
+
+
+def init(bank_, profile_=None, phase_duration_=3000, transition_time_=3000):
+    global bank, profile, phase_duration, transition_time
+    bank = bank_
+    profile = profile_
+    phase_duration = phase_duration_
+    transition_time = transition_time_
+
+def get_random_speed():
+    """
+    Erzeugt zufällige Geschwindigkeit zwischen 0 und SPEED_MAX
+    """
+    return urandom.getrandbits(10)  # 10-bit zufällig = 0..1023
+
+def set_random_targets():
+    """
+    Setzt zufällige Zielgeschwindigkeiten für alle Servos, wobei nie alle gleichzeitig stillstehen
+    """
+    idle = True
+    for channel in range(bank.count):
+        speed = get_random_speed()
+        bank.target[channel] = speed
+        if speed > SPEED_MAX // 10:
+            idle = False
+
+    # Wenn alle zu niedrig sind (quasi stillstehen), einen zufällig auf mindestens 30% setzen
+    if idle:
+        channel = urandom.getrandbits(8) % bank.count  # Zufällig einen Servo wählen
+        bank.target[channel] = SPEED_MAX * 3 // 10 + get_random_speed() * 7 // 10  # Mindestens 30% Geschwindigkeit
+
+def _begin(now):
+    global last_phase_time
+    set_random_targets()  # Nie alle gleichzeitig stillstehend
+    if profile is not None:
+        profile.start(bank.max_delta())  # Profiltabelle für diese Phase backen
+    last_phase_time = now
+
+def start(now):
+    """
+    Erste Phase mit zufälligen Zielen
+    """
+    _begin(now)
+
+def advance(now):
+    """
+    Startet nach phase_duration eine neue Phase. Rückgabe: True bei neuer Phase
+    """
+    if time.ticks_diff(now, last_phase_time) < phase_duration:
+        return False
+    # Aktuelle Geschwindigkeiten werden zu neuen Startgeschwindigkeiten
+    bank.start_phase()
+    _begin(now)
+    return True
+
+def restart(now):
+    """
+    Beginnt sofort eine neue Phase, ausgehend von den zuletzt ausgegebenen Geschwindigkeiten
+    """
+    for channel in range(bank.count):
+        bank.current[channel] = bank.speed[channel]
+    _begin(now)
+
+def update(now):
+    """
+    Berechnet die aktuellen Geschwindigkeiten innerhalb der laufenden Phase
+    """
+    elapsed = time.ticks_diff(now, last_phase_time)
+    if elapsed <= transition_time:
+        # Übergang läuft noch - Fortschritt 0..1024 aus der Profiltabelle bzw. linear
+        if profile is not None:
+            bank.interpolate(profile.progress(elapsed))
+        else:
+            bank.interpolate((elapsed << PROGRESS_SHIFT) // transition_time)
+    else:
+        # Übergang abgeschlossen - Zielgeschwindigkeiten beibehalten
+        bank.hold()
@@ -0,0 +1,142 @@
+import time
+from array import array
+from servobank import SPEED_MAX
+
+# Poti-Steuerung (mode "poti", Lenkung wie old/harmonischer_gradient_dual.py): Mittelstellung
+# = beide stehen, nach rechts/links läuft ein Servo ab halber Geschwindigkeit, der andere
+# holt von null aus auf.
+#
+# Statt einer ADC-Lesung pro Regeltakt: Burst aus oversample Lesungen (Mittelwert), Median
+# der letzten drei Bursts gegen Ausreißer (WLAN-Sendespitzen stören den ADC des ESP8266),
+# darüber gleitender Mittelwert über window Bursts. Hysterese: Der Wert, nach dem gelenkt
+# wird, folgt dem gefilterten erst bei einer Abweichung über hysteresis - die Servos zittern
+# so weder an den Rändern der Mittelstellung (center ± tolerance) noch dazwischen.
+# Alles in Ganzzahlen und ohne Allokation (läuft auch im Timer-Update).
+
+ADC_MAX = 1023
+MAX_WINDOW = 16
+
+center = 512        # ADC-Wert der Mittelstellung
+tolerance = 20      # ± um center: beide Servos stehen
+hysteresis = 4      # ADC-Schritte, um die sich der Wert bewegen muss, bevor gelenkt wird
+oversample = 8      # Lesungen pro Burst (ESP8266: ca. 0.1 ms je Lesung)
+window = 4          # Bursts im gleitenden Mittelwert (1..MAX_WINDOW)
+
+adc = None
+value = center      # Gefilterter ADC-Wert
+held = center       # Wert nach Hysterese, danach wird gelenkt
+bursts = 0          # Bursts seit reset()
+changes = 0         # Änderungen von held (ohne Hysterese ändert sich der Wert fast jeden Takt)
+burst_us_max = 0    # Längster Burst
+spread_max = 0      # Größte Streuung (max - min) innerhalb eines Bursts
+
+_medians = array("H", bytes(2 * MAX_WINDOW))  # Median je Burst für den gleitenden Mittelwert
+_recent = array("H", bytes(6))                # Letzte drei Burst-Mittelwerte für den Median
+_head = 0
+_sum = 0
+
+
+def init(adc_):
+    global adc
+    adc = adc_
+    reset()
+
+def reset():
+    """
+    Filter mit einem Burst neu füllen (beim Wechsel in den Modus)
+    """
+    global value, held, bursts, changes, burst_us_max, spread_max, _head, _sum
+    bursts = 0
+    changes = 0
+    burst_us_max = 0
+    spread_max = 0
+    first = _burst()
+    for i in range(3):
+        _recent[i] = first
+    for i in range(window):
+        _medians[i] = first
+    _head = 0
+    _sum = first * window
+    value = first
+    held = first
+
+def _burst():
+    global burst_us_max, spread_max
+    t = time.ticks_us()
+    total = 0
+    low = ADC_MAX
+    high = 0
+    for _ in range(oversample):
+        reading = adc.read()
+        total += reading
+        if reading < low:
+            low = reading
+        if reading > high:
+            high = reading
+    elapsed = time.ticks_diff(time.ticks_us(), t)
+    if elapsed > burst_us_max:
+        burst_us_max = elapsed
+    if high - low > spread_max:
+        spread_max = high - low
+    return total // oversample
+
+def update():
+    """
+    Ein Burst pro Regeltakt. Rückgabe: True, wenn sich der gelenkte Wert geändert hat
+    """
+    global value, held, bursts, changes, _head, _sum
+    _recent[bursts % 3] = _burst()
+    bursts += 1
+    a = _recent[0]
+    b = _recent[1]
+    c = _recent[2]
+    median = max(min(a, b), min(max(a, b), c))
+
+    _sum += median - _medians[_head]
+    _medians[_head] = median
+    _head = (_head + 1) % window
+    value = _sum // window
+
+    if value - held > hysteresis or held - value > hysteresis:
+        held = value
+        changes += 1
+        return True
+    return False
+
+def apply(bank):
+    """
+    Setzt die Geschwindigkeiten von Kanal 0 (Servo1) und 1 (Servo2) nach held
+    """
+    offset = held - center
+    if -tolerance <= offset <= tolerance:
+        bank.set_speed(0, 0)
+        bank.set_speed(1, 0)
+        return
+    # Bereich bis zum Anschlag, um die Hysterese verkürzt, damit der Anschlag erreichbar bleibt
+    if offset > 0:
+        span = ADC_MAX - center - tolerance - hysteresis
+        norm = min((offset - tolerance) * SPEED_MAX // span, SPEED_MAX)
+        bank.set_speed(0, norm)
+        bank.set_speed(1, SPEED_MAX // 2 + norm // 2)
+    else:
+        span = center - tolerance - hysteresis
+        norm = min((-offset - tolerance) * SPEED_MAX // span, SPEED_MAX)
+        bank.set_speed(0, SPEED_MAX // 2 + norm // 2)
+        bank.set_speed(1, norm)
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage)
+    """
+    return {
+        "value": value,
+        "held": held,
+        "bursts": bursts,
+        "changes": changes,
+        "burst_us_max": burst_us_max,
+        "spread_max": spread_max,
+    }
+
+def report():
+    return (f"Poti: {held} (gefiltert {value}), {changes} Änderungen in {bursts} Bursts, "
+            f"Streuung bis {spread_max}, Burst max {burst_us_max} us")
@@ -0,0 +1,211 @@
+import time
+from array import array
+
+# Leerlauf-Steuerung: Solange sich an den Duty-Werten nichts ändert und der Modus ohne
+# neue Datagramme nichts mehr ändern würde, entfallen Schreibzugriffe und Konsolenausgaben
+# (STATE_IDLE), die sequentielle Schleife wartet dann bis zu idle_interval auf ein Datagramm
+# statt im Regeltakt zu laufen. Nach sleep_after zusätzlich WLAN-Stromsparmodus bzw.
+# lightsleep (STATE_SLEEP). Jede Änderung schaltet sofort zurück auf den vollen Takt.
+#
+# Der Stromsparmodus des WLAN hält Datagramme bis zum nächsten DTIM-Beacon zurück
+# (typisch ~100 ms) - das ist die Aufwachlatenz, die man für den geringeren Verbrauch zahlt.
+# wake_max/wake_sum messen ab Ankunft des Datagramms auf dem Gerät; die Pufferung beim
+# Access Point davor sieht nur der Sender (udpgen idle-sim zeigt beides).
+
+STATE_ACTIVE = 0
+STATE_IDLE = 1
+STATE_SLEEP = 2
+STATE_NAMES = ("aktiv", "leerlauf", "schlaf")
+
+enabled = False
+idle_after = 1000      # ms ohne Änderung bis STATE_IDLE
+sleep_after = 30000    # ms ohne Änderung bis STATE_SLEEP
+idle_interval = 250    # Längste Wartezeit pro Schleifenrunde im Leerlauf (ms)
+sleep_interval = 1000  # ... im Schlaf (WLAN-Überwachung, Statistik laufen weiter)
+sleep_mode = "poll"    # "poll" = auf Datagramme warten, "lightsleep" = machine.lightsleep
+lightsleep_ms = 100    # Schlafdauer je lightsleep(), Datagramme wecken das Board dabei nicht
+wlan = None            # Für den Stromsparmodus, None = WLAN-Einstellung nicht anfassen
+
+state = STATE_ACTIVE
+state_since = 0
+quiet = False          # Letzter Tick ohne Schreibzugriff (für Konsolenausgaben)
+skipped = 0            # Ausgelassene Schreibzugriffe
+wakes = 0              # Rückkehr zu STATE_ACTIVE aus Leerlauf oder Schlaf
+wake_max = 0           # Aufwachlatenz: Ankunft des Datagramms → erster Schreibzugriff (us)
+wake_sum = 0
+time_in = array("I", [0, 0, 0])  # ms je Zustand
+
+_settled_since = 0
+_woke_at = 0
+_arrived = False       # Seit dem letzten Tick ein Datagramm im Leerlauf/Schlaf angekommen
+_arrived_us = 0
+_poller = None
+_pm_default = None
+
+
+def init(sock):
+    """
+    Vorbereitung für wait(): Socket beim Poller anmelden, Zustand auf aktiv
+    """
+    global _poller
+    reset()
+    if sock is not None:
+        import select
+        _poller = select.poll()
+        _poller.register(sock, select.POLLIN)
+
+def reset():
+    global state, state_since, quiet, skipped, wakes, wake_max, wake_sum, _settled_since, _woke_at, _arrived
+    now = time.ticks_ms()
+    if state == STATE_SLEEP:
+        _power_save(False)
+    state = STATE_ACTIVE
+    state_since = now
+    quiet = False
+    skipped = 0
+    wakes = 0
+    wake_max = 0
+    wake_sum = 0
+    _settled_since = now
+    _woke_at = now
+    _arrived = False
+    for i in range(len(time_in)):
+        time_in[i] = 0
+
+def _set_state(new_state, now):
+    global state, state_since
+    time_in[state] += time.ticks_diff(now, state_since)
+    state = new_state
+    state_since = now
+
+def _power_save(on):
+    global _pm_default
+    if wlan is None:
+        return
+    try:
+        if _pm_default is None:
+            _pm_default = wlan.config("pm")
+        wlan.config(pm=wlan.PM_POWERSAVE if on else _pm_default)
+    except (AttributeError, ValueError, OSError):
+        pass  # Port ohne pm-Einstellung
+
+def settled(now):
+    """
+    Vom Schreibpfad: Tick ohne Änderung, der Schreibzugriff entfällt
+    """
+    global quiet, skipped, _arrived
+    quiet = True
+    skipped += 1
+    _arrived = False  # Datagramm ohne Wirkung (z.B. gleicher Sollwert, Abfrage): zählt nicht als Aufwachen
+    if state == STATE_ACTIVE and time.ticks_diff(now, _settled_since) >= idle_after:
+        _set_state(STATE_IDLE, now)
+
+def active(now):
+    """
+    Vom Schreibpfad: Die Duty-Werte ändern sich, voller Takt
+    """
+    global quiet, wakes, wake_max, wake_sum, _settled_since, _arrived
+    quiet = False
+    _settled_since = now
+    if state == STATE_ACTIVE:
+        return
+    if state == STATE_SLEEP:
+        _power_save(False)
+    # Ab Ankunft des Datagramms wie udpgen idle-sim, ohne Datagramm (Moduswechsel o.ä.) ab Ende der Wartezeit
+    if _arrived:
+        latency = time.ticks_diff(time.ticks_us(), _arrived_us)
+        _arrived = False
+    else:
+        latency = time.ticks_diff(now, _woke_at) * 1000
+    wakes += 1
+    wake_sum += latency
+    if latency > wake_max:
+        wake_max = latency
+    _set_state(STATE_ACTIVE, now)
+
+def traffic(now):
+    """
+    Vom Empfangspfad: ein Sollwert-Datagramm. Im Schlaf zurück in den Leerlauf, der Sender ist aktiv.
+    Im Leerlauf und Schlaf beginnt hier die Aufwachlatenz (erstes Datagramm seit dem letzten Tick).
+    """
+    global _settled_since, _arrived, _arrived_us
+    if state != STATE_ACTIVE and not _arrived:
+        _arrived = True
+        _arrived_us = time.ticks_us()
+    if state == STATE_SLEEP:
+        _power_save(False)
+        _settled_since = now
+        _set_state(STATE_IDLE, now)
+
+def due():
+    """
+    Ein geplanter Befehl (execute_at) wird ausgeführt: seine Aufwachlatenz zählt ab hier,
+    nicht ab der Ankunft - der Vorlauf ist gewollt
+    """
+    global _arrived, _arrived_us
+    if state != STATE_ACTIVE:
+        _arrived = True
+        _arrived_us = time.ticks_us()
+
+def _enter_sleep(now):
+    if state == STATE_IDLE and time.ticks_diff(now, _settled_since) >= sleep_after:
+        _set_state(STATE_SLEEP, now)
+        _power_save(True)
+
+def _readable(timeout):
+    for _ in _poller.ipoll(timeout):
+        return True
+    return False
+
+def wait():
+    """
+    Ersetzt im Leerlauf ticker.wait() der sequentiellen Schleife: kehrt zurück, sobald ein
+    Datagramm anliegt, spätestens nach idle_interval bzw. sleep_interval
+    """
+    global _woke_at
+    now = time.ticks_ms()
+    _enter_sleep(now)
+
+    if state == STATE_SLEEP and sleep_mode == "lightsleep":
+        import machine
+        while not _readable(0) and time.ticks_diff(time.ticks_ms(), now) < sleep_interval:
+            machine.lightsleep(lightsleep_ms)
+    elif _poller is not None:
+        _readable(idle_interval if state == STATE_IDLE else sleep_interval)
+    else:
+        time.sleep_ms(idle_interval)
+    _woke_at = time.ticks_ms()
+
+def interval():
+    """
+    Wartezeit eines Regeltakts im aktuellen Zustand (uasyncio), None = voller Takt
+    """
+    if state == STATE_ACTIVE:
+        return None
+    _enter_sleep(time.ticks_ms())
+    return idle_interval if state == STATE_IDLE else sleep_interval
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage)
+    """
+    _set_state(state, time.ticks_ms())  # Laufende Zeit verbuchen
+    total = time_in[0] + time_in[1] + time_in[2]
+    return {
+        "state": STATE_NAMES[state],
+        "active_ms": time_in[STATE_ACTIVE],
+        "idle_ms": time_in[STATE_IDLE],
+        "sleep_ms": time_in[STATE_SLEEP],
+        "active_pct": 100 * time_in[STATE_ACTIVE] // total if total else 100,
+        "skipped_writes": skipped,
+        "wakes": wakes,
+        "wake_ms_max": wake_max / 1000,
+        "wake_ms_avg": wake_sum / wakes / 1000 if wakes else 0,
+    }
+
+def report():
+    values = stats()
+    return (f"Leerlauf: {values['state']}, aktiv/leerlauf/schlaf {values['active_ms']}/{values['idle_ms']}/"
+            f"{values['sleep_ms']} ms, ausgelassene Schreibzugriffe {values['skipped_writes']}, "
+            f"Aufwachen {values['wakes']}x (max {values['wake_ms_max']:.1f} ms, "
+            f"mittel {values['wake_ms_avg']:.1f} ms)")
@@ -0,0 +1,90 @@
+import math
+from array import array
+from servobank import PROGRESS_SHIFT
+
+# Bewegungsprofile für die Übergänge im manuellen Modus. Ein Profil bildet den
+# zeitlichen Fortschritt 0..1 auf den Anteil des Geschwindigkeitswechsels ab.
+# Die Kurve wird beim Phasenstart einmal in eine Tabelle gebacken, pro Tick wird
+# nur noch per Index gelesen - keine Float-Rechnung im Regeltakt.
+LINEAR = "linear"        # Bisheriges Verhalten, Knick am Anfang und Ende
+COSINE = "cosine"        # Halbe Kosinuswelle, Änderungsrate startet und endet bei 0
+MINIMUM_JERK = "minjerk"  # 10t³ - 15t⁴ + 6t⁵, zusätzlich ruckfrei an den Enden
+TRAPEZOID = "trapezoid"  # Änderungsrate rampt linear hoch, bleibt konstant, rampt herunter
+
+PROGRESS_ONE = 1 << PROGRESS_SHIFT
+
+
+def ease(kind, t, ramp=0.25):
+    """
+    Anteil des Übergangs (0.0..1.0) zum Zeitpunkt t (0.0..1.0)
+    ramp: Anteil der Übergangszeit je Rampe beim Trapezprofil (0..0.5)
+    """
+    if kind == COSINE:
+        return (1 - math.cos(math.pi * t)) / 2
+    if kind == MINIMUM_JERK:
+        return t * t * t * (10 - t * (15 - 6 * t))
+    if kind == TRAPEZOID and ramp > 0:
+        peak = 1 / (1 - ramp)  # Fläche unter der Änderungsrate = 1
+        if t < ramp:
+            return peak * t * t / (2 * ramp)
+        if t > 1 - ramp:
+            return 1 - peak * (1 - t) * (1 - t) / (2 * ramp)
+        return peak * (t - ramp / 2)
+    return t
+
+
+class MotionProfile:
+    """
+    Gebackene Profiltabelle für Übergänge der Länge duration (ms).
+    Beim Trapezprofil mit accel_limit (Speed-Einheiten pro Sekunde) wird die Rampe
+    je Phase so lang gewählt, wie es das Limit für den größten Sprung erlaubt.
+    """
+
+    def __init__(self, kind, duration, steps=64, ramp=0.25, accel_limit=0):
+        self.kind = kind
+        self.duration = duration
+        self.steps = steps
+        self.ramp = ramp
+        self.accel_limit = accel_limit
+        self.table = array("H", bytes(2 * (steps + 1)))
+        self.baked_ramp = None  # Rampe der aktuell gebackenen Tabelle
+        self.bakes = 0
+
+    def ramp_for(self, delta):
+        """
+        Rampenanteil für einen Geschwindigkeitssprung delta (nur Trapezprofil)
+        """
+        if self.kind != TRAPEZOID:
+            return 0
+        if self.accel_limit <= 0 or delta <= 0:
+            return self.ramp
+        # Spitzenrate = delta / (T * (1 - ramp)) <= accel_limit
+        ramp = 1 - delta * 1000 / (self.duration * self.accel_limit)
+        return max(0, min(0.5, ramp))
+
+    def start(self, delta=0):
+        """
+        Phasenstart: backt die Tabelle, wenn sich die Kurvenform geändert hat.
+        delta: größter Geschwindigkeitssprung der Phase
+        """
+        ramp = self.ramp_for(delta)
+        if ramp == self.baked_ramp:
+            return
+        for i in range(self.steps + 1):
+            self.table[i] = int(ease(self.kind, i / self.steps, ramp) * PROGRESS_ONE + 0.5)
+        self.baked_ramp = ramp
+        self.bakes += 1
+
+    def progress(self, elapsed):
+        """
+        Fortschritt 0..PROGRESS_ONE nach elapsed ms, zwischen zwei Tabelleneinträgen
+        linear interpoliert (sonst ungleichmäßige Stufen, wenn Ticks und Einträge nicht aufgehen)
+        """
+        if elapsed >= self.duration:
+            return PROGRESS_ONE
+        if elapsed <= 0:
+            return 0
+        position = elapsed * self.steps
+        i = position // self.duration
+        low = self.table[i]
+        return low + (self.table[i + 1] - low) * (position - i * self.duration) // self.duration
@@ -0,0 +1,361 @@
+import ujson
+import ustruct
+
+# Binäres Sollwert-Frame (little endian, 9 Bytes):
+#   magic (B) | version (B) | seq (H) | mode (B) | right (h) | left (h)
+# Das erste Byte unterscheidet es vom JSON-Format, das immer mit "{" beginnt.
+FRAME_MAGIC = 0xA5
+FRAME_VERSION = 1
+FRAME_FORMAT = "<BBHBhh"
+FRAME_SIZE = 9
+
+# Version 2 hängt einen Ausführungszeitpunkt an (Binär- und Flotten-Frame):
+#   ... | execute_at (I, Sendeuhr in ms)
+# Das Gerät rechnet ihn mit clocksync.py in seine ticks_ms um und wendet den Sollwert
+# erst dann an. In JSON entspricht das dem Feld "execute_at".
+FRAME_VERSION_TIMED = 2
+FRAME_SIZE_TIMED = 13
+
+# Sollwert-Strom (little endian) für den Jitter-Puffer (siehe jitter.py):
+#   magic (B) | anzahl (B) | seq (H) | anzahl * (zeit_ms (H) | right (h) | left (h))
+# zeit_ms ist die Sendeuhr (läuft alle 65,5 s über), Samples vom ältesten zum neuesten.
+STREAM_MAGIC = 0xA6
+STREAM_HEADER = 4
+SAMPLE_SIZE = 6
+STREAM_MAX_SAMPLES = 16
+
+# Flotten-Frame (little endian): Sollwerte für viele Geräte in einem Broadcast
+#   magic (B) | version (B) | seq (H) | mode (B) | erste_id (B) | anzahl (B) | anzahl * (right (h) | left (h))
+# Gerät mit ID d liest nur seinen Platz bei FLEET_HEADER + (d - erste_id) * FLEET_SLOT_SIZE.
+# Ein Platz mit ANGLE_NONE adressiert das Gerät in diesem Frame nicht, mode gilt für alle.
+FLEET_MAGIC = 0xA7
+FLEET_HEADER = 7
+FLEET_HEADER_TIMED = 11  # Version 2: execute_at direkt nach anzahl, Plätze entsprechend später
+FLEET_SLOT_SIZE = 4
+
+# Uhrensynchronisation (siehe clocksync.py), NTP-artiger Austausch:
+#   Anfrage (Gerät → Zeitgeber):  magic (B) | SYNC_REQUEST (B) | t0 (I, ticks_ms des Geräts)
+#   Antwort (Zeitgeber → Gerät):  magic (B) | SYNC_REPLY (B) | t0 (I) | t1 (I) | t2 (I)
+# t1/t2 = Empfangs-/Sendezeit des Zeitgebers in ms, dieselbe Uhr wie execute_at.
+SYNC_MAGIC = 0xA8
+SYNC_REQUEST = 0
+SYNC_REPLY = 1
+SYNC_REQUEST_SIZE = 6
+SYNC_REPLY_SIZE = 14
+
+# Zeitstempel der Sendeuhr werden wie ticks_ms auf 30 Bit gekürzt, damit ticks_diff()
+# auf dem Board direkt damit rechnen kann (und keine Langzahlen entstehen)
+TICKS_MASK = (1 << 30) - 1
+
+ANGLE_SCALE = 10        # Winkel werden in Zehntelgrad übertragen
+ANGLE_NONE = -32768     # Platzhalter für "kein Winkel"
+ANGLE_LIMIT = 32767     # Betragsgrenze eines Winkels (int16 ohne ANGLE_NONE)
+
+# Modus-Byte im Binärformat
+MODE_NONE = 0
+MODE_MANUAL = 1
+MODE_AUTOMATIC = 2
+MODE_PLAYBACK = 3
+MODE_POTI = 4
+
+MODE_NAMES = (None, "manual", "automatic", "playback", "poti")  # Index = Modus-Byte
+
+
+def _angle_from_json(value):
+    """
+    Konvertiert einen JSON-Winkel in Grad → Zehntelgrad (int) oder None.
+    Begrenzt auf ±ANGLE_LIMIT: passt in array("h") und wird nie zu ANGLE_NONE.
+    """
+    if value is None:
+        return None
+    angle = int(value * ANGLE_SCALE)
+    if angle > ANGLE_LIMIT:
+        return ANGLE_LIMIT
+    if angle < -ANGLE_LIMIT:
+        return -ANGLE_LIMIT
+    return angle
+
+# Ergebnis von decode() - modulglobal, damit der Empfangspfad nichts allokiert
+seq = None
+mode = None
+right = None
+left = None
+query = None     # Abfrage-Kommando (nur JSON), z.B. "latency"
+reply_to = None  # (host, port) für die Antwort auf eine Abfrage oder None
+samples = 0      # Anzahl Samples eines Sollwert-Stroms, sonst 0
+execute_at = None  # Ausführungszeitpunkt (Sendeuhr, 30 Bit) oder None = sofort
+
+addressed = True  # False bei einem Flotten-Frame ohne Platz für dieses Gerät
+device_id = None  # Eigene Geräte-ID für Flotten-Frames (setzt app.py aus der Konfiguration)
+
+
+def _json_view(data, length):
+    if length is None or length == len(data):
+        return data
+    # ujson.loads akzeptiert jedes Buffer-Objekt, auch einen memoryview-Ausschnitt
+    return memoryview(data)[:length]
+
+def uint30(data, offset):
+    """
+    32-Bit-Zeitstempel der Sendeuhr, auf den ticks-Bereich (30 Bit) gekürzt
+    """
+    return (data[offset] | (data[offset + 1] << 8) | (data[offset + 2] << 16)
+            | ((data[offset + 3] & 0x3F) << 24))
+
+def _int16(data, offset):
+    value = data[offset] | (data[offset + 1] << 8)
+    if value >= 0x8000:
+        value -= 0x10000
+    return None if value == ANGLE_NONE else value
+
+def decode(data, length=None):
+    """
+    Parst ein Datagramm (JSON, Binär-, Flotten-Frame oder Sollwert-Strom) aus einem Puffer
+    mit length gültigen Bytes.
+    Das Ergebnis steht danach in seq, mode, right, left (Winkel in Zehntelgrad oder None).
+    Binär-Frames werden direkt aus dem Puffer gelesen, ohne Allokation.
+    """
+    global seq, mode, right, left, query, reply_to, samples, addressed, execute_at
+
+    if length is None:
+        length = len(data)
+    addressed = True
+    execute_at = None
+    if data[0] == STREAM_MAGIC:
+        count = data[1]
+        if count == 0 or count > STREAM_MAX_SAMPLES:
+            raise ValueError("Ungültige Sample-Anzahl")
+        if length < STREAM_HEADER + count * SAMPLE_SIZE:
+            raise ValueError("Frame zu kurz")
+        seq = data[2] | (data[3] << 8)
+        mode = None
+        query = None
+        samples = count
+        # right/left = neuestes Sample, die übrigen liest der Jitter-Puffer direkt aus data
+        right = sample_right(data, count - 1)
+        left = sample_left(data, count - 1)
+        return
+
+    samples = 0
+    if data[0] == FLEET_MAGIC:
+        if data[1] == FRAME_VERSION:
+            header = FLEET_HEADER
+        elif data[1] == FRAME_VERSION_TIMED:
+            header = FLEET_HEADER_TIMED
+        else:
+            raise ValueError("Unbekannte Frame-Version")
+        if length < header:
+            raise ValueError("Frame zu kurz")
+        if data[4] >= len(MODE_NAMES):
+            raise ValueError("Unbekannter Modus")
+        seq = data[2] | (data[3] << 8)
+        mode = MODE_NAMES[data[4]]
+        query = None
+        if header == FLEET_HEADER_TIMED:
+            execute_at = uint30(data, FLEET_HEADER)
+        # Eigener Platz per Offset - die Plätze der anderen Geräte werden nicht angefasst
+        slot = -1 if device_id is None else device_id - data[5]
+        offset = header + slot * FLEET_SLOT_SIZE
+        if 0 <= slot < data[6] and offset + FLEET_SLOT_SIZE <= length:
+            right = _int16(data, offset)
+            left = _int16(data, offset + 2)
+            # Platz mit ANGLE_NONE: Gerät in diesem Frame nicht gemeint, Sollwerte bleiben
+            addressed = right is not None or left is not None
+        else:
+            right = None
+            left = None
+            addressed = False
+        return
+
+    if data[0] != FRAME_MAGIC:
+        # JSON-Pfad allokiert ohnehin (dict, Strings) - nur für bestehende Sender
+        parsed = ujson.loads(_json_view(data, length))
+        seq = parsed.get("seq")
+        mode = parsed.get("mode_switch")
+        right = _angle_from_json(parsed.get("right_arm_angle"))
+        left = _angle_from_json(parsed.get("left_arm_angle"))
+        query = parsed.get("query")
+        reply_to = parsed.get("reply_to")
+        if "execute_at" in parsed:
+            execute_at = int(parsed["execute_at"]) & TICKS_MASK
+        return
+
+    if length < FRAME_SIZE:
+        raise ValueError("Frame zu kurz")
+    if data[1] == FRAME_VERSION_TIMED:
+        if length < FRAME_SIZE_TIMED:
+            raise ValueError("Frame zu kurz")
+        execute_at = uint30(data, FRAME_SIZE)
+    elif data[1] != FRAME_VERSION:
+        raise ValueError("Unbekannte Frame-Version")
+    if data[4] >= len(MODE_NAMES):
+        raise ValueError("Unbekannter Modus")
+    seq = data[2] | (data[3] << 8)
+    mode = MODE_NAMES[data[4]]
+    query = None
+    right = _int16(data, 5)
+    left = _int16(data, 7)
+
+def sample_time(data, i):
+    """
+    Sendezeit (ms, 16 Bit) des Samples i eines Sollwert-Stroms
+    """
+    offset = STREAM_HEADER + i * SAMPLE_SIZE
+    return data[offset] | (data[offset + 1] << 8)
+
+def sample_right(data, i):
+    return _int16(data, STREAM_HEADER + i * SAMPLE_SIZE + 2)
+
+def sample_left(data, i):
+    return _int16(data, STREAM_HEADER + i * SAMPLE_SIZE + 4)
+
+def parse_json(data):
+    """
+    Parst ein JSON-Datagramm (bytes oder str).
+    Rückgabe: (seq, mode, right, left) - Winkel in Zehntelgrad oder None
+    """
+    if data[0] == FRAME_MAGIC:
+        raise ValueError("Kein JSON-Datagramm")
+    decode(data)
+    return seq, mode, right, left
+
+def parse_frame(data):
+    """
+    Parst ein Binär-Frame.
+    Rückgabe wie parse_json: (seq, mode, right, left)
+    """
+    if data[0] != FRAME_MAGIC:
+        raise ValueError("Kein Binär-Frame")
+    decode(data)
+    return seq, mode, right, left
+
+def parse_packet(data, length=None):
+    """
+    Erkennt das Format am ersten Byte und parst das Datagramm entsprechend.
+    Rückgabe: (seq, mode, right, left)
+    """
+    decode(data, length)
+    return seq, mode, right, left
+
+def has_mode_switch(data, length=None):
+    """
+    Prüft ohne vollständiges Parsen, ob ein Datagramm einen Moduswechsel enthält
+    """
+    if length is None:
+        length = len(data)
+    if data[0] == FRAME_MAGIC:
+        return length >= FRAME_SIZE and data[4] != MODE_NONE
+    if data[0] == FLEET_MAGIC:
+        return length >= FLEET_HEADER and data[4] != MODE_NONE
+    if data[0] == STREAM_MAGIC or data[0] == SYNC_MAGIC:
+        return False
+    return b"mode_switch" in bytes(_json_view(data, length))
+
+def has_query(data, length=None):
+    """
+    Prüft ohne vollständiges Parsen, ob ein Datagramm eine Abfrage ist (nur JSON)
+    """
+    if length is None:
+        length = len(data)
+    if data[0] == FRAME_MAGIC or data[0] == STREAM_MAGIC or data[0] == FLEET_MAGIC or data[0] == SYNC_MAGIC:
+        return False
+    return b'"query"' in bytes(_json_view(data, length))
+
+def has_execute_at(data, length=None):
+    """
+    Prüft ohne vollständiges Parsen, ob ein Datagramm einen geplanten Befehl enthält
+    """
+    if length is None:
+        length = len(data)
+    if data[0] == FRAME_MAGIC or data[0] == FLEET_MAGIC:
+        return length >= 2 and data[1] == FRAME_VERSION_TIMED
+    if data[0] == STREAM_MAGIC or data[0] == SYNC_MAGIC:
+        return False
+    return b'"execute_at"' in bytes(_json_view(data, length))
+
+def peek_seq(data, length=None):
+    """
+    Liest die Sequenznummer ohne vollständiges Parsen (Binär-Frames ohne Allokation).
+    Rückgabe: None bei Synchronisation oder JSON ohne ganzzahliges "seq"
+    """
+    if length is None:
+        length = len(data)
+    if data[0] == FRAME_MAGIC or data[0] == FLEET_MAGIC or data[0] == STREAM_MAGIC:
+        return data[2] | (data[3] << 8) if length >= 4 else None
+    if data[0] == SYNC_MAGIC:
+        return None
+    text = bytes(_json_view(data, length))
+    i = text.find(b'"seq"')
+    if i < 0:
+        return None
+    i = text.find(b":", i + 5) + 1
+    if i == 0:
+        return None
+    while i < length and text[i] == 0x20:
+        i += 1
+    value = None
+    while i < length and 0x30 <= text[i] <= 0x39:
+        value = (value or 0) * 10 + text[i] - 0x30
+        i += 1
+    return value
+
+def is_sync(data):
+    return data[0] == SYNC_MAGIC
+
+def is_stream(data):
+    """
+    Sollwert-Strom mit mehreren Samples? Ältere Datagramme davon dürfen nicht verworfen werden.
+    """
+    return data[0] == STREAM_MAGIC
+
+def must_handle(data, length=None):
+    """
+    Ob ein Datagramm auch dann ausgewertet werden muss, wenn schon ein neuerer Sollwert
+    anliegt: Moduswechsel, Abfrage, Strom-Samples, Synchronisation oder geplanter Befehl
+    """
+    return (is_stream(data) or is_sync(data) or has_mode_switch(data, length)
+            or has_query(data, length) or has_execute_at(data, length))
+
+def encode_frame(seq, mode, right, left, execute_at=None):
+    """
+    Erzeugt ein Binär-Frame (für Sender und Tests).
+    mode: MODE_* Konstante, Winkel in Zehntelgrad oder None,
+    execute_at: Ausführungszeitpunkt der Sendeuhr in ms (Version 2) oder None
+    """
+    if right is None:
+        right = ANGLE_NONE
+    if left is None:
+        left = ANGLE_NONE
+    if execute_at is None:
+        return ustruct.pack(FRAME_FORMAT, FRAME_MAGIC, FRAME_VERSION, seq & 0xFFFF, mode, right, left)
+    return ustruct.pack(FRAME_FORMAT + "I", FRAME_MAGIC, FRAME_VERSION_TIMED, seq & 0xFFFF, mode,
+                        right, left, execute_at & 0xFFFFFFFF)
+
+def encode_fleet(seq, mode, first_id, slots, execute_at=None):
+    """
+    Erzeugt ein Flotten-Frame (für Sender und Tests).
+    slots: [(right, left) oder None, ...] für die Geräte first_id, first_id + 1, ...
+    execute_at: wie bei encode_frame()
+    """
+    if first_id + len(slots) > 256:
+        raise ValueError("Geräte-ID außerhalb 0..255")
+    version = FRAME_VERSION if execute_at is None else FRAME_VERSION_TIMED
+    out = bytearray(ustruct.pack("<BBHBBB", FLEET_MAGIC, version, seq & 0xFFFF, mode, first_id, len(slots)))
+    if execute_at is not None:
+        out += ustruct.pack("<I", execute_at & 0xFFFFFFFF)
+    for slot in slots:
+        r, l = slot if slot is not None else (None, None)
+        out += ustruct.pack("<hh", ANGLE_NONE if r is None else r, ANGLE_NONE if l is None else l)
+    return bytes(out)
+
+def encode_stream(seq, samples):
+    """
+    Erzeugt einen Sollwert-Strom (für Sender und Tests).
+    samples: [(zeit_ms, right, left), ...] vom ältesten zum neuesten, Winkel in Zehntelgrad
+    """
+    if not 0 < len(samples) <= STREAM_MAX_SAMPLES:
+        raise ValueError("Ungültige Sample-Anzahl")
+    out = bytearray(ustruct.pack("<BBH", STREAM_MAGIC, len(samples), seq & 0xFFFF))
+    for t, r, l in samples:
+        out += ustruct.pack("<Hhh", t & 0xFFFF, r, l)
+    return bytes(out)
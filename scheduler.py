@@ -0,0 +1,108 @@
+import time
+
+# Verhalten bei verpassten Deadlines
+POLICY_SKIP = 0        # Verpasste Ticks auslassen und auf das nächste Raster springen
+POLICY_CATCH_UP = 1    # Verpasste Ticks direkt hintereinander nachholen
+
+OVERRUN_TOLERANCE_US = 2000  # Verspätung, ab der ein Tick als Überlauf zählt
+
+
+class Ticker:
+    """
+    Fester Takt gegen absolute Deadlines (ticks_us).
+    Die Periode hängt nicht davon ab, wie lange die Arbeit im Tick dauert.
+    """
+
+    def __init__(self, period_ms, policy=POLICY_SKIP, max_catch_up=5):
+        self.period_us = period_ms * 1000
+        self.policy = policy
+        self.max_catch_up = max_catch_up  # Mehr verpasste Ticks werden auch bei CATCH_UP übersprungen
+        self.restart()
+
+    def restart(self):
+        """
+        Setzt das Raster auf "jetzt" und leert die Statistik
+        """
+        now = time.ticks_us()
+        self.deadline = time.ticks_add(now, self.period_us)
+        self.last_tick = now
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.min_period = 0
+        self.max_period = 0
+        self.sum_period = 0
+
+    def align(self, delay_us):
+        """
+        Verschiebt das Raster: die nächste Deadline liegt delay_us nach jetzt
+        """
+        self.deadline = time.ticks_add(time.ticks_us(), delay_us)
+
+    def resume(self):
+        """
+        Setzt das Raster nach einer Pause ab jetzt fort, ohne die Pause als Tick zu verbuchen
+        """
+        now = time.ticks_us()
+        self.deadline = time.ticks_add(now, self.period_us)
+        self.last_tick = now
+
+    def remaining_us(self):
+        """
+        Zeit bis zur nächsten Deadline (negativ = bereits verspätet)
+        """
+        return time.ticks_diff(self.deadline, time.ticks_us())
+
+    def wait(self):
+        """
+        Blockiert bis zur nächsten Deadline und verbucht den Tick
+        """
+        remaining = self.remaining_us()
+        if remaining > 0:
+            time.sleep_us(remaining)
+        self.mark()
+
+    def mark(self):
+        """
+        Verbucht einen Tick und legt die nächste Deadline fest.
+        Wird von wait() aufgerufen oder direkt, wenn der Aufrufer selbst wartet (uasyncio).
+        """
+        now = time.ticks_us()
+        period = time.ticks_diff(now, self.last_tick)
+        self.last_tick = now
+
+        if self.ticks == 0 or period < self.min_period:
+            self.min_period = period
+        if period > self.max_period:
+            self.max_period = period
+        self.sum_period += period
+        self.ticks += 1
+
+        late = time.ticks_diff(now, self.deadline)
+        if late > OVERRUN_TOLERANCE_US:
+            self.overruns += 1
+
+        missed = late // self.period_us if late > 0 else 0
+        if missed == 0 or (self.policy == POLICY_CATCH_UP and missed <= self.max_catch_up):
+            # Nächste Deadline im festen Raster (liegt bei CATCH_UP evtl. schon in der Vergangenheit)
+            self.deadline = time.ticks_add(self.deadline, self.period_us)
+        else:
+            # Verpasste Ticks auslassen, Raster bleibt erhalten
+            self.skipped += missed
+            self.deadline = time.ticks_add(self.deadline, (missed + 1) * self.period_us)
+
+    def mean_period(self):
+        if self.ticks == 0:
+            return 0
+        return self.sum_period // self.ticks
+
+    def report(self):
+        """
+        Jitter-Statistik seit dem letzten reset_stats() als Text
+        """
+        return (f"Takt: {self.ticks} Ticks, Periode min/mittel/max = "
+                f"{self.min_period}/{self.mean_period()}/{self.max_period} us, "
+                f"Überläufe: {self.overruns}, übersprungen: {self.skipped}")
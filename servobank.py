@@ -0,0 +1,327 @@
+import sys
+from array import array
+
+# Festkomma-Bewegungskern: Der ESP8266 hat keine FPU, deshalb laufen
+# Geschwindigkeiten und Interpolation als Ganzzahlen
+SPEED_MAX = 1023                 # Geschwindigkeit 0..1023 entspricht 0.0..1.0
+SPEED_STOP = SPEED_MAX * 5 // 100  # Bis 5% Stillstand
+PROGRESS_SHIFT = 10              # Übergangsfortschritt 0..1024 (1 << PROGRESS_SHIFT)
+LUT_SHIFT = 2                    # Speed >> LUT_SHIFT = Index in der Duty-Tabelle
+LUT_SIZE = (SPEED_MAX >> LUT_SHIFT) + 1
+
+# Feinere Duty-Auflösung: Die Tabellen enthalten Duty-Werte in 8.8-Festkomma,
+# damit Zwischenstufen zwischen STOP und FULL_FORWARD nicht verloren gehen.
+# Einheit ist immer die 10-Bit-Duty des ESP8266 bei 50 Hz (0..1023 = 0..20 ms),
+# auch beim PCA9685 - so gelten dieselben Kalibrierwerte für beide Backends.
+DUTY_FRAC_BITS = 8
+DUTY_ONE = 1 << DUTY_FRAC_BITS
+DUTY_FRAC_MASK = DUTY_ONE - 1
+DUTY_NS_PER_STEP = 19531  # 20ms Periode / 1024 Duty-Stufen bei 50 Hz
+
+
+def build_duty_lut(stop, full, lut=None, offset=0):
+    """
+    Baut die Speed→Duty-Tabelle eines Servos aus den Kalibrierwerten.
+    Einträge sind Duty-Werte in 8.8-Festkomma. Mit lut/offset wird in eine
+    bestehende Tabelle geschrieben statt eine neue anzulegen.
+    """
+    if lut is None:
+        lut = array("H", bytes(2 * LUT_SIZE))
+    for i in range(LUT_SIZE):
+        speed = i * SPEED_MAX // (LUT_SIZE - 1)
+        if speed <= SPEED_STOP:
+            lut[offset + i] = stop << DUTY_FRAC_BITS
+        else:
+            lut[offset + i] = (stop << DUTY_FRAC_BITS) + ((full - stop) << DUTY_FRAC_BITS) * speed // SPEED_MAX
+    return lut
+
+
+def build_curve_lut(stop, curve, lut=None, offset=0):
+    """
+    Wie build_duty_lut(), aber aus einer gemessenen Kennlinie (siehe calibration.py):
+    curve[k] ist der Duty (8.8) für k / (len(curve) - 1) der vollen Geschwindigkeit,
+    dazwischen wird linear interpoliert. stop ebenfalls in 8.8.
+    """
+    if lut is None:
+        lut = array("H", bytes(2 * LUT_SIZE))
+    segments = len(curve) - 1
+    for i in range(LUT_SIZE):
+        speed = i * SPEED_MAX // (LUT_SIZE - 1)
+        if speed <= SPEED_STOP:
+            lut[offset + i] = stop
+            continue
+        position = speed * segments
+        k = position // SPEED_MAX
+        if k >= segments:
+            lut[offset + i] = curve[segments]
+        else:
+            low = curve[k]
+            lut[offset + i] = low + (curve[k + 1] - low) * (position - k * SPEED_MAX) // SPEED_MAX
+    return lut
+
+
+class PWMBackend:
+    """
+    Servos direkt an PWM-Pins des Boards (machine.PWM).
+    output: "coarse" = duty() wie bisher, "dither" = Sigma-Delta zwischen benachbarten
+    duty()-Werten, "u16"/"ns" = duty_u16()/duty_ns() (Port muss feiner auflösen),
+    "auto" = duty_ns() wo verfügbar und feiner als 10 Bit, sonst Dithering
+    """
+
+    def __init__(self, output="auto", freq=50):
+        self.freq = freq
+        self.output = output
+        self.pwms = []
+        self.dither_acc = None
+
+    def attach(self, pins):
+        from machine import Pin, PWM
+        self.pwms = [PWM(Pin(pin), freq=self.freq) for pin in pins]
+        self.dither_acc = array("H", bytes(2 * len(pins)))  # Sigma-Delta-Akkumulator je Kanal
+        if self.output == "auto":
+            # Der ESP8266 kennt duty_ns(), löst intern aber auch nur 10 Bit auf
+            if sys.platform != "esp8266" and hasattr(self.pwms[0], "duty_ns"):
+                self.output = "ns"
+            else:
+                self.output = "dither"
+
+    def write(self, channel, duty):
+        """
+        Gibt einen 8.8-Festkomma-Duty-Wert mit der gewählten Auflösung aus
+        """
+        servo = self.pwms[channel]
+        if self.output == "dither":
+            # Nachkommaanteil aufsummieren, bei Überlauf eine Stufe höher ausgeben: im Mittel
+            # ergibt sich der exakte Duty-Wert. Der Akkumulator rückt je write() vor, also je
+            # Regeltakt und nicht je PWM-Periode - bei 1/256 wechselt die Stufe nur alle
+            # 256 Takte (12.8 s bei 50 ms). Gemessen in tools/bench_motion.py.
+            acc = self.dither_acc[channel] + (duty & DUTY_FRAC_MASK)
+            duty >>= DUTY_FRAC_BITS
+            if acc >= DUTY_ONE:
+                acc -= DUTY_ONE
+                duty += 1
+            self.dither_acc[channel] = acc
+            servo.duty(duty)
+        elif self.output == "ns":
+            servo.duty_ns((duty * DUTY_NS_PER_STEP) >> DUTY_FRAC_BITS)
+        elif self.output == "u16":
+            # 10-Bit-Duty * 64 = 16-Bit-Duty
+            servo.duty_u16(duty >> (DUTY_FRAC_BITS - 6))
+        else:
+            servo.duty(duty >> DUTY_FRAC_BITS)
+
+    def flush(self):
+        pass
+
+    def deinit(self):
+        for servo in self.pwms:
+            servo.deinit()
+
+
+# Register des PCA9685
+PCA_MODE1 = 0x00
+PCA_MODE2 = 0x01
+PCA_LED0_ON_L = 0x06
+PCA_PRESCALE = 0xFE
+PCA_MODE1_SLEEP = 0x10
+PCA_MODE1_AI = 0x20       # Auto-Increment: ein Block schreibt mehrere Kanäle
+PCA_MODE1_RESTART = 0x80
+PCA_OSC_HZ = 25000000
+
+
+class PCA9685Backend:
+    """
+    16-Kanal-PWM-Expander PCA9685 an I2C. Pins sind hier die Kanalnummern 0..15.
+    write() sammelt nur im Puffer, flush() schreibt alle Kanäle eines Ticks
+    in einer einzigen I2C-Transaktion.
+    """
+
+    def __init__(self, i2c, address=0x40, freq=50):
+        self.i2c = i2c
+        self.address = address
+        self.freq = freq
+        self.first = 0
+        self.offsets = None
+        self.buf = None
+        self.dirty = False
+
+    def attach(self, pins):
+        # Block vom niedrigsten bis zum höchsten Kanal, Lücken bleiben aus (ON = OFF = 0)
+        self.first = min(pins)
+        self.buf = bytearray(4 * (max(pins) - self.first + 1))
+        self.offsets = array("B", [4 * (pin - self.first) for pin in pins])
+
+        prescale = (PCA_OSC_HZ + 2048 * self.freq) // (4096 * self.freq) - 1
+        self.i2c.writeto_mem(self.address, PCA_MODE1, bytes((PCA_MODE1_SLEEP,)))
+        self.i2c.writeto_mem(self.address, PCA_PRESCALE, bytes((prescale,)))
+        self.i2c.writeto_mem(self.address, PCA_MODE1, bytes((PCA_MODE1_AI,)))
+        self.i2c.writeto_mem(self.address, PCA_MODE2, bytes((0x04,)))  # Totem-Pole-Ausgänge
+        self.i2c.writeto_mem(self.address, PCA_MODE1, bytes((PCA_MODE1_AI | PCA_MODE1_RESTART,)))
+
+    def write(self, channel, duty):
+        # 8.8-Duty in 1024stel → 12-Bit-Zähler des PCA9685 (4096 pro Periode)
+        off = duty >> (DUTY_FRAC_BITS - 2)
+        i = self.offsets[channel]
+        self.buf[i + 2] = off & 0xFF
+        self.buf[i + 3] = off >> 8
+        self.dirty = True
+
+    def flush(self):
+        if self.dirty:
+            self.i2c.writeto_mem(self.address, PCA_LED0_ON_L + 4 * self.first, self.buf)
+            self.dirty = False
+
+    def deinit(self):
+        for i in range(len(self.buf)):
+            self.buf[i] = 0
+        self.i2c.writeto_mem(self.address, PCA_LED0_ON_L + 4 * self.first, self.buf)
+
+
+class ServoBank:
+    """
+    N Servos mit spaltenweisem Zustand in arrays (ein Eintrag je Kanal).
+    Ein Tick ist interpolate()/set_speed() gefolgt von genau einem write().
+    write() spricht die Hardware nur für Kanäle an, deren Duty sich geändert hat.
+    """
+
+    def __init__(self, backend, pins, stops, fulls):
+        n = len(pins)
+        self.count = n
+        self.backend = backend
+        self.pins = array("B", pins)
+        self.stop = array("H", stops)
+        self.full = array("H", fulls)
+        self.current = array("H", bytes(2 * n))  # Startgeschwindigkeit der laufenden Phase
+        self.target = array("H", bytes(2 * n))   # Zielgeschwindigkeit der laufenden Phase
+        self.speed = array("H", bytes(2 * n))    # Zuletzt berechnete Geschwindigkeit
+        self.duty = array("H", bytes(2 * n))     # Zuletzt geschriebener Duty (8.8), 0 = noch nie
+        self.writes = 0      # Schreibzugriffe auf die Hardware (je Kanal)
+        self.redundant = 0   # Ausgelassene, weil der Duty unverändert war
+        self.lut = array("H", bytes(2 * n * LUT_SIZE))
+        for channel in range(n):
+            self.calibrate(channel, stops[channel], fulls[channel])
+        backend.attach(pins)
+        # Dithering braucht fortlaufende Schreibzugriffe ("auto" steht erst nach attach() fest)
+        self.dither = getattr(backend, "output", None) == "dither"
+
+    def calibrate(self, channel, stop, full):
+        """
+        Setzt die Kalibrierwerte eines Kanals und baut seine Duty-Tabelle neu
+        """
+        self.stop[channel] = stop
+        self.full[channel] = full
+        build_duty_lut(stop, full, self.lut, channel * LUT_SIZE)
+
+    def calibrate_curve(self, channel, stop, curve):
+        """
+        Duty-Tabelle eines Kanals aus einer gemessenen Kennlinie (8.8-Werte, siehe calibration.py).
+        stop/full werden auf die nächsten ganzen Duty-Werte gesetzt.
+        """
+        self.stop[channel] = (stop + DUTY_ONE // 2) >> DUTY_FRAC_BITS
+        self.full[channel] = (curve[len(curve) - 1] + DUTY_ONE // 2) >> DUTY_FRAC_BITS
+        build_curve_lut(stop, curve, self.lut, channel * LUT_SIZE)
+
+    def duty_for(self, channel, speed):
+        """
+        Speed [0–SPEED_MAX] → PWM Duty (8.8-Festkomma) für einen Kanal
+        """
+        return self.lut[channel * LUT_SIZE + (speed >> LUT_SHIFT)]
+
+    def start_phase(self):
+        """
+        Bisherige Ziele werden zu Startgeschwindigkeiten der neuen Phase
+        """
+        for channel in range(self.count):
+            self.current[channel] = self.target[channel]
+
+    def max_delta(self):
+        """
+        Größter Geschwindigkeitssprung current → target über alle Kanäle
+        """
+        delta = 0
+        for channel in range(self.count):
+            step = self.target[channel] - self.current[channel]
+            if step < 0:
+                step = -step
+            if step > delta:
+                delta = step
+        return delta
+
+    def interpolate(self, progress):
+        """
+        Überblendung aller Kanäle von current nach target.
+        progress: 0 = Start, 1 << PROGRESS_SHIFT = Ziel erreicht (ggf. aus einem Bewegungsprofil)
+        """
+        # Heißer Pfad (jeder Tick): Spalten einmal in lokale Variablen statt je Kanal self.x
+        current = self.current
+        target = self.target
+        speed = self.speed
+        for channel in range(self.count):
+            start = current[channel]
+            speed[channel] = start + (((target[channel] - start) * progress) >> PROGRESS_SHIFT)
+
+    def hold(self):
+        """
+        Alle Kanäle auf ihrem Ziel halten
+        """
+        target = self.target
+        speed = self.speed
+        for channel in range(self.count):
+            speed[channel] = target[channel]
+
+    def set_speed(self, channel, speed):
+        self.speed[channel] = speed
+
+    def stop_all(self):
+        for channel in range(self.count):
+            self.speed[channel] = 0
+
+    def pending(self):
+        """
+        Ob write() etwas anderes ausgeben würde als zuletzt. Beim Dithering mit Nachkommaanteil
+        immer: dort ergibt sich der Duty-Wert erst aus fortlaufenden Schreibzugriffen.
+        """
+        lut = self.lut
+        speed = self.speed
+        last = self.duty
+        dither = self.dither
+        offset = 0
+        for channel in range(self.count):
+            duty = lut[offset + (speed[channel] >> LUT_SHIFT)]
+            offset += LUT_SIZE
+            if duty != last[channel] or (dither and duty & DUTY_FRAC_MASK):
+                return True
+        return False
+
+    def write(self):
+        """
+        Schreibt die geänderten Duty-Werte (ein Block beim I2C-Backend, nur wenn sich etwas änderte)
+        """
+        lut = self.lut
+        speed = self.speed
+        last = self.duty
+        backend = self.backend
+        dither = self.dither
+        offset = 0
+        written = 0
+        for channel in range(self.count):
+            duty = lut[offset + (speed[channel] >> LUT_SHIFT)]
+            offset += LUT_SIZE
+            if duty == last[channel] and not (dither and duty & DUTY_FRAC_MASK):
+                continue
+            last[channel] = duty
+            backend.write(channel, duty)
+            written += 1
+        self.writes += written
+        self.redundant += self.count - written
+        backend.flush()
+
+    def invalidate(self):
+        """
+        Beim nächsten write() alle Kanäle schreiben (z.B. nachdem die Hardware zurückgesetzt wurde)
+        """
+        for channel in range(self.count):
+            self.duty[channel] = 0
+
+    def deinit(self):
+        self.backend.deinit()
@@ -0,0 +1,22 @@
+"""
+Host-Simulation für die Firmware (nur CPython, wird nicht aufs Board kopiert).
+
+Stellt machine/network/socket/ujson/urandom/... als Stand-ins bereit, treibt sie
+mit einer virtuellen Uhr schneller als Echtzeit an und zeichnet jeden
+PWM-Schreibzugriff auf. Beispiel:
+
+    from sim import Simulation
+    sim = Simulation(seconds=20)
+    sim.net.send(b'{"right_arm_angle": 90, "left_arm_angle": 45}', 8080, at_us=5000000)
+    sim.run_file("main.py", quiet=True)
+    print(sim.duty_writes(5)[-1])
+
+Dateien, die die Firmware schreibt (wifi.json, calib.bin, ...), landen in sim.flash_dir,
+einem temporären Verzeichnis - mit Simulation(flash_dir=...) bzw. --flash bleiben sie erhalten.
+
+Kommandozeile: python -m sim --help
+"""
+from .clock import SimulationEnd, VirtualClock, WallClock
+from .runner import Simulation
+
+__all__ = ["Simulation", "SimulationEnd", "VirtualClock", "WallClock"]
@@ -0,0 +1,97 @@
+"""
+python -m sim [SKRIPT | MODUL:FUNKTION] [--seconds N] [--trace datei.csv] ...
+"""
+import argparse
+import ast
+import time
+from collections import Counter
+
+from . import Simulation
+
+
+def parse_override(text):
+    name, _, value = text.partition("=")
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass  # als String übernehmen
+    return name, value
+
+
+def adc_signal(steps, noise, rng):
+    """
+    Treppenverlauf aus ["WERT" | "SEKUNDE:WERT", ...] plus Gaußrauschen → f(t_us)
+    """
+    points = []
+    for step in steps:
+        at, _, value = step.rpartition(":")
+        points.append((float(at or 0) * 1000000, float(value)))
+    points.sort()
+
+    def signal(t_us):
+        level = 512
+        for at_us, value in points:
+            if t_us >= at_us:
+                level = value
+        return level + (rng.gauss(0, noise) if noise else 0)
+    return signal
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m sim", description="Firmware auf dem Host simulieren")
+    parser.add_argument("target", nargs="?", default="main.py",
+                        help="Skript (main.py, test.py, old/animattett_servos.py) oder modul:funktion")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Simulierte Laufzeit")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert für urandom")
+    parser.add_argument("--boot", action="store_true", help="Vorher boot.py ausführen")
+    parser.add_argument("--flash", metavar="VERZEICHNIS",
+                        help="Flash-Dateisystem des Boards, bleibt erhalten (Standard: leer, temporär)")
+    parser.add_argument("--file", action="append", default=[], metavar="PFAD[:NAME]",
+                        help="Datei vor dem Lauf ins Flash kopieren (z.B. show.zkc)")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=WERT",
+                        help="Konstante im Modul überschreiben (nur bei modul:funktion)")
+    parser.add_argument("--tacho", action="append", default=[], metavar="PWM:TACHO[:STOP_US]",
+                        help="Servo an PWM-Pin mit Drehzahlgeber an TACHO-Pin simulieren (für calibrate.py)")
+    parser.add_argument("--adc", action="append", default=[], metavar="[SEKUNDE:]WERT",
+                        help="ADC-Wert (Poti) ab der angegebenen Sekunde, mehrfach für einen Verlauf")
+    parser.add_argument("--adc-noise", type=float, default=0, help="Standardabweichung des ADC-Rauschens")
+    parser.add_argument("--trace", help="Duty-Trace als CSV speichern")
+    parser.add_argument("--quiet", action="store_true", help="Konsolenausgabe der Firmware unterdrücken")
+    args = parser.parse_args()
+
+    sim = Simulation(seconds=args.seconds, seed=args.seed, flash_dir=args.flash)
+    for spec in args.file:
+        path, _, name = spec.partition(":")
+        sim.add_file(path, name or None)
+    for spec in args.tacho:
+        pwm_pin, tacho_pin, *stop = (int(part) for part in spec.split(":"))
+        sim.attach_tacho(pwm_pin, tacho_pin, **({"stop_us": stop[0]} if stop else {}))
+    if args.adc or args.adc_noise:
+        sim.adc = adc_signal(args.adc, args.adc_noise, sim.random)
+    started = time.perf_counter()
+    if args.boot:
+        boot_end = sim.clock.end_us
+        sim.clock.end_us = None
+        sim.run_file("boot.py", quiet=args.quiet)
+        sim.clock.end_us = sim.clock.now_us + boot_end  # --seconds zählt ab Ende von boot.py
+    if ":" in args.target:
+        module, function = args.target.split(":", 1)
+        overrides = dict(parse_override(item) for item in args.set)
+        sim.run_function(module, function, overrides=overrides, quiet=args.quiet)
+    else:
+        sim.run_file(args.target, quiet=args.quiet)
+    wall = time.perf_counter() - started
+
+    simulated = sim.clock.now_us / 1000000
+    print(f"Simuliert: {simulated:.1f} s in {wall:.2f} s ({simulated / max(wall, 1e-9):.0f}x Echtzeit)")
+    writes = Counter(pin for _, pin, _, _ in sim.trace)
+    for pin, count in sorted(writes.items(), key=lambda item: str(item[0])):
+        values = sorted({value for _, p, _, value in sim.trace if p == pin})
+        print(f"Pin {pin}: {count} Duty-Schreibzugriffe, Werte {values[:12]}{' ...' if len(values) > 12 else ''}")
+    if args.trace:
+        sim.write_trace(args.trace)
+        print(f"Trace: {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Virtuelle Zeit für die Simulation.
+
+Die Firmware sieht nur ticks_ms/ticks_us/sleep* - hier laufen diese gegen einen
+Zähler, der nur beim Schlafen vorrückt. Dadurch läuft die Simulation schneller
+als Echtzeit und ist reproduzierbar. Timer und Host-Ereignisse (z.B. eingehende
+Datagramme) werden als Events zu ihrem Zeitpunkt ausgeführt.
+"""
+import heapq
+import time as _time
+import types
+
+# Wie auf dem ESP8266: ticks_* laufen nach 2^30 über
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+
+EPOCH_2000 = 946684800  # MicroPython zählt time.time() ab 2000-01-01 (Unix-Sekunden bis dahin)
+
+
+class SimulationEnd(Exception):
+    """Wird ausgelöst, sobald die virtuelle Zeit das Simulationsende erreicht"""
+
+
+class Event:
+    def __init__(self, at_us, callback, period_us=0):
+        self.at_us = at_us
+        self.callback = callback
+        self.period_us = period_us
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Virtuelle Uhr in Mikrosekunden mit Ereignis-Warteschlange
+    """
+
+    def __init__(self, end_us=None, drift_ppm=0, offset_us=0):
+        self.now_us = 0
+        self.end_us = end_us
+        self.drift_ppm = drift_ppm    # Gangabweichung der lokalen Uhr gegenüber der Simulationszeit
+        self.offset_us = offset_us    # Startwert der lokalen Uhr
+        self._events = []
+        self._seq = 0
+
+    def local_us(self):
+        """
+        Lokale Uhr des simulierten Boards (mit Offset und Drift)
+        """
+        return self.offset_us + self.now_us + self.now_us * self.drift_ppm // 1000000
+
+    def call_at(self, at_us, callback, period_us=0):
+        event = Event(at_us, callback, period_us)
+        self._push(event)
+        return event
+
+    def call_later(self, delay_us, callback):
+        return self.call_at(self.now_us + delay_us, callback)
+
+    def call_every(self, period_us, callback, first_us=None):
+        start = self.now_us + period_us if first_us is None else first_us
+        return self.call_at(start, callback, period_us)
+
+    def _push(self, event):
+        self._seq += 1
+        heapq.heappush(self._events, (event.at_us, self._seq, event))
+
+    def next_event_us(self):
+        while self._events and self._events[0][2].cancelled:
+            heapq.heappop(self._events)
+        return self._events[0][0] if self._events else None
+
+    def advance(self, delta_us):
+        self.run_until(self.now_us + max(0, int(delta_us)))
+
+    def run_until(self, target_us):
+        """
+        Rückt die Zeit bis target_us vor und führt fällige Ereignisse in Reihenfolge aus
+        """
+        if self.end_us is not None and target_us > self.end_us:
+            target_us = self.end_us
+        while self._events and self._events[0][0] <= target_us:
+            at_us, _, event = heapq.heappop(self._events)
+            if event.cancelled:
+                continue
+            self.now_us = max(self.now_us, at_us)
+            if event.period_us:
+                event.at_us = at_us + event.period_us
+                self._push(event)
+            event.callback()
+        self.now_us = max(self.now_us, target_us)
+        self.check_end()
+
+    def check_end(self):
+        if self.end_us is not None and self.now_us >= self.end_us:
+            raise SimulationEnd()
+
+
+class WallClock(VirtualClock):
+    """
+    Echtzeit-Uhr mit derselben Schnittstelle - für Benchmarks, bei denen die
+    tatsächliche Rechenzeit auf dem Host gemessen werden soll
+    """
+
+    def __init__(self, end_us=None):
+        super().__init__(end_us)
+        self._start = _time.perf_counter_ns()
+
+    @property
+    def now_us(self):
+        return (_time.perf_counter_ns() - self._start) // 1000
+
+    @now_us.setter
+    def now_us(self, value):
+        pass
+
+    def local_us(self):
+        return self.now_us
+
+    def run_until(self, target_us):
+        delay = target_us - self.now_us
+        if delay > 0:
+            _time.sleep(delay / 1000000)
+        super().run_until(target_us)
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+
+def time_module(clock):
+    """
+    Erzeugt ein MicroPython-kompatibles time-Modul auf Basis der Uhr.
+    Nicht nachgebildete Attribute fallen auf das echte time-Modul zurück.
+    """
+    module = types.ModuleType("time")
+
+    module.ticks_us = lambda: clock.local_us() & TICKS_MAX
+    module.ticks_ms = lambda: (clock.local_us() // 1000) & TICKS_MAX
+    module.ticks_cpu = module.ticks_us
+    module.ticks_add = ticks_add
+    module.ticks_diff = ticks_diff
+    module.sleep = lambda seconds: clock.advance(seconds * 1000000)
+    module.sleep_ms = lambda ms: clock.advance(ms * 1000)
+    module.sleep_us = lambda us: clock.advance(us)
+    # Ohne gestellte RTC beginnt die Zeit wie auf dem Board bei 2000-01-01
+    module.time = lambda: clock.local_us() // 1000000
+    module.time_ns = lambda: clock.local_us() * 1000
+    module.gmtime = lambda secs=None: _time.gmtime(EPOCH_2000 + (module.time() if secs is None else secs))[:8]
+    module.localtime = module.gmtime
+    module.__getattr__ = lambda name: getattr(_time, name)
+    return module
@@ -0,0 +1,282 @@
+"""
+Stand-ins für das MicroPython-Modul machine: Pin, PWM, ADC, Timer, I2C.
+
+Jeder Schreibzugriff auf einen PWM-Kanal landet mit Zeitstempel im Trace der
+Simulation (sim.trace), damit ganze Läufe verglichen werden können. Am I2C-Bus
+hängen die Geräte aus sim.i2c_devices (Standard: ein PCA9685 auf 0x40).
+"""
+import types
+
+TACHO_IDLE_US = 5000  # Abfrageintervall des Drehzahlmodells bei Stillstand
+
+
+class PCA9685:
+    """
+    Registermodell des PCA9685: Auto-Increment, PRESCALE nur im Sleep-Modus schreibbar.
+    Geänderte Kanäle landen im Trace als Pin "PCA<n>" mit dem OFF-Zähler (ON ist immer 0).
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.regs = bytearray(256)
+        self.regs[0x00] = 0x11  # MODE1 nach Reset: SLEEP | ALLCALL
+        self.regs[0xFE] = 0x1E  # PRESCALE nach Reset (200 Hz)
+        for channel in range(16):
+            self.regs[0x09 + 4 * channel] = 0x10  # FULL_OFF
+        self.transactions = 0
+
+    @property
+    def freq(self):
+        return 25000000 / (4096 * (self.regs[0xFE] + 1))
+
+    def counts(self, channel):
+        base = 0x06 + 4 * channel
+        on = self.regs[base] | (self.regs[base + 1] & 0x0F) << 8
+        off = self.regs[base + 2] | (self.regs[base + 3] & 0x0F) << 8
+        return off - on
+
+    def write(self, mem, data):
+        self.transactions += 1
+        auto_increment = self.regs[0x00] & 0x20
+        for i, value in enumerate(data):
+            reg = mem + i if auto_increment else mem
+            if reg == 0xFE and not self.regs[0x00] & 0x10:
+                continue  # PRESCALE wird außerhalb des Sleep-Modus ignoriert
+            self.regs[reg & 0xFF] = value
+        if self.regs[0x00] & 0x10:
+            return  # Oszillator aus - keine Ausgabe
+        end = mem + (len(data) if auto_increment else 1)
+        for channel in range(16):
+            base = 0x06 + 4 * channel
+            if mem < base + 4 and base < end:
+                self.sim.record(f"PCA{channel}", "pca9685", self.counts(channel))
+
+    def read(self, mem, nbytes):
+        return bytes(self.regs[(mem + i) & 0xFF] for i in range(nbytes))
+
+
+class ServoTacho:
+    """
+    Dauerrotations-Servo (FS90R-artig) mit Lochscheibe und Lichtschranke: erzeugt auf dem
+    Tacho-Pin Impulse mit der Drehzahl, die zur aktuellen Pulsbreite am PWM-Pin gehört.
+    Totband stop_us ± dead_us, volle Drehzahl max_rpm ab range_us jenseits des Totbands.
+    """
+
+    def __init__(self, sim, pwm_pin, tacho_pin, stop_us=1500, dead_us=20, range_us=200,
+                 max_rpm=130, pulses_per_rev=20):
+        self.sim = sim
+        self.pwm_pin = pwm_pin
+        self.tacho_pin = tacho_pin
+        self.stop_us = stop_us
+        self.dead_us = dead_us
+        self.range_us = range_us
+        self.max_rpm = max_rpm
+        self.pulses_per_rev = pulses_per_rev
+        self.pulses = 0
+        sim.clock.call_later(TACHO_IDLE_US, self._step)
+
+    def rpm(self, width_us):
+        excess = abs(width_us - self.stop_us) - self.dead_us
+        if width_us <= 0 or excess <= 0:
+            return 0
+        x = min(1.0, excess / self.range_us)
+        return self.max_rpm * (1 - (1 - x) ** 2)  # Flacht zur Sättigung hin ab
+
+    def _step(self):
+        pwm = self.sim.pwms.get(self.pwm_pin)
+        rpm = self.rpm(pwm.width_ns / 1000) if pwm is not None else 0
+        pin = self.sim.pins.get(self.tacho_pin)
+        if rpm and pin is not None:
+            pin.set_input(1)
+            pin.set_input(0)
+            self.pulses += 1
+        delay = 60000000 / (rpm * self.pulses_per_rev) if rpm else TACHO_IDLE_US
+        self.sim.clock.call_later(int(delay), self._step)
+
+
+def machine_module(sim):
+    """
+    Erzeugt ein machine-Modul, dessen Peripherie an die Simulation sim gebunden ist
+    """
+
+    class Pin:
+        IN = 0
+        OUT = 1
+        OPEN_DRAIN = 2
+        PULL_UP = 1
+        PULL_DOWN = 2
+        IRQ_RISING = 1
+        IRQ_FALLING = 2
+
+        def __init__(self, id, mode=-1, pull=-1, value=None):
+            self.id = id
+            self.mode = mode
+            self._value = 0 if value is None else value
+            self._handler = None
+            self._trigger = 0
+            sim.pins[id] = self
+
+        def init(self, mode=-1, pull=-1, value=None):
+            self.mode = mode
+            if value is not None:
+                self._value = value
+
+        def value(self, value=None):
+            if value is None:
+                return self._value
+            self.set_input(value)
+
+        def __call__(self, value=None):
+            return self.value(value)
+
+        def on(self):
+            self.value(1)
+
+        def off(self):
+            self.value(0)
+
+        def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING):
+            self._handler = handler
+            self._trigger = trigger
+
+        def set_input(self, value):
+            """
+            Pegel von außen setzen (Simulation) - löst ggf. den IRQ-Handler aus
+            """
+            value = 1 if value else 0
+            old = self._value
+            self._value = value
+            if self._handler is None or old == value:
+                return
+            if (value and self._trigger & Pin.IRQ_RISING) or (not value and self._trigger & Pin.IRQ_FALLING):
+                self._handler(self)
+
+        def __repr__(self):
+            return f"Pin({self.id})"
+
+    def _pin_id(pin):
+        return pin.id if isinstance(pin, Pin) else pin
+
+    class PWM:
+        def __init__(self, pin, freq=None, duty=None, duty_u16=None, duty_ns=None):
+            self.pin = _pin_id(pin)
+            self._freq = freq or 1000
+            self._duty = 0
+            self.width_ns = 0  # Aktuelle Pulsbreite (für das Drehzahlmodell)
+            sim.pwms[self.pin] = self
+            if duty is not None:
+                self.duty(duty)
+            if duty_u16 is not None:
+                self.duty_u16(duty_u16)
+            if duty_ns is not None:
+                self.duty_ns(duty_ns)
+
+        def init(self, freq=None, duty=None):
+            if freq is not None:
+                self._freq = freq
+            if duty is not None:
+                self.duty(duty)
+
+        def freq(self, value=None):
+            if value is None:
+                return self._freq
+            self._freq = value
+
+        def duty(self, value=None):
+            if value is None:
+                return self._duty
+            self._duty = int(value)
+            self.width_ns = self._duty * 1000000000 // (1024 * self._freq)
+            sim.record(self.pin, "duty", self._duty)
+
+        def duty_u16(self, value=None):
+            if value is None:
+                return self._duty * 64
+            self._duty = int(value) >> 6
+            self.width_ns = int(value) * 1000000000 // (65536 * self._freq)
+            sim.record(self.pin, "duty_u16", int(value))
+
+        def duty_ns(self, value=None):
+            period_ns = 1000000000 // self._freq
+            if value is None:
+                return self._duty * period_ns // 1024
+            self._duty = int(value) * 1024 // period_ns
+            self.width_ns = int(value)
+            sim.record(self.pin, "duty_ns", int(value))
+
+        def deinit(self):
+            sim.record(self.pin, "deinit", 0)
+
+    class ADC:
+        def __init__(self, channel):
+            self.channel = _pin_id(channel)
+
+        def read(self):
+            """
+            0..1023 wie auf dem ESP8266 - Wert kommt aus sim.adc (Zahl oder Funktion der Zeit)
+            """
+            value = sim.adc(sim.clock.now_us) if callable(sim.adc) else sim.adc
+            return max(0, min(1023, int(value)))
+
+        def read_u16(self):
+            return self.read() * 64
+
+    class Timer:
+        ONE_SHOT = 0
+        PERIODIC = 1
+
+        def __init__(self, id=-1):
+            self.id = id
+            self._event = None
+
+        def init(self, mode=PERIODIC, period=None, freq=None, callback=None):
+            self.deinit()
+            period_us = int(1000000 / freq) if freq else int(period) * 1000
+            if mode == Timer.PERIODIC:
+                self._event = sim.clock.call_every(period_us, lambda: callback(self))
+            else:
+                self._event = sim.clock.call_later(period_us, lambda: callback(self))
+
+        def deinit(self):
+            if self._event is not None:
+                self._event.cancel()
+                self._event = None
+
+    class I2C:
+        def __init__(self, id=-1, scl=None, sda=None, freq=400000):
+            self.freq = freq
+
+        def _device(self, addr):
+            device = sim.i2c_devices.get(addr)
+            if device is None:
+                raise OSError(19, "ENODEV")  # Kein ACK wie auf dem Board
+            return device
+
+        def scan(self):
+            return sorted(sim.i2c_devices)
+
+        def writeto_mem(self, addr, memaddr, buf):
+            self._device(addr).write(memaddr, bytes(buf))
+
+        def readfrom_mem(self, addr, memaddr, nbytes):
+            return self._device(addr).read(memaddr, nbytes)
+
+        def readfrom_mem_into(self, addr, memaddr, buf):
+            buf[:] = self._device(addr).read(memaddr, len(buf))
+
+    module = types.ModuleType("machine")
+    module.Pin = Pin
+    module.I2C = I2C
+    module.SoftI2C = I2C
+    module.PWM = PWM
+    module.ADC = ADC
+    module.Timer = Timer
+    module.freq = lambda value=None: 80000000 if value is None else None
+    module.unique_id = lambda: sim.unique_id
+    module.reset = lambda: sim.stop("machine.reset()")
+    module.idle = lambda: sim.clock.advance(1000)
+    module.lightsleep = lambda ms=0: sim.lightsleep(ms)
+    module.deepsleep = lambda ms=0: sim.stop("machine.deepsleep()")
+    module.disable_irq = lambda: 0
+    module.enable_irq = lambda state=0: None
+    return module
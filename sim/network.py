@@ -0,0 +1,346 @@
+"""
+Stand-ins für network (WLAN) und socket (UDP) mit einem Loopback-Netz.
+
+Datagramme werden nicht über echte Sockets verschickt, sondern in der virtuellen
+Zeit zugestellt: Jedes Paket bekommt eine Ankunftszeit (Sendezeit + Latenz) und
+ist für readinto()/recvfrom() erst ab dann sichtbar. Wie beim lwIP-Stack des
+ESP8266 fasst die Empfangs-Queue eines Sockets nur wenige Datagramme.
+"""
+import types
+
+from .clock import SimulationEnd
+
+DEFAULT_IP = "192.168.0.50"
+AP_BSSID = b"\x00\x11\x22\x33\x44\x55"
+RX_QUEUE_LIMIT = 8  # Datagramme, die lwIP pro Socket puffert - darüber wird verworfen
+BEACON_US = 102400  # Beacon-Intervall (DTIM 1): im WLAN-Stromsparmodus kommen Datagramme erst dann an
+
+
+class LoopbackNetwork:
+    """
+    Verbindet alle simulierten Sockets eines Laufs (Broadcast-Semantik pro Port)
+    """
+
+    def __init__(self, clock, latency_us=1000):
+        self.clock = clock
+        self.latency_us = latency_us
+        self.sockets = []
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.power_save = False  # Gesetzt über WLAN.config(pm=PM_POWERSAVE)
+
+    def send(self, data, port, src=("192.168.0.10", 5000), at_us=None, latency_us=None):
+        """
+        Schickt ein Datagramm an alle Sockets auf port (Host-Seite, z.B. Broadcaster).
+        at_us: Sendezeitpunkt in Simulationszeit, Standard = jetzt
+        """
+        if at_us is not None and at_us > self.clock.now_us:
+            self.clock.call_at(at_us, lambda: self.send(data, port, src, None, latency_us))
+            return
+        self.sent += 1
+        arrival = self.clock.now_us + (self.latency_us if latency_us is None else latency_us)
+        if self.power_save:
+            # Der Access Point puffert bis zum nächsten Beacon, erst dann holt die Station ab
+            arrival += -arrival % BEACON_US
+        for sock in self.sockets:
+            if sock.port == port:
+                sock._enqueue(arrival, bytes(data), src)
+
+    def link_up(self):
+        """
+        Ob das Board gerade Datagramme empfangen kann (siehe Simulation: WLAN verbunden)
+        """
+        return True
+
+    def on_deliver(self, sock, data, src):
+        """
+        Wird bei jeder Ankunft aufgerufen - Haken für Messungen (Latenz usw.)
+        """
+
+    def on_read(self, sock, data, src):
+        """
+        Wird aufgerufen, wenn die Firmware ein Datagramm aus der Queue liest
+        """
+
+
+class SimSocket:
+    def __init__(self, net, ip):
+        self.net = net
+        self.ip = ip
+        self.port = None
+        self.blocking = True
+        self.timeout = None
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+        self._queue = []
+
+    # --- Empfangsseite -------------------------------------------------
+
+    def _enqueue(self, arrival, data, src):
+        # Erst bei Ankunft in die lwIP-Queue, sonst stimmt das Überlaufverhalten nicht
+        self.net.clock.call_at(arrival, lambda: self._arrive(data, src))
+
+    def _arrive(self, data, src):
+        if self.closed:
+            return
+        if not self.net.link_up() or len(self._queue) >= RX_QUEUE_LIMIT:
+            self.dropped += 1
+            self.net.dropped += 1
+            return
+        self._queue.append((data, src))
+        self.net.delivered += 1
+        self.net.on_deliver(self, data, src)
+
+    def pending(self):
+        return len(self._queue)
+
+    def _wait(self):
+        """
+        Blockierender Empfang: virtuelle Zeit bis zur Ankunft oder zum Timeout vorspulen
+        """
+        clock = self.net.clock
+        deadline = None if self.timeout is None else clock.now_us + int(self.timeout * 1000000)
+        while not self._queue:
+            next_us = clock.next_event_us()
+            if deadline is not None and (next_us is None or next_us > deadline):
+                clock.run_until(deadline)
+                return
+            if next_us is None:
+                if clock.end_us is None:
+                    raise SimulationEnd()  # Es kommt nie wieder etwas an
+                clock.run_until(clock.end_us)
+            clock.run_until(next_us)
+
+    def _next(self):
+        if not self._queue and self.blocking:
+            self._wait()
+        if not self._queue:
+            return None
+        self.received += 1
+        item = self._queue.pop(0)
+        self.net.on_read(self, item[0], item[1])
+        return item
+
+    def recvfrom(self, bufsize):
+        item = self._next()
+        if item is None:
+            raise OSError(11, "EAGAIN")
+        data, src = item
+        return data[:bufsize], src
+
+    def recv(self, bufsize):
+        return self.recvfrom(bufsize)[0]
+
+    def readinto(self, buf, nbytes=None):
+        """
+        Wie MicroPython: None statt Exception, wenn beim non-blocking Socket nichts anliegt
+        """
+        item = self._next()
+        if item is None:
+            return None
+        data = item[0]
+        n = min(len(data), len(buf) if nbytes is None else nbytes)
+        buf[:n] = data[:n]
+        return n
+
+    def recvfrom_into(self, buf, nbytes=0):
+        item = self._next()
+        if item is None:
+            raise OSError(11, "EAGAIN")
+        data, src = item
+        n = min(len(data), len(buf) if not nbytes else nbytes)
+        buf[:n] = data[:n]
+        return n, src
+
+    # --- Sendeseite und Verwaltung -------------------------------------
+
+    def sendto(self, data, addr):
+        self.net.send(data, addr[1], (self.ip, self.port or 0))
+        return len(data)
+
+    def bind(self, addr):
+        self.port = addr[1]
+        self.net.sockets.append(self)
+
+    def setsockopt(self, level, option, value):
+        pass
+
+    def setblocking(self, flag):
+        self.blocking = bool(flag)
+        self.timeout = None
+
+    def settimeout(self, value):
+        self.blocking = value is None or value > 0
+        self.timeout = value
+
+    def fileno(self):
+        return id(self)
+
+    def close(self):
+        self.closed = True
+        if self in self.net.sockets:
+            self.net.sockets.remove(self)
+
+
+def socket_module(sim):
+    """
+    Erzeugt ein socket-Modul (MicroPython-Teilmenge), das am Loopback-Netz hängt
+    """
+    module = types.ModuleType("socket")
+    module.AF_INET = 2
+    module.SOCK_DGRAM = 2
+    module.SOCK_STREAM = 1
+    module.SOL_SOCKET = 1
+    module.SO_REUSEADDR = 4
+    module.SO_BROADCAST = 32
+    module.socket = lambda af=2, kind=2, proto=0: SimSocket(sim.net, sim.ip)
+    module.getaddrinfo = lambda host, port, *args: [(2, 2, 0, "", (host, port))]
+    return module
+
+
+def network_module(sim):
+    """
+    Erzeugt ein network-Modul mit WLAN, das nach sim.wifi_connect_ms verbunden ist
+    (sim.wifi_reconnect_ms mit BSSID, jeweils + sim.dhcp_ms ohne feste IP)
+    """
+
+    class WLAN:
+        def __init__(self, interface=0):
+            self.interface = interface
+            self._active = False
+            self._connected_at = None
+            self._config = {"mac": b"\x5c\xcf\x7f\x00\x00\x01", "channel": 6, "essid": "", "pm": 0}
+            self._ifconfig = (sim.ip, "255.255.255.0", "192.168.0.1", "192.168.0.1")
+            self._static = False
+            if interface == STA_IF:
+                sim.sta = self
+
+        def active(self, value=None):
+            if value is None:
+                return self._active
+            self._active = bool(value)
+            if not self._active:
+                self._connected_at = None
+
+        def connect(self, ssid=None, key=None, bssid=None):
+            self._config["essid"] = ssid
+            self._config["bssid"] = AP_BSSID  # Nach dem Verbinden meldet das SDK den echten AP
+            delay = sim.wifi_connect_ms if bssid is None else sim.wifi_reconnect_ms
+            if not self._static:
+                delay += sim.dhcp_ms
+            self._connected_at = sim.clock.now_us + delay * 1000
+
+        def disconnect(self):
+            self._connected_at = None
+
+        def isconnected(self):
+            return (self._active and self._connected_at is not None and sim.wifi_up
+                    and sim.clock.now_us >= self._connected_at)
+
+        def status(self, param=None):
+            if param == "rssi":
+                return -60
+            if self.isconnected():
+                return STAT_GOT_IP
+            if self._connected_at is not None:
+                return STAT_CONNECTING
+            return STAT_IDLE
+
+        def ifconfig(self, config=None):
+            if config is None:
+                return self._ifconfig
+            self._ifconfig = tuple(config)
+            self._static = True
+            sim.ip = config[0]
+
+        def config(self, *args, **kwargs):
+            if args:
+                return self._config.get(args[0])
+            self._config.update(kwargs)
+            if "pm" in kwargs:
+                sim.net.power_save = kwargs["pm"] == WLAN.PM_POWERSAVE
+
+        def scan(self):
+            return [(b"sim", b"\x00\x11\x22\x33\x44\x55", self._config["channel"], -60, 3, False)]
+
+    WLAN.PM_NONE = 0
+    WLAN.PM_PERFORMANCE = 1
+    WLAN.PM_POWERSAVE = 2
+
+    STA_IF = 0
+    STAT_IDLE = 0
+    STAT_CONNECTING = 1
+    STAT_WRONG_PASSWORD = 2
+    STAT_NO_AP_FOUND = 3
+    STAT_CONNECT_FAIL = 4
+    STAT_GOT_IP = 5
+
+    module = types.ModuleType("network")
+    module.WLAN = WLAN
+    module.STA_IF = STA_IF
+    module.AP_IF = 1
+    module.STAT_IDLE = STAT_IDLE
+    module.STAT_CONNECTING = STAT_CONNECTING
+    module.STAT_WRONG_PASSWORD = STAT_WRONG_PASSWORD
+    module.STAT_NO_AP_FOUND = STAT_NO_AP_FOUND
+    module.STAT_CONNECT_FAIL = STAT_CONNECT_FAIL
+    module.STAT_GOT_IP = STAT_GOT_IP
+    return module
+
+
+def select_module(sim):
+    """
+    Erzeugt ein select-Modul, dessen poll() auf simulierte Sockets wartet (virtuelle Zeit)
+    """
+
+    class Poll:
+        def __init__(self):
+            self.sockets = []
+
+        def register(self, sock, eventmask=None):
+            if sock not in self.sockets:
+                self.sockets.append(sock)
+
+        def unregister(self, sock):
+            if sock in self.sockets:
+                self.sockets.remove(sock)
+
+        def modify(self, sock, eventmask):
+            pass
+
+        def _ready(self):
+            return [(sock, POLLIN) for sock in self.sockets if sock.pending()]
+
+        def poll(self, timeout=-1):
+            """
+            timeout in ms, -1 = unbegrenzt. Spult die Zeit bis zur nächsten Ankunft vor.
+            """
+            clock = sim.clock
+            deadline = None if timeout is None or timeout < 0 else clock.now_us + timeout * 1000
+            ready = self._ready()
+            while not ready:
+                next_us = clock.next_event_us()
+                if deadline is not None and (next_us is None or next_us > deadline):
+                    clock.run_until(deadline)
+                    break
+                if next_us is None:
+                    if clock.end_us is None:
+                        raise SimulationEnd()
+                    clock.run_until(clock.end_us)
+                clock.run_until(next_us)
+                ready = self._ready()
+            return ready
+
+        def ipoll(self, timeout=-1, flags=0):
+            return iter(self.poll(timeout))
+
+    POLLIN = 1
+    module = types.ModuleType("select")
+    module.poll = Poll
+    module.POLLIN = POLLIN
+    module.POLLOUT = 4
+    module.POLLERR = 8
+    module.POLLHUP = 16
+    return module
@@ -0,0 +1,272 @@
+"""
+Führt Firmware-Skripte (main.py, test.py, boot.py, old/...) unverändert auf dem Host aus.
+
+Während eines Laufs ersetzt Simulation die MicroPython-Module in sys.modules
+durch die Stand-ins aus diesem Paket und stellt danach alles wieder her.
+Das Arbeitsverzeichnis ist dabei das Flash-Dateisystem des simulierten Boards
+(standardmäßig ein leeres temporäres Verzeichnis): Dateien wie wifi.json oder
+calib.bin landen dort und nicht im Repository.
+"""
+import array as _array
+import contextlib
+import csv
+import gc as _gc
+import io
+import json
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import types
+
+from .clock import SimulationEnd, VirtualClock, WallClock, time_module
+from .machine import PCA9685, ServoTacho, machine_module
+from .network import DEFAULT_IP, LoopbackNetwork, network_module, select_module, socket_module
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module, die während eines Laufs durch Stand-ins ersetzt werden
+FAKE_MODULES = ("time", "machine", "network", "socket", "usocket", "ujson", "ustruct",
+                "urandom", "micropython", "gc", "select", "uselect", "array")
+
+
+class BufferArray(_array.array):
+    """
+    array.array wie auf dem Board: extend() nimmt nur Objekte mit Buffer-Protokoll
+    (array, bytes, bytearray) und hängt deren Bytes an - Listen scheitern mit TypeError
+    """
+
+    def extend(self, data):
+        try:
+            raw = memoryview(data)
+        except TypeError:
+            raise TypeError("object with buffer protocol required") from None
+        self.frombytes(raw.cast("B"))
+
+
+class Simulation:
+    """
+    Ein simuliertes Board: virtuelle Uhr, Peripherie, Loopback-Netz und Duty-Trace
+    """
+
+    def __init__(self, seconds=None, seed=0, platform="esp8266", wall_clock=False,
+                 drift_ppm=0, offset_us=0, flash_dir=None):
+        end_us = None if seconds is None else int(seconds * 1000000)
+        if wall_clock:
+            self.clock = WallClock(end_us)
+        else:
+            self.clock = VirtualClock(end_us, drift_ppm, offset_us)
+        self.platform = platform
+        self.random = random.Random(seed)
+        self.net = LoopbackNetwork(self.clock)
+        # Ohne WLAN-Station (main.py ohne boot.py) gilt das Netz als verbunden
+        self.net.link_up = lambda: self.sta is None or self.sta.isconnected()
+        self.ip = DEFAULT_IP
+        self.unique_id = b"\x00\x00\x00\x01"
+        self.trace = []          # (t_us, pin, art, wert) je PWM-Schreibzugriff
+        self.pins = {}
+        self.pwms = {}           # Pin → zuletzt dort angelegtes PWM
+        self.tachos = []         # Drehzahlmodelle (attach_tacho)
+        self.adc = 512           # Zahl oder Funktion f(t_us) für ADC.read()
+        self.i2c_devices = {0x40: PCA9685(self)}  # Adresse → Registermodell
+        self.wifi_up = True
+        self.wifi_connect_ms = 3000
+        self.wifi_reconnect_ms = 800
+        self.dhcp_ms = 700
+        self.sta = None          # WLAN-Station, sobald die Firmware eine anlegt
+        self.booted = {}         # Von boot.py importierte Firmware-Module (bleiben wie auf dem Board geladen)
+        self.heap_size = 40000
+        self.heap_used = 12000
+        self.lightsleep_us = 0
+        self.stop_reason = None
+        if flash_dir is None:
+            # Frisches Board: leeres Dateisystem, wird mit dem Objekt gelöscht
+            self._flash_tmp = tempfile.TemporaryDirectory(prefix="zkrab-flash-")
+            flash_dir = self._flash_tmp.name
+        else:
+            os.makedirs(flash_dir, exist_ok=True)
+        self.flash_dir = os.path.abspath(flash_dir)  # Arbeitsverzeichnis der Firmware während eines Laufs
+        self.modules = self._build_modules()
+
+    # --- Hilfen für die Stand-ins ---------------------------------------
+
+    def record(self, pin, kind, value):
+        self.trace.append((self.clock.now_us, pin, kind, value))
+
+    def stop(self, reason):
+        self.stop_reason = reason
+        raise SimulationEnd(reason)
+
+    def attach_tacho(self, pwm_pin, tacho_pin, **params):
+        """
+        Servo an pwm_pin mit Drehzahlgeber an tacho_pin (siehe ServoTacho)
+        """
+        tacho = ServoTacho(self, pwm_pin, tacho_pin, **params)
+        self.tachos.append(tacho)
+        return tacho
+
+    def add_file(self, path, name=None):
+        """
+        Kopiert eine Host-Datei ins Flash (wie mpremote fs cp path :name)
+        """
+        shutil.copyfile(path, os.path.join(self.flash_dir, name or os.path.basename(path)))
+
+    def lightsleep(self, ms):
+        start = self.clock.now_us
+        self.clock.advance(ms * 1000)
+        self.lightsleep_us += self.clock.now_us - start
+
+    def _build_modules(self):
+        urandom = types.ModuleType("urandom")
+        urandom.getrandbits = self.random.getrandbits
+        urandom.randint = self.random.randint
+        urandom.random = self.random.random
+        urandom.choice = self.random.choice
+        urandom.seed = self.random.seed
+
+        # ujson.loads nimmt auf dem Board jedes Buffer-Objekt (auch memoryview)
+        ujson = types.ModuleType("ujson")
+        ujson.loads = lambda data: json.loads(data if isinstance(data, str) else bytes(data))
+        ujson.dumps = lambda obj: json.dumps(obj, separators=(",", ":"))
+        ujson.load = json.load
+        ujson.dump = json.dump
+
+        micropython = types.ModuleType("micropython")
+        micropython.const = lambda value: value
+        micropython.schedule = lambda func, arg: func(arg)
+        micropython.alloc_emergency_exception_buf = lambda size: None
+        micropython.mem_info = lambda verbose=False: print(f"mem: total={self.heap_size} used={self.heap_used}")
+        micropython.opt_level = lambda level=None: 0
+
+        gc = types.ModuleType("gc")
+        gc.collect = _gc.collect
+        gc.enable = gc.disable = lambda: None
+        gc.isenabled = lambda: True
+        gc.threshold = lambda amount=None: -1 if amount is None else None
+        gc.mem_alloc = lambda: self.heap_used
+        gc.mem_free = lambda: self.heap_size - self.heap_used
+
+        array = types.ModuleType("array")
+        array.array = BufferArray
+
+        time = time_module(self.clock)
+        socket = socket_module(self)
+        select = select_module(self)
+        return {
+            "time": time,
+            "machine": machine_module(self),
+            "network": network_module(self),
+            "socket": socket,
+            "usocket": socket,
+            "ujson": ujson,
+            "ustruct": struct,
+            "urandom": urandom,
+            "micropython": micropython,
+            "gc": gc,
+            "array": array,
+            "select": select,
+            "uselect": select,
+        }
+
+    # --- Laufen lassen -------------------------------------------------
+
+    @contextlib.contextmanager
+    def installed(self):
+        """
+        Stand-ins für die Dauer des with-Blocks einsetzen, danach alles wiederherstellen
+        """
+        saved = {name: sys.modules.get(name) for name in FAKE_MODULES}
+        saved_platform = sys.platform
+        before = set(sys.modules)
+        saved_path = list(sys.path)
+        saved_cwd = os.getcwd()
+        self._purge_firmware()
+        sys.modules.update(self.modules)
+        sys.modules.update(self.booted)
+        sys.platform = self.platform
+        sys.path.insert(0, ROOT)
+        os.chdir(self.flash_dir)
+        try:
+            yield self
+        finally:
+            os.chdir(saved_cwd)
+            sys.platform = saved_platform
+            sys.path[:] = saved_path
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            for name in set(sys.modules) - before:
+                if name not in FAKE_MODULES and self._is_firmware(sys.modules[name]):
+                    del sys.modules[name]
+
+    def install(self):
+        """
+        Stand-ins dauerhaft einsetzen (für Skripte wie die Benchmarks in tools/)
+        """
+        sys.modules.update(self.modules)
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+
+    def _is_firmware(self, module):
+        path = getattr(module, "__file__", None)
+        return path is not None and os.path.dirname(os.path.abspath(path)) == ROOT
+
+    def _purge_firmware(self):
+        # Firmware-Module frisch importieren, damit kein Zustand aus einem früheren Lauf bleibt
+        for name, module in list(sys.modules.items()):
+            if self._is_firmware(module):
+                del sys.modules[name]
+
+    def run_file(self, path, quiet=False):
+        """
+        Führt ein Skript wie auf dem Board aus (__name__ == "__main__") bis zum Simulationsende.
+        Von boot.py importierte Module bleiben für die folgenden Läufe geladen.
+        Rückgabe: globaler Namensraum des Skripts
+        """
+        path = os.path.join(ROOT, path) if not os.path.isabs(path) else path
+        with open(path, encoding="utf-8") as f:
+            code = compile(f.read(), path, "exec")
+        namespace = {"__name__": "__main__", "__file__": path}
+        with self.installed(), self._output(quiet):
+            try:
+                exec(code, namespace)
+            except SimulationEnd:
+                pass
+            if os.path.basename(path) == "boot.py":
+                self.booted = {name: module for name, module in sys.modules.items()
+                               if self._is_firmware(module)}
+        return namespace
+
+    def run_function(self, module_name, function_name, *args, overrides=None, quiet=False):
+        """
+        Importiert ein Firmware-Modul, setzt ggf. Konstanten (overrides) und ruft eine Funktion auf
+        """
+        with self.installed(), self._output(quiet):
+            module = __import__(module_name)
+            for name, value in (overrides or {}).items():
+                setattr(module, name, value)
+            try:
+                getattr(module, function_name)(*args)
+            except SimulationEnd:
+                pass
+        return module
+
+    def _output(self, quiet):
+        if quiet:
+            return contextlib.redirect_stdout(io.StringIO())
+        return contextlib.nullcontext()
+
+    # --- Auswertung ----------------------------------------------------
+
+    def duty_writes(self, pin=None):
+        return [entry for entry in self.trace if pin is None or entry[1] == pin]
+
+    def write_trace(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("t_us", "pin", "kind", "value"))
+            writer.writerows(self.trace)
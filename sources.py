@@ -0,0 +1,142 @@
+import time
+from array import array
+
+# Arbitrierung mehrerer Sender (z.B. Tracking-PC und Handy als Übersteuerung): Tabelle der
+# Absender nach IP-Adresse mit Priorität, Sequenznummer und Lease. Sollwerte und Moduswechsel
+# kommen nur von der aktiven Quelle, der mit der höchsten Priorität unter den lebenden (letztes
+# Datagramm vor weniger als lease ms). Bei gleicher Priorität bleibt die aktive Quelle, bis
+# ihre Lease abläuft - gleichrangige Sender wechseln sich so nicht bei jedem Datagramm ab.
+#
+# Sequenznummern (16 Bit, Binär-/Flotten-Frames und JSON-"seq") je Quelle: Duplikate und bis
+# zu REORDER_WINDOW zurückliegende Datagramme (umsortiert) werden verworfen, größere Sprünge
+# zurück gelten als Neustart des Senders. Abfragen und Synchronisation prüft app.py vorher.
+
+CAPACITY = 4           # Gleichzeitig bekannte Sender, der am längsten stille wird verdrängt
+REORDER_WINDOW = 256
+
+enabled = False
+priorities = {}        # IP → Priorität (höher gewinnt)
+default_priority = 0   # Für Sender, die nicht in priorities stehen
+lease = 1000           # ms ohne Datagramm, bis eine Quelle nicht mehr als lebend gilt
+
+active = -1            # Platz der aktiven Quelle, -1 = keine
+slot = -1              # Platz der Quelle des zuletzt zugelassenen Datagramms
+switched = False       # Aktive Quelle gewechselt (app.py setzt zurück)
+switches = 0
+
+_addresses = [None] * CAPACITY
+_priority = array("i", bytes(4 * CAPACITY))
+_last_seen = array("i", bytes(4 * CAPACITY))
+_last_seq = array("i", bytes(4 * CAPACITY))    # -1 = noch keine Sequenznummer
+_packets = array("I", bytes(4 * CAPACITY))     # Seit reset_stats()
+_rejected = array("I", bytes(4 * CAPACITY))    # Duplikat oder umsortiert
+_overridden = array("I", bytes(4 * CAPACITY))  # Verworfen, weil eine andere Quelle aktiv war
+_window_start = 0
+
+
+def reset():
+    global active, slot, switched, switches
+    active = -1
+    slot = -1
+    switched = False
+    switches = 0
+    for i in range(CAPACITY):
+        _addresses[i] = None
+    reset_stats()
+
+def reset_stats():
+    global _window_start
+    _window_start = time.ticks_ms()
+    for i in range(CAPACITY):
+        _packets[i] = 0
+        _rejected[i] = 0
+        _overridden[i] = 0
+
+def _live(i, now):
+    return _addresses[i] is not None and time.ticks_diff(now, _last_seen[i]) < lease
+
+def _find(ip):
+    victim = -1
+    for i in range(CAPACITY):
+        if _addresses[i] == ip:
+            return i
+        if i == active or (victim >= 0 and _addresses[victim] is None):
+            continue
+        if victim < 0 or _addresses[i] is None or time.ticks_diff(_last_seen[i], _last_seen[victim]) < 0:
+            victim = i
+    # Neuer Sender: freien oder am längsten stillen Platz übernehmen
+    _addresses[victim] = ip
+    _priority[victim] = priorities.get(ip, default_priority)
+    _last_seq[victim] = -1
+    _packets[victim] = 0
+    _rejected[victim] = 0
+    _overridden[victim] = 0
+    return victim
+
+def admit(addr, now):
+    """
+    Verbucht ein Datagramm von addr (aus recvfrom). Rückgabe: True, wenn es von der aktiven
+    Quelle kommt (ggf. nach einem Wechsel), False = übersteuert, verwerfen
+    """
+    global active, slot, switched, switches
+    i = _find(addr[0])
+    if not _live(i, now):
+        _last_seq[i] = -1  # Nach einer Pause darf der Sender neu zählen
+    _last_seen[i] = now
+    _packets[i] += 1
+    if i != active and (active < 0 or not _live(active, now) or _priority[i] > _priority[active]):
+        if active >= 0:
+            switches += 1
+        active = i
+        switched = True
+    if i != active:
+        _overridden[i] += 1
+        return False
+    slot = i
+    return True
+
+def accept_seq(i, seq):
+    """
+    Prüft die Sequenznummer eines Datagramms der Quelle i. Rückgabe: False = Duplikat/umsortiert
+    """
+    if seq is None:
+        return True  # JSON ohne "seq"
+    seq &= 0xFFFF
+    last = _last_seq[i]
+    if last >= 0:
+        back = (last - seq) & 0xFFFF
+        if back < REORDER_WINDOW:
+            _rejected[i] += 1
+            return False
+    _last_seq[i] = seq
+    return True
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage), Raten seit reset_stats()
+    """
+    now = time.ticks_ms()
+    elapsed = time.ticks_diff(now, _window_start) or 1
+    table = []
+    for i in range(CAPACITY):
+        if _addresses[i] is not None:
+            table.append({
+                "address": _addresses[i],
+                "priority": _priority[i],
+                "live": _live(i, now),
+                "rate": _packets[i] * 1000 / elapsed,
+                "rejected": _rejected[i],
+                "overridden": _overridden[i],
+            })
+    return {
+        "active": _addresses[active] if active >= 0 and _live(active, now) else None,
+        "switches": switches,
+        "sources": table,
+    }
+
+def report():
+    values = stats()
+    parts = [f"{source['address']} (Prio {source['priority']}{'' if source['live'] else ', still'}): "
+             f"{source['rate']:.1f}/s, verworfen {source['rejected']}, übersteuert {source['overridden']}"
+             for source in values["sources"]]
+    return f"Quellen: aktiv {values['active']}, Wechsel {values['switches']}; " + "; ".join(parts)
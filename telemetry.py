@@ -0,0 +1,87 @@
+import time
+from array import array
+
+# Ausführlichkeit der Telemetrie
+LEVEL_OFF = 0       # Nichts aufzeichnen, nichts ausgeben
+LEVEL_EVENTS = 1    # Nur Ereignisse (neue Ziele, Statistik) auf der Konsole
+LEVEL_RECORD = 2    # Zusätzlich jeden Tick in den Ringpuffer, Ausgabe nur auf Abruf (flush)
+LEVEL_BATCH = 3     # Wie RECORD, Puffer wird blockweise automatisch ausgegeben
+LEVEL_CONSOLE = 4   # Jeden Tick sofort ausgeben (altes Verhalten, nur zur Fehlersuche)
+
+MODE_MANUAL = 0
+MODE_AUTOMATIC = 1
+MODE_PLAYBACK = 2
+MODE_POTI = 3
+
+_MODE_NAMES = ("manual", "automatic", "playback", "poti")
+
+
+class TelemetryLog:
+    """
+    Vorallokierter Ringpuffer für (Zeit, Modus, Speed1, Speed2, Duty1, Duty2).
+    record() allokiert nichts, die Formatierung passiert erst beim flush().
+    """
+
+    def __init__(self, capacity=64, level=LEVEL_BATCH, duty_scale=1):
+        self.capacity = capacity
+        self.level = level
+        self.duty_scale = duty_scale  # Festkomma-Faktor der Duty-Werte (nur für die Ausgabe)
+        self.timestamps = array("I", bytes(4 * capacity))
+        self.modes = bytearray(capacity)
+        self.speed1 = array("H", bytes(2 * capacity))
+        self.speed2 = array("H", bytes(2 * capacity))
+        self.duty1 = array("H", bytes(2 * capacity))
+        self.duty2 = array("H", bytes(2 * capacity))
+        self.head = 0          # Nächster Schreibindex
+        self.count = 0         # Belegte Einträge
+        self.overwritten = 0   # Einträge, die vor dem Ausgeben überschrieben wurden
+
+    def record(self, mode, speed1, speed2, duty1, duty2):
+        """
+        Zeichnet einen Tick auf (ohne Allokation)
+        """
+        if self.level < LEVEL_RECORD:
+            return
+        i = self.head
+        self.timestamps[i] = time.ticks_ms()
+        self.modes[i] = mode
+        self.speed1[i] = speed1
+        self.speed2[i] = speed2
+        self.duty1[i] = duty1
+        self.duty2[i] = duty2
+
+        i += 1
+        if i == self.capacity:
+            i = 0
+        self.head = i
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.overwritten += 1
+
+    def flush(self, limit=None):
+        """
+        Gibt die ältesten Einträge aus und entfernt sie aus dem Puffer.
+        limit: maximale Anzahl Zeilen, None = alles
+        """
+        n = self.count if limit is None else min(limit, self.count)
+        if self.overwritten:
+            print(f"Telemetrie: {self.overwritten} Einträge überschrieben")
+            self.overwritten = 0
+
+        i = self.head - self.count
+        if i < 0:
+            i += self.capacity
+        for _ in range(n):
+            print(f"{self.timestamps[i]} {_MODE_NAMES[self.modes[i]]}: "
+                  f"Servo1={self.speed1[i]} ({self.duty1[i] / self.duty_scale:.2f}) | "
+                  f"Servo2={self.speed2[i]} ({self.duty2[i] / self.duty_scale:.2f})")
+            i += 1
+            if i == self.capacity:
+                i = 0
+        self.count -= n
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.overwritten = 0
@@ -0,0 +1,205 @@
+"""
+Mikrobenchmark: Festkomma-Bewegungskern (servobank.py) gegen den bisherigen Float-Pfad.
+
+Auf dem Host mit den Stand-ins der Simulation (Echtzeit-Uhr):
+    python tools/bench_motion.py
+
+Gemessen wird ein ganzer Regeltakt inklusive Ausgabe (Servo bzw. Backend ohne Hardware).
+Auf dem Host (CPython 3.11) ist der Festkomma-Pfad langsamer: ca. 640 ns Float gegen
+ca. 1200 ns ServoBank für 2 Servos. Der Abstand ist die Schleife über die Kanäle
+(ca. 240 ns je Kanal und Durchlauf), nicht die Arithmetik - der ausgerollte
+Zwei-Servo-Code vor ServoBank lag bei ca. 460 ns. Auf dem Host sind Floats billig, auf
+dem ESP8266 legt jede Float-Operation ein Objekt auf dem Heap an; der Festkomma-Pfad
+rechnet allokationsfrei und skaliert auf N Kanäle und den PCA9685. Aussagekräftig für
+das Board ist deshalb nur eine Messung dort.
+
+Zum Schluss: Mittelwertfehler und Musterlänge des Sigma-Delta-Ditherings im PWMBackend.
+"""
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sim import Simulation  # noqa: E402
+
+Simulation(wall_clock=True).install()
+
+import time  # noqa: E402
+import app  # noqa: E402
+import servobank  # noqa: E402
+
+ROUNDS = 20000
+
+# Bisheriger Float-Pfad als Referenz
+SERVO1_STOP, SERVO2_STOP = app.SERVO_STOP
+SERVO1_FULL_FORWARD, SERVO2_FULL_FORWARD = app.SERVO_FULL_FORWARD
+PHASE_DURATION = app.PHASE_DURATION
+TRANSITION_TIME = app.TRANSITION_TIME
+
+
+def calc_duty_servo1_float(speed):
+    if speed <= 0.05:
+        return SERVO1_STOP
+    return int(SERVO1_STOP + (SERVO1_FULL_FORWARD - SERVO1_STOP) * speed)
+
+
+def calc_duty_servo2_float(speed):
+    if speed <= 0.05:
+        return SERVO2_STOP
+    return int(SERVO2_STOP + (SERVO2_FULL_FORWARD - SERVO2_STOP) * speed)
+
+
+def smooth_transition_float(current_speed, target_speed, progress):
+    return current_speed + (target_speed - current_speed) * progress
+
+
+class NullServo:
+    """Ausgabe ohne Hardware: misst nur den Regeltakt selbst"""
+
+    def duty(self, value):
+        pass
+
+
+class NullBackend:
+    def attach(self, pins):
+        pass
+
+    def write(self, channel, duty):
+        pass
+
+    def flush(self):
+        pass
+
+
+servo1 = NullServo()
+servo2 = NullServo()
+
+
+def tick_float(elapsed, cur1, tgt1, cur2, tgt2):
+    # Bisheriger Regeltakt: Interpolation, Duty-Berechnung, beide Servos schreiben
+    phase_progress = elapsed / PHASE_DURATION
+    if phase_progress <= (TRANSITION_TIME / PHASE_DURATION):
+        transition_progress = phase_progress / (TRANSITION_TIME / PHASE_DURATION)
+        s1 = smooth_transition_float(cur1, tgt1, transition_progress)
+        s2 = smooth_transition_float(cur2, tgt2, transition_progress)
+    else:
+        s1 = tgt1
+        s2 = tgt2
+    servo1.duty(calc_duty_servo1_float(s1))
+    servo2.duty(calc_duty_servo2_float(s2))
+    return s1, s2
+
+
+bank = servobank.ServoBank(NullBackend(), app.SERVO_PINS, app.SERVO_STOP, app.SERVO_FULL_FORWARD)
+
+
+def start_fixed(cur1, tgt1, cur2, tgt2):
+    # Start- und Zielgeschwindigkeit gehören zur Phase, nicht zum Tick (wie motion.start_phase())
+    bank.current[0] = cur1
+    bank.current[1] = cur2
+    bank.target[0] = tgt1
+    bank.target[1] = tgt2
+
+
+def tick_fixed(elapsed):
+    # Gleicher Ablauf wie motion.update() + ServoBank.write()
+    if elapsed <= TRANSITION_TIME:
+        bank.interpolate((elapsed << servobank.PROGRESS_SHIFT) // TRANSITION_TIME)
+    else:
+        bank.hold()
+    bank.write()
+
+
+def run_float(speeds):
+    cur1, tgt1, cur2, tgt2 = speeds
+    start = time.ticks_us()
+    for i in range(ROUNDS):
+        tick_float(i % TRANSITION_TIME, cur1, tgt1, cur2, tgt2)
+    return time.ticks_diff(time.ticks_us(), start)
+
+
+def run_fixed(speeds):
+    start_fixed(*speeds)
+    start = time.ticks_us()
+    for i in range(ROUNDS):
+        tick_fixed(i % TRANSITION_TIME)
+    return time.ticks_diff(time.ticks_us(), start)
+
+
+# Gleiche Bewegung in beiden Darstellungen
+float_speeds = (0.2, 0.9, 0.7, 0.1)
+fixed_speeds = tuple(int(v * servobank.SPEED_MAX) for v in float_speeds)
+
+# Abweichung der (auf ganze Stufen gerundeten) Duty-Werte über einen ganzen Übergang
+start_fixed(*fixed_speeds)
+diffs = 0
+for elapsed in range(0, TRANSITION_TIME + 1, app.UPDATE_INTERVAL):
+    tick_fixed(elapsed)
+    coarse = (bank.duty[0] >> servobank.DUTY_FRAC_BITS, bank.duty[1] >> servobank.DUTY_FRAC_BITS)
+    s1, s2 = tick_float(elapsed, *float_speeds)
+    if (calc_duty_servo1_float(s1), calc_duty_servo2_float(s2)) != coarse:
+        diffs += 1
+
+t_float = run_float(float_speeds)
+t_fixed = run_fixed(fixed_speeds)
+print(f"Regeltakt (Interpolation + Duty + Ausgabe für 2 Servos), {ROUNDS} Durchläufe")
+print(f"Float:     {t_float / ROUNDS * 1000:8.1f} ns/Tick")
+print(f"Festkomma: {t_fixed / ROUNDS * 1000:8.1f} ns/Tick")
+print(f"Verhältnis Float/Festkomma: {t_float / max(t_fixed, 1):.2f}")
+print(f"Ticks mit abweichendem Duty-Wert: {diffs} von {TRANSITION_TIME // app.UPDATE_INTERVAL + 1}")
+
+# Bewegungsprofile: Spitzenänderung pro Tick (Beschleunigung) und größte Änderung
+# dieser Rate von Tick zu Tick (Ruck) über einen Übergang 0.2 → 0.9
+import profiles  # noqa: E402
+
+print()
+print("Profil       Bakes  max dSpeed/Tick  max d²Speed/Tick  ns/Tick (progress)")
+start_speed, target_speed = fixed_speeds[0], fixed_speeds[1]
+for kind in (profiles.LINEAR, profiles.COSINE, profiles.MINIMUM_JERK, profiles.TRAPEZOID):
+    profile = profiles.MotionProfile(kind, TRANSITION_TIME)
+    profile.start(target_speed - start_speed)
+    speeds = [start_speed]  # Tick vor dem Übergang: Stillstand auf Startgeschwindigkeit
+    for elapsed in range(0, TRANSITION_TIME + 2 * app.UPDATE_INTERVAL, app.UPDATE_INTERVAL):
+        progress = profile.progress(elapsed)
+        speeds.append(start_speed + (((target_speed - start_speed) * progress) >> servobank.PROGRESS_SHIFT))
+    rates = [b - a for a, b in zip(speeds, speeds[1:])]
+    jerks = [abs(b - a) for a, b in zip(rates, rates[1:])]
+    begin = time.ticks_us()
+    for i in range(ROUNDS):
+        profile.progress(i % TRANSITION_TIME)
+    cost = time.ticks_diff(time.ticks_us(), begin)
+    print(f"{kind:12s} {profile.bakes:5d} {max(rates):16d} {max(jerks):17d} {cost / ROUNDS * 1000:12.1f}")
+
+# Dithering (PWMBackend "dither"): der Sigma-Delta-Akkumulator rückt einmal je write() vor,
+# also je Regeltakt (UPDATE_INTERVAL) und nicht je PWM-Periode. Der Mittelwert stimmt,
+# kleine Nachkommaanteile ergeben aber lange Abschnitte auf derselben ganzen Stufe.
+class RecordingServo:
+    def __init__(self):
+        self.values = []
+
+    def duty(self, value):
+        self.values.append(value)
+
+
+backend = servobank.PWMBackend("dither")
+backend.attach(app.SERVO_PINS[:1])
+frame_ms = 1000 // backend.freq
+stop = app.SERVO_STOP[0]
+print()
+print(f"Dithering je Regeltakt ({app.UPDATE_INTERVAL} ms), PWM-Periode {frame_ms} ms")
+print("Nachkomma  Fehler Mittelwert  längste gleiche Stufe  Periode des Musters")
+for frac in (1, 16, 64, 128, 200):
+    servo = RecordingServo()
+    backend.pwms = [servo]
+    backend.dither_acc[0] = 0
+    duty = (stop << servobank.DUTY_FRAC_BITS) + frac
+    for _ in range(servobank.DUTY_ONE * 2):
+        backend.write(0, duty)
+    error = sum(servo.values) * servobank.DUTY_ONE / len(servo.values) - duty
+    longest = run = 1
+    for a, b in zip(servo.values, servo.values[1:]):
+        run = run + 1 if a == b else 1
+        longest = max(longest, run)
+    period = servobank.DUTY_ONE // math.gcd(frac, servobank.DUTY_ONE)
+    print(f"{frac:5d}/256 {error:12.3f}/256 {longest * app.UPDATE_INTERVAL:14d} ms "
+          f"{period * app.UPDATE_INTERVAL:14d} ms (je Frame: {period * frame_ms} ms)")
@@ -0,0 +1,74 @@
+"""
+Vergleicht die Parse-Kosten von JSON-Datagrammen und Binär-Frames
+und zeigt, dass ein Flotten-Frame unabhängig von der Geräteanzahl gleich viel kostet.
+
+Läuft auf dem Host (CPython) und auf dem Board:
+    python tools/bench_protocol.py
+    mpremote run tools/bench_protocol.py   (protocol.py muss auf dem Board liegen)
+"""
+import gc
+import sys
+
+if sys.implementation.name != "micropython":
+    # Host: MicroPython-Module durch die Stand-ins der Simulation ersetzen (mit Echtzeit-Uhr)
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from sim import Simulation
+    Simulation(wall_clock=True).install()
+
+import time
+import protocol
+
+ROUNDS = 2000
+
+def now_us():
+    return time.ticks_us()
+
+
+def elapsed_us(start):
+    return time.ticks_diff(time.ticks_us(), start)
+
+
+def measure(name, func, data):
+    """
+    Misst Zeit (und auf dem Board den Heap-Verbrauch) pro Parse-Aufruf
+    """
+    gc.collect()
+    alloc = None
+    if hasattr(gc, "mem_alloc"):
+        gc.disable()
+        before = gc.mem_alloc()
+    start = now_us()
+    for _ in range(ROUNDS):
+        func(data)
+    total = elapsed_us(start)
+    if hasattr(gc, "mem_alloc"):
+        alloc = (gc.mem_alloc() - before) / ROUNDS
+        gc.enable()
+
+    line = f"{name:8s} {len(data):3d} Bytes  {total / ROUNDS:8.2f} us/Paket"
+    if alloc is not None:
+        line += f"  {alloc:6.1f} Bytes Heap/Paket"
+    print(line)
+    return total
+
+
+json_packet = b'{"right_arm_angle": 93.5, "left_arm_angle": 120.0}'
+frame_packet = protocol.encode_frame(1, protocol.MODE_NONE, 935, 1200)
+
+assert protocol.parse_packet(json_packet)[2:] == protocol.parse_packet(frame_packet)[2:]
+
+print(f"Parse-Kosten, {ROUNDS} Durchläufe")
+t_json = measure("JSON", protocol.parse_packet, json_packet)
+t_frame = measure("Binär", protocol.parse_packet, frame_packet)
+measure("decode", protocol.decode, frame_packet)  # In-place-Pfad des Empfangs (ohne Tupel)
+print(f"Binär-Frame ist {t_json / max(t_frame, 1):.1f}x schneller")
+
+# Flotten-Frame: eigener Platz per Offset, Kosten unabhängig von der Anzahl der Geräte
+print("Flotten-Frame, eigener Platz ganz hinten:")
+for devices in (1, 16, 100):
+    protocol.device_id = devices - 1
+    fleet_packet = protocol.encode_fleet(1, protocol.MODE_NONE, 0, [(935, 1200)] * devices)
+    assert protocol.parse_packet(fleet_packet)[2:] == (935, 1200)
+    measure(f"{devices:3d} Ger.", protocol.decode, fleet_packet)
+protocol.device_id = None
@@ -0,0 +1,82 @@
+"""
+Übersetzt die Firmware-Module vorab nach .mpy, damit das Board sie beim Start nicht aus
+dem Quelltext kompilieren muss (kürzere Startzeit, kein Heap für Parser und Compiler).
+
+    pip install mpy-cross        (Version passend zur Firmware auf dem Board)
+    python tools/build_mpy.py
+    mpremote cp build/mpy/*.mpy : + rm :app.py + rm :motion.py + ...   (.py auf dem Board hat Vorrang!)
+
+Die Firmware samt Konfiguration liegt in app.py und wird mit übersetzt - nach Änderungen an
+der Konfiguration neu bauen. main.py (nur "import app; app.run()"), boot.py und per
+mpremote run gestartete Skripte bleiben Quelltext. Mit --manifest
+entsteht zusätzlich build/manifest.py, um die Module fest in ein Firmware-Image einzubauen
+(FROZEN_MANIFEST beim Bauen von MicroPython) - dann liegen sie nicht einmal im RAM.
+Die Startzeit und den freien Heap meldet app.py in der Statistik ("Start: ...").
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Skripte statt Module: werden direkt ausgeführt und müssen als .py auf dem Board liegen
+SCRIPTS = ("main.py", "boot.py", "calibrate.py", "test.py", "servotest.py", "temp.py")
+
+
+def firmware_modules():
+    return sorted(name for name in os.listdir(ROOT)
+                  if name.endswith(".py") and name not in SCRIPTS)
+
+
+def find_mpy_cross():
+    path = shutil.which("mpy-cross")
+    if path is None:
+        sys.exit("mpy-cross nicht gefunden (pip install mpy-cross)")
+    return path
+
+
+def compile_module(mpy_cross, name, out_dir, march):
+    target = os.path.join(out_dir, name[:-3] + ".mpy")
+    subprocess.run([mpy_cross, f"-march={march}", "-o", target, os.path.join(ROOT, name)], check=True)
+    return target
+
+
+def write_manifest(path, modules):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('include("$(PORT_DIR)/boards/manifest.py")\n')
+        for name in modules:
+            f.write(f'module("{name}", base_path="{ROOT}")\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", default=os.path.join(ROOT, "build"))
+    parser.add_argument("--march", default="xtensa", help="Zielarchitektur (ESP8266: xtensa, ESP32: xtensawin)")
+    parser.add_argument("--manifest", action="store_true", help="Zusätzlich manifest.py für eingefrorene Module")
+    args = parser.parse_args()
+
+    mpy_cross = find_mpy_cross()
+    out_dir = os.path.join(args.output, "mpy")
+    os.makedirs(out_dir, exist_ok=True)
+    modules = firmware_modules()
+    source_total = mpy_total = 0
+    for name in modules:
+        target = compile_module(mpy_cross, name, out_dir, args.march)
+        source = os.path.getsize(os.path.join(ROOT, name))
+        size = os.path.getsize(target)
+        source_total += source
+        mpy_total += size
+        print(f"{name:16s} {source:6d} B → {size:6d} B")
+    scripts = sum(os.path.getsize(os.path.join(ROOT, name)) for name in ("main.py", "boot.py"))
+    print(f"Module: {source_total} B Quelltext → {mpy_total} B .mpy in {out_dir}")
+    print(f"Beim Start zu übersetzen: {source_total + scripts} B vorher, {scripts} B danach (main.py, boot.py)")
+    if args.manifest:
+        manifest = os.path.join(args.output, "manifest.py")
+        write_manifest(manifest, modules)
+        print(f"Manifest: {manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Compiler für Choreografien: lesbare Textquelle → Binärdatei für choreo.py.
+
+    python tools/choreoc.py shows/demo.txt -o show.zkc
+    python tools/choreoc.py --dump show.zkc
+
+Quellformat (eine Anweisung pro Zeile, # leitet Kommentare ein):
+
+    channels 2            Anzahl Servos (muss zu SERVO_PINS in app.py passen)
+    loop                  Nach dem letzten Keyframe von vorn beginnen
+    2000 minjerk 40 60    In 2000 ms mit Profil minjerk auf 40% / 60% fahren
+    hold 1500             Ziele 1500 ms halten
+    repeat 4 ... end      Block wiederholen (verschachtelbar)
+
+Profile: linear, cosine, minjerk, trapezoid. Ziele in Prozent der vollen
+Geschwindigkeit (0..100, Nachkommastellen erlaubt). Segmente über 65535 ms
+werden auf mehrere Keyframes verteilt.
+"""
+import argparse
+import os
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Format und Easing-Ids aus der Firmware, damit beide Seiten nicht auseinanderlaufen
+import choreo  # noqa: E402
+from servobank import SPEED_MAX  # noqa: E402
+
+MAX_DURATION = 0xFFFF
+
+
+class ChoreoError(ValueError):
+    pass
+
+
+def parse(lines, name="<quelle>"):
+    """
+    Rückgabe: (kanäle, loop, keyframes) mit keyframes = [(dauer_ms, easing_id, (ziel, ...))]
+    """
+    channels = None
+    loop = False
+    keyframes = []
+    stack = []  # (wiederholungen, start_index) je offenem repeat
+    last_targets = None
+
+    for number, raw in enumerate(lines, 1):
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            continue
+        words = line.split()
+        where = f"{name}:{number}"
+        try:
+            if words[0] == "channels":
+                channels = int(words[1])
+            elif words[0] == "loop":
+                loop = True
+            elif words[0] == "repeat":
+                stack.append((int(words[1]), len(keyframes)))
+            elif words[0] == "end":
+                if not stack:
+                    raise ChoreoError("end ohne repeat")
+                count, start = stack.pop()
+                keyframes.extend(keyframes[start:] * (count - 1))
+            elif words[0] == "hold":
+                if last_targets is None:
+                    raise ChoreoError("hold vor dem ersten Keyframe")
+                keyframes.extend(split_segment(int(words[1]), 0, last_targets))
+            else:
+                if channels is None:
+                    raise ChoreoError("channels fehlt vor dem ersten Keyframe")
+                duration = int(words[0])
+                if words[1] not in choreo.EASINGS:
+                    raise ChoreoError(f"unbekanntes Profil {words[1]!r}")
+                targets = tuple(percent_to_speed(float(value)) for value in words[2:])
+                if len(targets) != channels:
+                    raise ChoreoError(f"{len(targets)} Ziele, erwartet {channels}")
+                keyframes.extend(split_segment(duration, choreo.EASINGS.index(words[1]), targets))
+                last_targets = targets
+        except ChoreoError as e:
+            raise ChoreoError(f"{where}: {e}") from None
+        except (IndexError, ValueError):
+            raise ChoreoError(f"{where}: ungültige Zeile {line!r}") from None
+
+    if stack:
+        raise ChoreoError(f"{name}: repeat ohne end")
+    if channels is None:
+        raise ChoreoError(f"{name}: keine Keyframes")
+    return channels, loop, keyframes
+
+
+def percent_to_speed(percent):
+    if not 0 <= percent <= 100:
+        raise ChoreoError(f"Ziel {percent} außerhalb 0..100")
+    return round(percent * SPEED_MAX / 100)
+
+
+def split_segment(duration, easing, targets):
+    """
+    Lange Segmente aufteilen: erst das Profil bis zum Ziel, danach Haltesegmente
+    """
+    if duration < 0:
+        raise ChoreoError("negative Dauer")
+    first = min(duration, MAX_DURATION)
+    segments = [(first, easing, targets)]
+    duration -= first
+    while duration > 0:
+        part = min(duration, MAX_DURATION)
+        segments.append((part, 0, targets))
+        duration -= part
+    return segments
+
+
+def encode(channels, loop, keyframes):
+    flags = choreo.FLAG_LOOP if loop else 0
+    out = bytearray(choreo.MAGIC + bytes((choreo.VERSION, channels, flags, 0)))
+    fmt = "<HB" + "H" * channels
+    for duration, easing, targets in keyframes:
+        out += struct.pack(fmt, duration, easing, *targets)
+    return bytes(out)
+
+
+def dump(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != choreo.MAGIC:
+        raise ChoreoError(f"{path}: keine Choreografie-Datei")
+    channels = data[5]
+    size = choreo.record_size(channels)
+    fmt = "<HB" + "H" * channels
+    print(f"channels {channels}")
+    if data[6] & choreo.FLAG_LOOP:
+        print("loop")
+    total = 0
+    for offset in range(choreo.HEADER_SIZE, len(data) - size + 1, size):
+        duration, easing, *targets = struct.unpack_from(fmt, data, offset)
+        total += duration
+        values = " ".join(f"{100 * t / SPEED_MAX:.1f}" for t in targets)
+        print(f"{duration} {choreo.EASINGS[easing]} {values}")
+    count = (len(data) - choreo.HEADER_SIZE) // size
+    print(f"# {count} Keyframes, {total / 1000:.1f} s, {len(data)} Bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", nargs="?", help="Textquelle")
+    parser.add_argument("-o", "--output", help="Zieldatei (Standard: Quelle mit Endung .zkc)")
+    parser.add_argument("--dump", metavar="DATEI", help="Binärdatei als Quelltext ausgeben")
+    args = parser.parse_args()
+
+    try:
+        if args.dump:
+            dump(args.dump)
+            return
+        if not args.source:
+            parser.error("Quelle fehlt")
+        with open(args.source, encoding="utf-8") as f:
+            channels, loop, keyframes = parse(f, args.source)
+        output = args.output or os.path.splitext(args.source)[0] + ".zkc"
+        data = encode(channels, loop, keyframes)
+        with open(output, "wb") as f:
+            f.write(data)
+        total = sum(duration for duration, _, _ in keyframes)
+        print(f"{len(keyframes)} Keyframes, {total / 1000:.1f} s, {len(data)} Bytes → {output}")
+    except ChoreoError as e:
+        sys.exit(f"Fehler: {e}")
+
+
+if __name__ == "__main__":
+    main()
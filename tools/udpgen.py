@@ -0,0 +1,721 @@
+"""
+Lastgenerator, Recorder und Replay für die UDP-Sollwerte (Port 8080).
+
+    python tools/udpgen.py record aufnahme.zkr --seconds 60
+    python tools/udpgen.py replay aufnahme.zkr --host 192.168.0.50 --speed 4
+    python tools/udpgen.py flood --rate 200 --burst 5 --loss 0.05 --reorder 0.1 --host 255.255.255.255
+    python tools/udpgen.py sim --rate 200 --burst 5 --seconds 20
+    python tools/udpgen.py sim --input aufnahme.zkr --runtime main_timer
+    python tools/udpgen.py sim --rate 50 --latency
+    python tools/udpgen.py sim --format stream --rate 10 --samples 5 --jitter-ms 80
+    python tools/udpgen.py sim --format fleet --devices 50 --device-id 37
+    python tools/udpgen.py query latency_on --host 192.168.0.50
+    python tools/udpgen.py query latency --host 192.168.0.50
+    python tools/udpgen.py sync &
+    python tools/udpgen.py flood --format frame --execute-ahead-ms 150
+    python tools/udpgen.py sync-sim --devices 4 --jitter-ms 20 --max-error-ms 25
+    python tools/udpgen.py idle-sim
+    python tools/udpgen.py sources-sim --reorder 0.1
+
+"sim" schickt den Strom an app.py in der Host-Simulation und misst Durchsatz,
+Verlustrate, Latenz vom Senden bis zum nächsten Duty-Schreibzugriff und die
+Stufigkeit der Ausgabe (mittlere zweite Differenz der Duty-Werte je Tick).
+"query" fragt die Latenz-Histogramme des Geräts ab (siehe latency.py), "query heap"
+misst zusätzlich den größten freien Block des Heaps (siehe heap.py).
+"sync" ist der Zeitgeber für clocksync.py (CLOCK_SYNC in app.py), seine Uhr ist
+dieselbe wie die von --execute-ahead-ms. "sync-sim" prüft die Synchronisation mit
+mehreren simulierten Geräten mit verschiedenen Uhren und endet mit Exit-Code 1, wenn die
+Streuung über --max-error-ms liegt, eine Driftschätzung ihre Fehlerschranke verletzt oder
+eine angewandte Driftkorrektur den Fehler vergrößert.
+"idle-sim" vergleicht Schreibzugriffe, Zeit je Energiezustand und Aufwachlatenz mit
+und ohne Leerlauf-Steuerung (power.py) bei seltenen Befehlen. "sources-sim" lässt einen
+Tracking-PC und zeitweise ein Handy mit höherer Priorität gleichzeitig senden und vergleicht
+das Verhalten mit und ohne Arbitrierung (sources.py).
+
+Aufnahmeformat (little endian): Kopf b"ZKRC" + Version (B), danach je Datagramm
+Zeitabstand zum vorherigen in us (I), Länge (H) und die Nutzdaten.
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import socket
+import struct
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim import Simulation  # noqa: E402
+
+# Formate und Encoder aus protocol.py, dafür die MicroPython-Module kurz durch die
+# Stand-ins der Simulation ersetzen (danach hat der Host wieder sein time/socket)
+with Simulation().installed():
+    import protocol  # noqa: E402
+
+PORT = 8080
+QUERY_REPLY_PORT = 8081  # siehe app.py
+STAGE_NAMES = ("receive", "parse", "decide", "compute", "write", "total")  # siehe latency.py
+RECORD_MAGIC = b"ZKRC"
+RECORD_VERSION = 1
+RECORD_HEADER = "<IH"
+SYNC_PORT = 8082     # siehe app.py
+
+
+# --- Aufnahmen ------------------------------------------------------------
+
+def write_recording(path, stream):
+    """
+    stream: Liste (t_us, payload) in zeitlicher Reihenfolge
+    """
+    with open(path, "wb") as f:
+        f.write(RECORD_MAGIC + bytes((RECORD_VERSION,)))
+        last = 0
+        for t_us, payload in stream:
+            f.write(struct.pack(RECORD_HEADER, t_us - last, len(payload)))
+            f.write(payload)
+            last = t_us
+
+
+def read_recording(path):
+    with open(path, "rb") as f:
+        header = f.read(5)
+        if header[:4] != RECORD_MAGIC or header[4] != RECORD_VERSION:
+            raise ValueError(f"{path}: keine Aufnahme im ZKRC-Format")
+        stream = []
+        t_us = 0
+        size = struct.calcsize(RECORD_HEADER)
+        while True:
+            head = f.read(size)
+            if len(head) < size:
+                return stream
+            delta, length = struct.unpack(RECORD_HEADER, head)
+            t_us += delta
+            stream.append((t_us, f.read(length)))
+
+
+def record(path, seconds, port):
+    """
+    Zeichnet echte Broadcasts auf, bis seconds vergangen sind (oder Strg+C)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.settimeout(0.5)
+    stream = []
+    start = time.perf_counter()
+    try:
+        while seconds is None or time.perf_counter() - start < seconds:
+            try:
+                data, _ = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            stream.append((int((time.perf_counter() - start) * 1000000), data))
+    except KeyboardInterrupt:
+        pass
+    write_recording(path, stream)
+    print(f"{len(stream)} Datagramme aufgezeichnet → {path}")
+
+
+# --- Synthetische Ströme --------------------------------------------------
+
+def angles_at(t_s):
+    right = 90 + 90 * math.sin(t_s * 2 * math.pi * 0.25)
+    left = 90 + 90 * math.cos(t_s * 2 * math.pi * 0.25)
+    return right, left
+
+
+def stream_payload(seq, t_us, interval_us, samples):
+    """
+    Sollwert-Strom: samples Abtastungen gleichmäßig über das Intervall bis t_us
+    """
+    points = []
+    for i in range(samples - 1, -1, -1):
+        sample_us = t_us - i * interval_us / samples
+        right, left = angles_at(sample_us / 1000000)
+        points.append((int(sample_us / 1000), int(right * 10), int(left * 10)))
+    return protocol.encode_stream(seq, points)
+
+
+def fleet_payload(seq, t_s, devices):
+    """
+    Flotten-Frame für die Geräte 0..devices-1, jedes Gerät leicht phasenverschoben
+    """
+    slots = []
+    for device in range(devices):
+        right, left = angles_at(t_s + 0.1 * device)
+        slots.append((int(right * 10), int(left * 10)))
+    return protocol.encode_fleet(seq, protocol.MODE_NONE, 0, slots)
+
+
+def encode(seq, right, left, fmt, execute_at=None):
+    if fmt == "frame":
+        return protocol.encode_frame(seq, protocol.MODE_NONE, int(right * 10), int(left * 10), execute_at)
+    timed = "" if execute_at is None else f', "execute_at": {execute_at & 0xFFFFFFFF}'
+    return (f'{{"seq": {seq}, "right_arm_angle": {right:.1f}, '
+            f'"left_arm_angle": {left:.1f}{timed}}}').encode()
+
+
+def synthesize(rate, seconds, burst=1, loss=0.0, reorder=0.0, reorder_us=30000, fmt="json", seed=0,
+               samples=4, jitter_us=0, devices=8, execute_ahead_ms=None, execute_base=0):
+    """
+    Erzeugt einen Sollwertstrom: rate Datagramme/s, jeweils burst Stück auf einmal.
+    loss: Anteil verworfener Datagramme, reorder: Anteil, der um reorder_us verspätet ankommt,
+    jitter_us: zufällige Zusatzlatenz 0..jitter_us je Datagramm (gebündelte WLAN-Zustellung).
+    fmt "stream": samples Abtastungen je Datagramm mit Sendezeitstempel,
+    fmt "fleet": ein Frame mit Plätzen für devices Geräte.
+    execute_ahead_ms: json/frame mit execute_at = execute_base + Sendezeit + execute_ahead_ms (Sendeuhr in ms).
+    Rückgabe: Liste (t_us, payload, zusatzlatenz_us)
+    """
+    rng = random.Random(seed)
+    interval_us = 1000000 * burst / rate
+    stream = []
+    seq = 0
+    t = 0.0
+    while t < seconds * 1000000:
+        for _ in range(burst):
+            if fmt == "stream":
+                payload = stream_payload(seq, seq * 1000000 / rate, 1000000 / rate, samples)
+            elif fmt == "fleet":
+                payload = fleet_payload(seq, seq / rate, devices)
+            elif execute_ahead_ms is not None:
+                execute_at = execute_base + int(t / 1000) + execute_ahead_ms
+                payload = encode(seq, *angles_at(seq / rate), fmt, execute_at)
+            else:
+                payload = encode(seq, *angles_at(seq / rate), fmt)
+            seq += 1
+            if rng.random() < loss:
+                continue
+            extra = reorder_us if rng.random() < reorder else 0
+            if jitter_us:
+                extra += int(rng.random() * jitter_us)
+            stream.append((int(t), payload, extra))
+        t += interval_us
+    return stream
+
+
+# --- Senden an ein echtes Gerät -------------------------------------------
+
+def send_stream(stream, host, port, speed=1.0):
+    """
+    Sendet (t_us, payload[, extra]) zeitgetreu (speed = Zeitraffer-Faktor)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    # Umsortierte Datagramme werden später gesendet, nicht über Zusatzlatenz
+    schedule = sorted((item[0] + (item[2] if len(item) > 2 else 0), item[1]) for item in stream)
+    start = time.perf_counter()
+    sent = 0
+    late = 0
+    for t_us, payload in schedule:
+        due = start + t_us / speed / 1000000
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -0.005:
+            late += 1
+        sock.sendto(payload, (host, port))
+        sent += 1
+    elapsed = time.perf_counter() - start
+    print(f"{sent} Datagramme in {elapsed:.2f} s ({sent / max(elapsed, 1e-9):.0f}/s), "
+          f"{late} mehr als 5 ms zu spät gesendet")
+
+
+def sender_ms():
+    """
+    Sendeuhr für Zeitgeber und execute_at (ms, 32 Bit)
+    """
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+def sync_reply(request, t1, t2):
+    """
+    Antwort auf eine Synchronisationsanfrage oder None, wenn es keine ist
+    """
+    if (len(request) < protocol.SYNC_REQUEST_SIZE or request[0] != protocol.SYNC_MAGIC
+            or request[1] != protocol.SYNC_REQUEST):
+        return None
+    t0 = struct.unpack_from("<I", request, 2)[0]
+    return struct.pack("<BBIII", protocol.SYNC_MAGIC, protocol.SYNC_REPLY, t0, t1 & 0xFFFFFFFF, t2 & 0xFFFFFFFF)
+
+
+def sync_responder(port=SYNC_PORT):
+    """
+    Zeitgeber: beantwortet Anfragen von clocksync.py mit der Sendeuhr
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", port))
+    print(f"Zeitgeber auf Port {port}, Sendeuhr {sender_ms()} ms")
+    answered = 0
+    while True:
+        data, addr = sock.recvfrom(64)
+        t1 = sender_ms()
+        reply = sync_reply(data, t1, sender_ms())
+        if reply is None:
+            continue
+        # Zurück an den Absender - das ist der Empfangs-Socket des Geräts (Port 8080)
+        sock.sendto(reply, addr)
+        answered += 1
+        if answered % 100 == 0:
+            print(f"{answered} Anfragen beantwortet")
+
+
+def query(command, host, port, timeout=2.0):
+    """
+    Schickt eine Abfrage an das Gerät und wartet auf die Antwort (Broadcast auf QUERY_REPLY_PORT)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.bind(("0.0.0.0", QUERY_REPLY_PORT))
+    sock.settimeout(timeout)
+    sock.sendto(json.dumps({"query": command}).encode(), (host, port))
+    try:
+        data, addr = sock.recvfrom(4096)
+    except socket.timeout:
+        print("Keine Antwort")
+        return None
+    reply = json.loads(data)
+    print(f"Antwort von {addr[0]}:")
+    print_latency(reply)
+    heap = reply.get("heap")
+    if heap and heap.get("largest"):
+        print(f"Heap: frei {heap['free']} B, größter Block {heap['largest']} B "
+              f"(Fragmentierung {heap['fragmentation']}%)")
+    return reply
+
+
+def print_latency(reply):
+    print(f"Messung {'an' if reply.get('enabled') else 'aus'}, Modus {reply.get('mode')}, "
+          f"veraltete Datagramme {reply.get('dropped_packets')}")
+    print("Stufe        Anzahl     p50     p95     max (us)")
+    for name in STAGE_NAMES:
+        stage = reply.get(name)
+        if stage:
+            print(f"{name:10s} {sum(stage['hist']):8d} {stage['p50']:7d} {stage['p95']:7d} {stage['max']:7d}")
+
+
+# --- Messung gegen die Simulation -----------------------------------------
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def roughness(values):
+    """
+    Mittlerer Betrag der zweiten Differenz: 0 bei gleichmäßiger Bewegung, groß bei Stufen
+    """
+    if len(values) < 3:
+        return 0.0
+    return sum(abs(values[i + 1] - 2 * values[i] + values[i - 1])
+               for i in range(1, len(values) - 1)) / (len(values) - 2)
+
+
+def resample(writes, interval_us, end_us):
+    """
+    Duty je Regeltakt aus den Schreibzugriffen: unveränderte Werte schreibt die Firmware nicht
+    """
+    values = []
+    index = 0
+    value = None
+    for t_us in range(writes[0][0] if writes else 0, end_us, interval_us):
+        while index < len(writes) and writes[index][0] <= t_us:
+            value = writes[index][1]
+            index += 1
+        values.append(value)
+    return values
+
+
+def simulate(stream, seconds, runtime="main_loop", overrides=None):
+    """
+    Spielt den Strom in die simulierte Firmware ein und misst Durchsatz, Verluste und Latenz
+    """
+    sim = Simulation(seconds=seconds)
+    sent_at = {}
+    reads = []
+
+    for t_us, payload, *extra in stream:
+        if t_us >= seconds * 1000000:
+            break
+        latency = sim.net.latency_us + (extra[0] if extra else 0)
+        sent_at.setdefault(payload, t_us)
+        sim.net.send(payload, PORT, at_us=t_us, latency_us=latency)
+
+    sim.net.on_read = lambda sock, data, src: reads.append((sim.clock.now_us, data))
+    settings = {"TELEMETRY_LEVEL": 0, "DUTY_OUTPUT": "ns"}  # ns: volle Auflösung für die Stufigkeit
+    settings.update(overrides or {})
+    app = sim.run_function("app", runtime, overrides=settings, quiet=True)
+
+    # Je Leerungsvorgang (gleiche Lesezeit) wird nur das zuletzt gelesene Datagramm angewendet
+    applied = [reads[i] for i in range(len(reads))
+               if i + 1 == len(reads) or reads[i + 1][0] != reads[i][0]]
+    write_times = [t for t, _, _, _ in sim.trace]
+    latencies = []
+    for i, (read_us, payload) in enumerate(applied):
+        index = bisect.bisect_left(write_times, read_us)
+        # Nur Pakete, die den Duty geändert haben: Schreibzugriff vor dem nächsten angewendeten Paket
+        next_read = applied[i + 1][0] if i + 1 < len(applied) else None
+        if (index < len(write_times) and payload in sent_at
+                and (next_read is None or write_times[index] <= next_read)):
+            latencies.append(write_times[index] - sent_at[payload])
+
+    sent = sim.net.sent
+    duration = sim.clock.now_us / 1000000
+    print(f"Gesendet:      {sent} ({sent / duration:.0f}/s)")
+    print(f"lwIP verloren: {sim.net.dropped} ({100 * sim.net.dropped / max(sent, 1):.1f}%)")
+    print(f"Gelesen:       {len(reads)} ({len(reads) / duration:.0f}/s)")
+    print(f"Veraltet:      {app.dropped_packets}")
+    print(f"Angewendet:    {len(applied)} ({len(applied) / duration:.0f}/s)")
+    print(f"Duty-Zugriffe: {app.bank.writes}, unverändert ausgelassen {app.bank.redundant}, "
+          f"Watchdog {app.watchdog_timeouts}x")
+    print(f"Latenz Paket→Duty (Pakete mit Duty-Änderung): p50 {percentile(latencies, 0.5) / 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) / 1000:.1f} ms, max {max(latencies or [0]) / 1000:.1f} ms")
+    writes = [(t, value) for t, pin, kind, value in sim.trace if pin == app.SERVO_PINS[0] and kind == "duty_ns"]
+    duties = resample(writes, app.UPDATE_INTERVAL * 1000, sim.clock.now_us)
+    print(f"Stufigkeit:    {roughness(duties):.0f} ns/Tick²")
+    if app.playout.frames:
+        print(app.playout.report())
+    if app.latency.enabled:
+        # Host-Zeiten, auf dem Board um ein Vielfaches höher
+        reply = app.latency.summary()
+        reply.update(mode=app.current_mode, dropped_packets=app.dropped_packets)
+        print_latency(reply)
+    return sim, latencies
+
+
+def simulate_sync(devices, seconds, jitter_us, ahead_ms, synced=True, seed=0):
+    """
+    Mehrere simulierte Geräte mit unterschiedlichem Uhrenoffset und -gang bekommen
+    dieselben Sprungbefehle (jede Sekunde) über eigene, zufällig verzögerte WLAN-Strecken.
+    Gemessen wird, wie weit die Geräte beim Ausführen desselben Befehls auseinanderliegen.
+    synced=False: Befehle ohne execute_at, Ausführung bei Ankunft (bisheriges Verhalten).
+    Rückgabe: (Streuung je Befehl in us, [(Gerät, Drift, clocksync-Stats), ...])
+    """
+    rng = random.Random(seed)
+    steps = [(t_s * 1000000, 45 if t_s % 2 else 135) for t_s in range(5, int(seconds))]
+    applied = []  # je Gerät: Anwendungszeit je Befehl (Simulationszeit in us)
+    results = []
+    for device in range(devices):
+        drift = rng.randint(-100, 100)
+        sim = Simulation(seconds=seconds, seed=seed + device, drift_ppm=drift,
+                         offset_us=rng.randint(0, 600) * 1000000)
+        send = sim.net.send
+
+        def jittered(data, port, src=("192.168.0.10", 5000), at_us=None, latency_us=None, send=send):
+            # Jede Richtung eigene Zufallslatenz (auch die Anfragen des Geräts): meist schnell,
+            # mit langem Ausläufer wie im WLAN (Mittelwert jitter_us)
+            if latency_us is None:
+                latency_us = 1000 + int(rng.expovariate(1 / jitter_us)) if jitter_us else 1000
+            send(data, port, src, at_us, latency_us)
+        sim.net.send = jittered
+
+        # Zeitgeber mit der Simulationszeit als Sendeuhr
+        responder = sim.modules["socket"].socket()
+        responder.bind(("0.0.0.0", SYNC_PORT))
+
+        def deliver(sock, data, src, sim=sim, responder=responder):
+            if sock is responder:
+                sock.recvfrom(64)  # Queue leeren, sonst verwirft der simulierte lwIP-Puffer
+                now_ms = sim.clock.now_us // 1000
+                reply = sync_reply(data, now_ms, now_ms)
+                if reply is not None:
+                    sim.net.send(reply, PORT)
+        sim.net.on_deliver = deliver
+
+        for seq, (t_us, right) in enumerate(steps):
+            execute_at = t_us // 1000 + ahead_ms if synced else None
+            sim.net.send(encode(seq, right, 90, "frame", execute_at), PORT, at_us=t_us)
+
+        app = sim.run_function("app", "main_loop", quiet=True, overrides={
+            "TELEMETRY_LEVEL": 0, "DUTY_OUTPUT": "ns", "CLOCK_SYNC": synced})
+        pin = app.SERVO_PINS[0]
+        writes = [(t, value) for t, p, kind, value in sim.trace if p == pin and kind == "duty_ns"]
+        times = []
+        for i, (t_us, _) in enumerate(steps):
+            # Anwendungszeit = erster Duty-Wert nach dem Senden, der dem eingeschwungenen
+            # Wert vor dem nächsten Befehl entspricht (vorher kann noch der Handbetrieb laufen)
+            index = bisect.bisect_left(writes, (t_us, -1))
+            end = bisect.bisect_left(writes, (steps[i + 1][0] if i + 1 < len(steps) else sim.clock.now_us, -1))
+            target = writes[end - 1][1] if end > index else None
+            times.append(next((t for t, value in writes[index:end] if value == target), None))
+        applied.append(times)
+        results.append((device, drift, app.clocksync.stats()))
+
+    spreads = []
+    for i in range(len(steps)):
+        times = [device_times[i] for device_times in applied if device_times[i] is not None]
+        if len(times) == devices:
+            spreads.append(max(times) - min(times))
+    return spreads, results
+
+
+def simulate_idle(seconds, gap_s, overrides, seed=0):
+    """
+    Seltene Befehle: kurze Bewegung, dann gap_s Sekunden Ruhe, dann wieder ein Befehl usw.
+    Rückgabe: (Simulation, app-Modul, Aufwachlatenzen Ankunft beim AP → Duty-Änderung in us,
+    dieselben ab Empfang durch die Firmware - so misst auch power.py)
+    """
+    sim = Simulation(seconds=seconds)
+    # Im lightsleep ist das Funkmodul aus: empfangen ist ein Datagramm erst, wenn die Firmware es liest
+    received = []
+    sim.net.on_read = lambda sock, data, src: received.append(sim.clock.now_us)
+    # Wie auf dem Board: boot.py baut das WLAN auf (power.py schaltet dessen Stromsparmodus)
+    end_us = sim.clock.end_us
+    sim.clock.end_us = None
+    sim.run_file("boot.py", quiet=True)
+    sim.clock.end_us = sim.clock.now_us + end_us
+
+    rng = random.Random(seed)
+    commands = []
+    t_s = 10.0
+    seq = 0
+    while t_s < seconds - 1:
+        # Zufällige Phase, sonst fallen die Befehle immer auf dieselbe Stelle im Takt
+        start = sim.clock.now_us + int((t_s + rng.random()) * 1000000)
+        for step in range(3):
+            commands.append((start + step * 200000, 45 + 45 * ((seq + step) % 3)))
+        seq += 3
+        t_s += gap_s
+    for i, (t_us, right) in enumerate(commands):
+        sim.net.send(encode(i, right, 90, "frame"), PORT, at_us=t_us)
+
+    settings = {"TELEMETRY_LEVEL": 0, "DUTY_OUTPUT": "ns", "current_mode": "automatic"}
+    settings.update(overrides)
+    app = sim.run_function("app", "main_loop", overrides=settings, quiet=True)
+    pin = app.SERVO_PINS[0]
+    writes = [(t, value) for t, p, kind, value in sim.trace if p == pin]
+    latencies = []
+    device_latencies = []
+    for t_us, _ in commands[::3]:
+        # Erster Befehl nach der Ruhepause: Zeit bis zur ersten geänderten Duty
+        index = bisect.bisect_left(writes, (t_us, -1))
+        before = writes[index - 1][1] if index else None
+        change = next((t for t, value in writes[index:] if value != before), None)
+        if change is not None:
+            latencies.append(change - t_us - sim.net.latency_us)
+            device_latencies.append(change - received[bisect.bisect_left(received, t_us)])
+    return sim, app, latencies, device_latencies
+
+
+TRACKER = ("192.168.0.10", 5000)
+PHONE = ("192.168.0.20", 5001)
+
+
+def simulate_sources(seconds, arbitrated, reorder=0.0, seed=0):
+    """
+    Tracking-PC (30/s, Sinusverlauf) und Handy (10/s, fester Winkel 150°) im mittleren Drittel.
+    Rückgabe: (app-Modul, Anteil der Handy-Zeit mit Handy-Sollwert, Sollwert-Wechsel, Duty-Änderungen)
+    """
+    sim = Simulation(seconds=seconds)
+    rng = random.Random(seed)
+    phone_from = seconds / 3 * 1000000
+    phone_to = 2 * seconds / 3 * 1000000
+
+    def send(seq, t_us, right, left, src):
+        # Umsortiert: kommt erst nach dem folgenden Datagramm an
+        delay = 40000 if rng.random() < reorder else 0
+        sim.net.send(encode(seq, right, left, "frame"), PORT, src=src, at_us=t_us + delay)
+
+    for seq, t_us in enumerate(range(0, int(seconds * 1000000), 33333)):
+        send(seq, t_us, *angles_at(t_us / 1000000), TRACKER)
+    for seq, t_us in enumerate(range(int(phone_from), int(phone_to), 100000)):
+        send(seq, t_us, 150, 150, PHONE)
+
+    # Gehaltener Sollwert je Regeltakt
+    setpoints = []
+    sim.clock.call_every(50000, lambda: setpoints.append(
+        (sim.clock.now_us, getattr(sys.modules.get("app"), "rightAngle", None))))
+    settings = {"TELEMETRY_LEVEL": 0, "DUTY_OUTPUT": "ns", "current_mode": "automatic",
+                "SOURCE_ARBITRATION": arbitrated, "SOURCE_PRIORITIES": {PHONE[0]: 10}}
+    app = sim.run_function("app", "main_loop", overrides=settings, quiet=True)
+
+    # Handy-Fenster ohne die erste Sekunde (Anlauf) und ohne die Lease danach
+    window = [angle for t, angle in setpoints if phone_from + 1000000 <= t < phone_to]
+    followed = sum(1 for angle in window if angle == 1500) / max(len(window), 1)
+    changes = sum(1 for a, b in zip(setpoints, setpoints[1:]) if a[1] != b[1])
+    writes = [value for _, pin, _, value in sim.trace if pin == app.SERVO_PINS[0]]
+    duty_changes = sum(1 for a, b in zip(writes, writes[1:]) if a != b)
+    return app, followed, changes, duty_changes
+
+
+# --- Kommandozeile --------------------------------------------------------
+
+def add_stream_arguments(parser):
+    parser.add_argument("--rate", type=float, default=50, help="Datagramme pro Sekunde")
+    parser.add_argument("--burst", type=int, default=1, help="Datagramme pro Burst")
+    parser.add_argument("--loss", type=float, default=0.0, help="Verlustanteil 0..1")
+    parser.add_argument("--reorder", type=float, default=0.0, help="Anteil verspäteter Datagramme 0..1")
+    parser.add_argument("--reorder-ms", type=float, default=30, help="Verspätung umsortierter Datagramme")
+    parser.add_argument("--format", choices=("json", "frame", "stream", "fleet"), default="json")
+    parser.add_argument("--devices", type=int, default=8, help="Geräte je Flotten-Frame (--format fleet)")
+    parser.add_argument("--samples", type=int, default=4, help="Samples je Datagramm (--format stream)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Zufällige Zusatzlatenz 0..JITTER_MS je Datagramm (gleichverteilt)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def stream_from_args(args):
+    if getattr(args, "input", None):
+        return [(t, payload, 0) for t, payload in read_recording(args.input)]
+    return synthesize(args.rate, args.seconds, args.burst, args.loss, args.reorder,
+                      int(args.reorder_ms * 1000), args.format, args.seed,
+                      getattr(args, "samples", 4), int(getattr(args, "jitter_ms", 0) * 1000),
+                      getattr(args, "devices", 8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("record", help="Echte Broadcasts aufzeichnen")
+    p.add_argument("output")
+    p.add_argument("--seconds", type=float)
+    p.add_argument("--port", type=int, default=PORT)
+
+    p = commands.add_parser("replay", help="Aufnahme an ein Gerät senden")
+    p.add_argument("input")
+    p.add_argument("--host", default="255.255.255.255")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--speed", type=float, default=1.0, help="Zeitraffer-Faktor")
+
+    p = commands.add_parser("flood", help="Synthetischen Strom an ein Gerät senden")
+    add_stream_arguments(p)
+    p.add_argument("--host", default="255.255.255.255")
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--save", help="Strom zusätzlich als Aufnahme speichern")
+    p.add_argument("--execute-ahead-ms", type=int,
+                   help="execute_at = Sendeuhr + Vorlauf (json/frame, Zeitgeber: udpgen.py sync)")
+
+    p = commands.add_parser("sim", help="Strom in die simulierte Firmware einspielen und messen")
+    add_stream_arguments(p)
+    p.add_argument("--input", help="Aufnahme statt synthetischem Strom")
+    p.add_argument("--runtime", default="main_loop", help="main_loop oder main_timer")
+    p.add_argument("--latency", action="store_true", help="Latenzmessung der Firmware einschalten")
+    p.add_argument("--device-id", type=int, help="Geräte-ID der simulierten Firmware (DEVICE_ID)")
+
+    p = commands.add_parser("sync", help="Zeitgeber für die Uhrensynchronisation der Geräte")
+    p.add_argument("--port", type=int, default=SYNC_PORT)
+
+    p = commands.add_parser("sync-sim", help="Synchronisationsfehler mehrerer simulierter Geräte messen")
+    p.add_argument("--devices", type=int, default=4)
+    p.add_argument("--seconds", type=float, default=120)
+    p.add_argument("--jitter-ms", type=float, default=5, help="Mittlere zufällige Zusatzlatenz je Datagramm (exponentialverteilt)")
+    p.add_argument("--execute-ahead-ms", type=int, default=150, help="Vorlauf von execute_at")
+    p.add_argument("--max-error-ms", type=float, default=10, help="Fehlschlag, wenn die Streuung darüber liegt")
+    p.add_argument("--seed", type=int, default=0)
+
+    p = commands.add_parser("idle-sim", help="Leerlauf-Steuerung bei seltenen Befehlen messen")
+    p.add_argument("--seconds", type=float, default=300)
+    p.add_argument("--gap", type=float, default=60, help="Sekunden Ruhe zwischen den Befehlsgruppen")
+
+    p = commands.add_parser("sources-sim", help="Zwei Sender gleichzeitig, mit und ohne Arbitrierung")
+    p.add_argument("--seconds", type=float, default=30)
+    p.add_argument("--reorder", type=float, default=0.0, help="Anteil umsortierter Datagramme 0..1")
+    p.add_argument("--seed", type=int, default=0)
+
+    p = commands.add_parser("query", help="Latenz-Histogramme (bzw. Heap) eines Geräts abfragen")
+    p.add_argument("query_command", nargs="?", default="latency", metavar="command",
+                   choices=("latency", "latency_on", "latency_off", "latency_reset", "heap"))
+    p.add_argument("--host", default="255.255.255.255")
+    p.add_argument("--port", type=int, default=PORT)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.output, args.seconds, args.port)
+    elif args.command == "replay":
+        send_stream(read_recording(args.input), args.host, args.port, args.speed)
+    elif args.command == "flood":
+        if args.execute_ahead_ms is not None:
+            stream = synthesize(args.rate, args.seconds, args.burst, args.loss, args.reorder,
+                                int(args.reorder_ms * 1000), args.format, args.seed,
+                                args.samples, int(args.jitter_ms * 1000), args.devices,
+                                args.execute_ahead_ms, sender_ms())
+        else:
+            stream = stream_from_args(args)
+        if args.save:
+            write_recording(args.save, [(t, payload) for t, payload, _ in stream])
+        send_stream(stream, args.host, args.port)
+    elif args.command == "query":
+        query(args.query_command, args.host, args.port)
+    elif args.command == "idle-sim":
+        variants = (("ohne Leerlauf", {"IDLE_GOVERNOR": False}),
+                    ("poll", {"IDLE_GOVERNOR": True}),
+                    ("lightsleep", {"IDLE_GOVERNOR": True, "SLEEP_MODE": "lightsleep"}))
+        for label, overrides in variants:
+            sim, app, latencies, device_latencies = simulate_idle(args.seconds, args.gap, overrides)
+            writes = sum(1 for _, pin, _, _ in sim.trace if pin == app.SERVO_PINS[0])
+            stats = app.power.stats()
+            total = stats["active_ms"] + stats["idle_ms"] + stats["sleep_ms"] or 1
+            print(f"{label:14s} Schreibzugriffe {writes:5d}, aktiv/leerlauf/schlaf "
+                  f"{100 * stats['active_ms'] / total:.0f}/{100 * stats['idle_ms'] / total:.0f}/"
+                  f"{100 * stats['sleep_ms'] / total:.0f}%, lightsleep {sim.lightsleep_us / 1000000:.0f} s, "
+                  f"Aufwachen Paket→Duty p50 {percentile(latencies, 0.5) / 1000:.1f} ms, "
+                  f"max {max(latencies or [0]) / 1000:.1f} ms")
+            if stats["wakes"]:
+                # Der Rest bis Paket→Duty ist Pufferung beim AP (DTIM) bzw. Schlaf - für das Gerät unsichtbar
+                print(f"{'':14s} ab Empfang auf dem Gerät max {max(device_latencies or [0]) / 1000:.1f} ms, "
+                      f"laut power.py max {stats['wake_ms_max']:.1f} ms ({stats['wakes']}x Aufwachen)")
+    elif args.command == "sources-sim":
+        for arbitrated in (False, True):
+            app, followed, changes, duty_changes = simulate_sources(args.seconds, arbitrated, args.reorder,
+                                                                     args.seed)
+            label = "mit Arbitrierung " if arbitrated else "ohne Arbitrierung"
+            print(f"{label}: Handy-Sollwert {100 * followed:.0f}% der Handy-Zeit, "
+                  f"Sollwert-Wechsel {changes}, Duty-Änderungen {duty_changes}")
+            if arbitrated:
+                print("  " + app.sources.report())
+    elif args.command == "sync":
+        sync_responder(args.port)
+    elif args.command == "sync-sim":
+        failed = False
+        for synced in (False, True):
+            spreads, results = simulate_sync(args.devices, args.seconds, int(args.jitter_ms * 1000),
+                                             args.execute_ahead_ms, synced, args.seed)
+            label = "mit execute_at" if synced else "bei Ankunft   "
+            print(f"{label}: Streuung zwischen den Geräten p50 {percentile(spreads, 0.5) / 1000:.1f} ms, "
+                  f"p95 {percentile(spreads, 0.95) / 1000:.1f} ms, max {max(spreads or [0]) / 1000:.1f} ms "
+                  f"({len(spreads)} Befehle)")
+            if synced:
+                if not spreads or max(spreads) > args.max_error_ms * 1000:
+                    print(f"  Fehlschlag: Streuung über {args.max_error_ms} ms")
+                    failed = True
+                for device, drift, stats in results:
+                    # clocksync.drift_ppm ist der Gang der Sendeuhr gegenüber dem Gerät
+                    actual = -drift
+                    estimate = stats["drift_estimate_ppm"]
+                    bound = stats["drift_error_ppm"]
+                    applied = stats["drift_ppm"]
+                    print(f"  Gerät {device}: Sendeuhr {actual:+d} ppm, geschätzt {estimate:+d} ± {bound} ppm, "
+                          f"angewandt {applied:+d} ppm, Laufzeit {stats['delay_ms']} ms, "
+                          f"Messungen {stats['samples']}")
+                    # Die Schranke muss die wahre Drift einschließen, eine angewandte Korrektur
+                    # darf nicht weiter danebenliegen als gar keine
+                    if bound and abs(estimate - actual) > bound:
+                        print(f"  Fehlschlag: Gerät {device} außerhalb der Fehlerschranke")
+                        failed = True
+                    if abs(applied - actual) > abs(actual):
+                        print(f"  Fehlschlag: Gerät {device} korrigiert die Drift in die falsche Richtung")
+                        failed = True
+        sys.exit(1 if failed else 0)
+    else:
+        seconds = args.seconds
+        if args.input:
+            stream = stream_from_args(args)
+            seconds = stream[-1][0] / 1000000 + 1 if stream else seconds
+        else:
+            stream = stream_from_args(args)
+        overrides = {"LATENCY_INSTRUMENTATION": True} if args.latency else {}
+        if args.device_id is not None:
+            overrides["DEVICE_ID"] = args.device_id
+        simulate(stream, seconds, args.runtime, overrides)
+
+
+if __name__ == "__main__":
+    main()
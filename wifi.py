@@ -0,0 +1,215 @@
+import network
+import time
+import ujson
+
+# WLAN-Aufbau und -Überwachung als Zustandsautomat: boot.py ruft nur start() auf,
+# app.py danach regelmäßig poll(). Nichts davon blockiert den Regeltakt.
+
+# Zuletzt verwendeter Access Point. Die BSSID beschleunigt das Wiederverbinden, den Kanal
+# kann MicroPython als Station nicht vorgeben - er wird nur gespeichert und gemeldet.
+CACHE_FILE = "wifi.json"
+CONNECT_TIMEOUT = 15000   # ms für einen Verbindungsversuch ohne gespeicherte BSSID
+CACHED_TIMEOUT = 5000     # ms mit gespeicherter BSSID, danach Versuch ohne
+RECONNECT_GRACE = 2000    # ms, die das SDK nach einem Abbruch selbst wiederverbinden darf
+BACKOFF_MIN = 1000        # Wartezeit nach einem Fehlschlag, verdoppelt sich bis BACKOFF_MAX
+BACKOFF_MAX = 30000
+POLL_INTERVAL = 250       # poll() prüft den Status höchstens so oft (ms)
+
+STATE_OFF = 0
+STATE_CONNECTING = 1
+STATE_CONNECTED = 2
+STATE_LOST = 3
+STATE_BACKOFF = 4
+STATE_NAMES = ("aus", "verbinde", "verbunden", "unterbrochen", "warte")
+
+verbose = True
+wlan = None
+state = STATE_OFF
+state_since = 0
+bssid = None           # Aus CACHE_FILE bzw. nach erfolgreicher Verbindung
+channel = None
+connects = 0
+drops = 0
+first_packet_ms = None  # Start → erstes empfangenes Paket
+outage_ms = None        # Dauer der letzten Unterbrechung bis zum nächsten Paket
+awaiting_packet = False
+
+_ssid = None
+_password = None
+_use_bssid = False
+_backoff = BACKOFF_MIN
+_outage_start = 0
+_last_poll = 0
+
+
+def _log(message):
+    if verbose:
+        print("WLAN:", message)
+
+def _set_state(new_state, now):
+    global state, state_since
+    state = new_state
+    state_since = now
+
+def _load_cache():
+    global bssid, channel
+    try:
+        with open(CACHE_FILE) as f:
+            cache = ujson.load(f)
+        bssid = bytes([int(part, 16) for part in cache["bssid"].split(":")]) if cache.get("bssid") else None
+        channel = cache.get("channel")
+    except (OSError, ValueError, KeyError):
+        bssid = None
+        channel = None
+
+def _save_cache(new_bssid, new_channel):
+    global bssid, channel
+    if new_bssid == bssid and new_channel == channel:
+        return  # Flash nur bei Änderungen beschreiben
+    bssid = new_bssid
+    channel = new_channel
+    try:
+        with open(CACHE_FILE, "w") as f:
+            ujson.dump({"bssid": ":".join("%02x" % b for b in bssid) if bssid else None,
+                        "channel": channel}, f)
+    except OSError as e:
+        _log(f"Cache nicht gespeichert ({e})")
+
+def _connected_ap():
+    """
+    BSSID und Kanal des verbundenen Access Points, soweit der Port sie liefert
+    """
+    try:
+        current_bssid = wlan.config("bssid")
+    except (ValueError, OSError):
+        current_bssid = None  # Nicht jeder Port kennt config("bssid")
+    try:
+        current_channel = wlan.config("channel")
+    except (ValueError, OSError):
+        current_channel = None
+    return current_bssid or None, current_channel
+
+def _connect(now, use_bssid):
+    global _use_bssid, connects
+    _use_bssid = use_bssid and bssid is not None
+    connects += 1
+    if _use_bssid:
+        # Gezielt auf den bekannten Access Point: spart den Scan über alle Kanäle
+        wlan.connect(_ssid, _password, bssid=bssid)
+    else:
+        wlan.connect(_ssid, _password)
+    _set_state(STATE_CONNECTING, now)
+
+def start(ssid, password, static_ip=None):
+    """
+    Startet den Verbindungsaufbau und kehrt sofort zurück.
+    static_ip: (ip, maske, gateway, dns) statt DHCP - spart beim Verbinden die Adressvergabe
+    """
+    global wlan, _ssid, _password, _outage_start, awaiting_packet
+    now = time.ticks_ms()
+    _ssid = ssid
+    _password = password
+    _outage_start = now
+    awaiting_packet = True
+    _load_cache()
+
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if static_ip:
+        wlan.ifconfig(static_ip)
+
+    if wlan.isconnected():
+        _on_connected(now)
+    elif wlan.status() == network.STAT_CONNECTING:
+        # Das SDK verbindet sich bereits mit der gespeicherten Konfiguration - nicht neu starten
+        _set_state(STATE_CONNECTING, now)
+    else:
+        _connect(now, True)
+
+def _on_connected(now):
+    global _backoff
+    _backoff = BACKOFF_MIN
+    _set_state(STATE_CONNECTED, now)
+    _save_cache(*_connected_ap())
+    _log(f"verbunden, IP {wlan.ifconfig()[0]}, Kanal {channel} "
+         f"({time.ticks_diff(now, _outage_start)} ms)")
+
+def poll():
+    """
+    Treibt den Zustandsautomaten weiter. Kostet höchstens einen Statusabruf alle POLL_INTERVAL ms.
+    """
+    global _backoff, _last_poll, _outage_start, awaiting_packet, drops
+    if wlan is None:
+        return
+    now = time.ticks_ms()
+    if time.ticks_diff(now, _last_poll) < POLL_INTERVAL:
+        return
+    _last_poll = now
+    connected = wlan.isconnected()
+    elapsed = time.ticks_diff(now, state_since)
+
+    if state == STATE_CONNECTED:
+        if not connected:
+            drops += 1
+            _outage_start = now
+            awaiting_packet = True
+            _set_state(STATE_LOST, now)
+            _log("Verbindung unterbrochen")
+
+    elif state == STATE_LOST:
+        if connected:
+            _on_connected(now)  # Automatische Wiederverbindung des SDK
+        elif elapsed >= RECONNECT_GRACE:
+            _connect(now, True)
+
+    elif state == STATE_CONNECTING:
+        if connected:
+            _on_connected(now)
+        elif elapsed >= (CACHED_TIMEOUT if _use_bssid else CONNECT_TIMEOUT):
+            if _use_bssid:
+                # Access Point nicht mehr unter der BSSID erreichbar: normal mit Scan verbinden
+                _log("gespeicherter Access Point nicht erreichbar")
+                _connect(now, False)
+            else:
+                wlan.disconnect()
+                _set_state(STATE_BACKOFF, now)
+                _log(f"Verbindung fehlgeschlagen (Status {wlan.status()}), neuer Versuch in {_backoff} ms")
+
+    elif state == STATE_BACKOFF:
+        if elapsed >= _backoff:
+            _backoff = min(_backoff * 2, BACKOFF_MAX)
+            _connect(now, True)
+
+def packet_received():
+    """
+    Vom Empfangspfad aufzurufen, solange awaiting_packet gesetzt ist
+    """
+    global awaiting_packet, first_packet_ms, outage_ms
+    awaiting_packet = False
+    elapsed = time.ticks_diff(time.ticks_ms(), _outage_start)
+    if first_packet_ms is None:
+        first_packet_ms = elapsed
+        _log(f"erstes Paket {elapsed} ms nach dem Start")
+    else:
+        outage_ms = elapsed
+        _log(f"erstes Paket {elapsed} ms nach der Unterbrechung")
+
+def is_connected():
+    return state == STATE_CONNECTED
+
+def stats():
+    """
+    Kennzahlen als dict (für die UDP-Abfrage)
+    """
+    return {
+        "state": STATE_NAMES[state],
+        "connects": connects,
+        "drops": drops,
+        "first_packet_ms": first_packet_ms,
+        "outage_ms": outage_ms,
+        "channel": channel,
+    }
+
+def report():
+    return (f"WLAN: {STATE_NAMES[state]}, Verbindungsversuche {connects}, Abbrüche {drops}, "
+            f"erstes Paket nach {first_packet_ms} ms, letzte Unterbrechung {outage_ms} ms")